@@ -17,6 +17,7 @@ import sys
 from pathlib import Path
 from urllib.parse import urlparse
 
+from celery.schedules import crontab
 from dotenv import load_dotenv
 from typing import Optional
 
@@ -210,6 +211,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
     # My Middleware
+    'main_app.middleware.ProfileMiddleware',
     'main_app.middleware.LoginCheckMiddleWare',
 ]
 
@@ -234,10 +236,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'main_app.context_processors.notification_count',
-                'main_app.context_processors.lead_status_info',
-                'main_app.context_processors.pending_task_count',
-                'main_app.context_processors.admin_permissions',
+                'main_app.context_processors.crm_context',
             ],
         },
     },
@@ -394,12 +393,37 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 # False avoids writing the session to the DB/cache on every request (major latency win on remote DB).
 SESSION_SAVE_EVERY_REQUEST = get_bool_env('SESSION_SAVE_EVERY_REQUEST', default=False)
 
-# Dashboard caches (seconds). Set 0 to disable counsellor snapshot cache. Admin cache uses min 1 if enabled.
-ADMIN_DASHBOARD_CACHE_SECONDS = int(os.environ.get('ADMIN_DASHBOARD_CACHE_SECONDS', '45'))
+# Dashboard caches (seconds). Set 0 to disable counsellor snapshot cache.
+# Admin dashboard numbers come from maintained counters; this is how often they are reconciled.
+DASHBOARD_RECONCILE_SECONDS = int(os.environ.get('DASHBOARD_RECONCILE_SECONDS', '3600'))
 COUNSELLOR_SNAPSHOT_CACHE_SECONDS = int(os.environ.get('COUNSELLOR_SNAPSHOT_CACHE_SECONDS', '45'))
+# Lead statuses / activity types / next actions are memoised per process (main_app/reference_data.py).
+# Each process re-checks the shared version key this often, and reloads unconditionally after the max age.
+REFERENCE_DATA_VERSION_CHECK_SECONDS = float(os.environ.get('REFERENCE_DATA_VERSION_CHECK_SECONDS', '1'))
+REFERENCE_DATA_MAX_AGE_SECONDS = float(os.environ.get('REFERENCE_DATA_MAX_AGE_SECONDS', '300'))
+# Navbar / sidebar badge counts (unread notifications, pending tasks) are cached per user this long.
+BADGE_COUNT_CACHE_SECONDS = int(os.environ.get('BADGE_COUNT_CACHE_SECONDS', '30'))
+# The signed-in user's Counsellor / Admin profile is cached this long (0 = look it up every request).
+PROFILE_CACHE_SECONDS = int(os.environ.get('PROFILE_CACHE_SECONDS', '60'))
+# Keyset-paginated lists: filtered totals are cached this long; unfiltered tables at least this big
+# show PostgreSQL's row estimate instead of an exact COUNT(*).
+PAGINATION_COUNT_CACHE_SECONDS = int(os.environ.get('PAGINATION_COUNT_CACHE_SECONDS', '60'))
+PAGINATION_EXACT_COUNT_BELOW = int(os.environ.get('PAGINATION_EXACT_COUNT_BELOW', '50000'))
 
 # Upload limits (import + general uploads)
 MAX_LEAD_IMPORT_MB = int(os.environ.get('MAX_LEAD_IMPORT_MB', '10'))
+# Rows parsed, inserted and auto-assigned per batch while streaming an import (min 50).
+LEAD_IMPORT_BATCH_SIZE = int(os.environ.get('LEAD_IMPORT_BATCH_SIZE', '400'))
+# Rows per UPDATE statement when lead assignments are bulk-updated (min 50).
+LEAD_BULK_UPDATE_BATCH_SIZE = int(os.environ.get('LEAD_BULK_UPDATE_BATCH_SIZE', '500'))
+# How long the specialization-assignment affinity matrix may be cached (rebuilt sooner after assignments or wins).
+ASSIGNMENT_AFFINITY_CACHE_SECONDS = int(os.environ.get('ASSIGNMENT_AFFINITY_CACHE_SECONDS', '3600'))
+# On PostgreSQL, load import batches with COPY into a staging table and merge set-wise.
+LEAD_IMPORT_USE_COPY = get_bool_env('LEAD_IMPORT_USE_COPY', True)
+# Processes used to parse .xlsx imports (0 = single-threaded openpyxl reader). Pays off on large workbooks.
+LEAD_IMPORT_XLSX_WORKERS = int(os.environ.get('LEAD_IMPORT_XLSX_WORKERS', '0'))
+# Country code prefixed to 10-digit national numbers when building duplicate-detection phone keys.
+DEFAULT_PHONE_COUNTRY_CODE = os.environ.get('DEFAULT_PHONE_COUNTRY_CODE', '91')
 DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('DATA_UPLOAD_MAX_MEMORY_SIZE', str(12 * 1024 * 1024)))  # 12 MiB default
 FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('FILE_UPLOAD_MAX_MEMORY_SIZE', str(5 * 1024 * 1024)))  # 5 MiB to disk after
 
@@ -446,6 +470,94 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Periodic jobs (run a beat scheduler, e.g. `celery -A college_management_system worker -B`).
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-dashboard-aggregates': {
+        'task': 'main_app.tasks.reconcile_dashboard_aggregates',
+        'schedule': max(60, DASHBOARD_RECONCILE_SECONDS),
+    },
+}
+
+# Uploaded files go to S3-compatible object storage (django-storages) when a bucket is set;
+# credentials come from AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY in the environment.
+AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME')
+if AWS_STORAGE_BUCKET_NAME:
+    DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+    AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME')
+    AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL')
+    AWS_DEFAULT_ACL = None
+    AWS_S3_FILE_OVERWRITE = False
+
+# Set when the web and worker processes share MEDIA_ROOT (same host or a mounted volume).
+# Without it or a bucket, import uploads and error reports are kept in the database.
+LEAD_IMPORT_SHARED_MEDIA = get_bool_env('LEAD_IMPORT_SHARED_MEDIA', False)
+# Run lead imports on the Celery worker (on whenever Redis is configured). Set it to False
+# to parse and insert imports inside the upload request instead.
+LEAD_IMPORT_ASYNC = get_bool_env('LEAD_IMPORT_ASYNC', default=bool(REDIS_URL))
+
+# DataAccessLog rows are buffered off the request path (see main_app/access_log.py):
+# 'memory' (per process), 'redis' (shared list, survives restarts) or 'sync' (write inline).
+DATA_ACCESS_LOG_BUFFER = os.environ.get('DATA_ACCESS_LOG_BUFFER', 'redis' if REDIS_URL else 'memory')
+# The test runner switches the buffer to 'sync' (see main_app/test_runner.py).
+TEST_RUNNER = 'main_app.test_runner.TestRunner'
+# Minimum seconds between flushes (run after a response); a full batch flushes early.
+DATA_ACCESS_LOG_FLUSH_SECONDS = float(os.environ.get('DATA_ACCESS_LOG_FLUSH_SECONDS', '2'))
+DATA_ACCESS_LOG_BATCH_SIZE = int(os.environ.get('DATA_ACCESS_LOG_BATCH_SIZE', '500'))
+# Events queued beyond this are dropped (and counted) instead of growing memory / Redis.
+DATA_ACCESS_LOG_MAX_BUFFER = int(os.environ.get('DATA_ACCESS_LOG_MAX_BUFFER', '10000'))
+# Raw DataAccessLog rows older than this are rolled up into daily summaries, archived and deleted.
+DATA_ACCESS_LOG_RETENTION_DAYS = int(os.environ.get('DATA_ACCESS_LOG_RETENTION_DAYS', '90'))
+# Purged rows are archived as gzipped JSONL files under this prefix of the default file storage
+# (S3 when AWS_STORAGE_BUCKET_NAME is set). Only set it on local storage if MEDIA_ROOT is durable.
+# Without an archive target the raw rows are rolled up but kept, unless purging without an
+# archive is explicitly allowed.
+DATA_ACCESS_LOG_ARCHIVE_PREFIX = os.environ.get(
+    'DATA_ACCESS_LOG_ARCHIVE_PREFIX', 'archive/data_access_log' if AWS_STORAGE_BUCKET_NAME else ''
+)
+DATA_ACCESS_LOG_PURGE_WITHOUT_ARCHIVE = get_bool_env('DATA_ACCESS_LOG_PURGE_WITHOUT_ARCHIVE', False)
+DATA_ACCESS_LOG_PURGE_BATCH = int(os.environ.get('DATA_ACCESS_LOG_PURGE_BATCH', '5000'))
+CELERY_BEAT_SCHEDULE['purge-data-access-log'] = {
+    'task': 'main_app.tasks.purge_data_access_log',
+    'schedule': 24 * 3600,
+}
+# Default anomaly thresholds (distinct leads per window); counsellors can override them individually.
+ACCESS_ALERT_LEAD_VIEWS_24H = int(os.environ.get('ACCESS_ALERT_LEAD_VIEWS_24H', '200'))
+ACCESS_ALERT_PHONE_REVEALS_1H = int(os.environ.get('ACCESS_ALERT_PHONE_REVEALS_1H', '60'))
+# Calendar feeds: longest start..end span served (days) and how long week blocks stay cached (0 = off).
+CALENDAR_MAX_RANGE_DAYS = int(os.environ.get('CALENDAR_MAX_RANGE_DAYS', '62'))
+CALENDAR_CACHE_SECONDS = int(os.environ.get('CALENDAR_CACHE_SECONDS', '300'))
+# Local time (HH:MM) at which each counsellor's Today's Target queue is built (see daily_task_queue.py).
+DAILY_TASK_QUEUE_BUILD_AT = os.environ.get('DAILY_TASK_QUEUE_BUILD_AT', '00:05')
+CELERY_BEAT_SCHEDULE['build-daily-task-queues'] = {
+    'task': 'main_app.tasks.build_daily_task_queues',
+    'schedule': crontab(
+        hour=int(DAILY_TASK_QUEUE_BUILD_AT.split(':')[0]),
+        minute=int(DAILY_TASK_QUEUE_BUILD_AT.split(':')[1]),
+    ),
+}
+# Activity / visit reminders (see main_app/reminders.py). Without a Celery worker the web
+# process dispatches them itself, at most once a minute.
+REMINDER_DISPATCH_INLINE = get_bool_env('REMINDER_DISPATCH_INLINE', default=not REDIS_URL)
+# How early a reminder fires, and how far back each run looks (covers a late or skipped run).
+REMINDER_LEAD_SECONDS = int(os.environ.get('REMINDER_LEAD_SECONDS', '60'))
+REMINDER_LOOKBACK_SECONDS = int(os.environ.get('REMINDER_LOOKBACK_SECONDS', '120'))
+# Reminders not picked up by a tab within this long after their time are dropped.
+REMINDER_MAX_LATE_SECONDS = int(os.environ.get('REMINDER_MAX_LATE_SECONDS', '600'))
+REMINDER_RETENTION_DAYS = int(os.environ.get('REMINDER_RETENTION_DAYS', '7'))
+# Held SSE streams (ASGI): lifetime and check interval. WSGI: reconnect interval of the one-shot reply.
+REMINDER_STREAM_SECONDS = int(os.environ.get('REMINDER_STREAM_SECONDS', '300'))
+REMINDER_STREAM_TICK_SECONDS = int(os.environ.get('REMINDER_STREAM_TICK_SECONDS', '10'))
+REMINDER_RETRY_SECONDS = int(os.environ.get('REMINDER_RETRY_SECONDS', '30'))
+if not REMINDER_DISPATCH_INLINE:
+    CELERY_BEAT_SCHEDULE['dispatch-reminders'] = {
+        'task': 'main_app.tasks.dispatch_reminders',
+        'schedule': 60.0,
+    }
+if DATA_ACCESS_LOG_BUFFER == 'redis':
+    CELERY_BEAT_SCHEDULE['flush-data-access-log'] = {
+        'task': 'main_app.tasks.flush_data_access_log',
+        'schedule': max(5.0, DATA_ACCESS_LOG_FLUSH_SECONDS),
+    }
 
 
 # Logging configuration
@@ -0,0 +1,230 @@
+"""
+Sliding-window detectors for unusual data access by counsellors.
+
+Each rule keeps, per counsellor, the distinct lead ids touched inside its window
+together with the last time each was touched. Recording an access updates that
+entry, evicts entries older than the window and returns the distinct count, so
+the threshold check no longer scans DataAccessLog on every request.
+
+With REDIS_URL the window is a Redis sorted set (member = lead id, score = last
+access time), shared by every process and updated in one pipelined round trip.
+Otherwise the window lives in the default cache as WINDOW_BUCKETS time buckets:
+each lead remembers the bucket it was last seen in and each bucket counts the
+leads whose latest access falls inside it, kept current with cache.incr/decr.
+The window then ends on a bucket boundary, so it can reach one bucket further
+back than the rule says (errs towards alerting). The cache has to be shared by
+every worker for the thresholds to hold; a process-local cache (LocMemCache)
+counts each process separately, which is logged once per process.
+
+A window with no state yet (new cache, expired key) is seeded once from
+DataAccessLog, after flushing this process's access-log buffer so events still
+waiting to be written are counted.
+
+Thresholds come from the counsellor's ``*_alert_threshold`` field, falling back
+to the ACCESS_ALERT_* settings. Crossing one raises a SecurityAlert, at most one per
+(rule, counsellor, day).
+"""
+import logging
+import time
+from collections import Counter, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+Rule = namedtuple('Rule', 'actions window_seconds threshold_field setting default')
+
+RULES = {
+    'lead_views': Rule(
+        actions=('view_lead_detail',),
+        window_seconds=24 * 3600,
+        threshold_field='lead_view_alert_threshold',
+        setting='ACCESS_ALERT_LEAD_VIEWS_24H',
+        default=200,
+    ),
+    'phone_reveals': Rule(
+        actions=('reveal_phone', 'reveal_alternate_phone'),
+        window_seconds=3600,
+        threshold_field='phone_reveal_alert_threshold',
+        setting='ACCESS_ALERT_PHONE_REVEALS_1H',
+        default=60,
+    ),
+}
+
+WINDOW_BUCKETS = 24
+
+logger = logging.getLogger(__name__)
+_warned_local = False
+
+
+def threshold(rule_name, counsellor):
+    rule = RULES[rule_name]
+    value = getattr(counsellor, rule.threshold_field, None)
+    if value is None:
+        value = getattr(settings, rule.setting, rule.default)
+    return int(value)
+
+
+def _key(rule_name, counsellor_id):
+    return f'crm:access_window:{rule_name}:{counsellor_id}'
+
+
+def _seed(rule, counsellor_id, now):
+    """{lead_id: last access timestamp} inside the window, from the audit table."""
+    from . import access_log
+    from .models import DataAccessLog
+
+    access_log.flush()
+    since = timezone.now() - timedelta(seconds=rule.window_seconds)
+    rows = (
+        DataAccessLog.objects
+        .filter(
+            counsellor_id=counsellor_id,
+            action__in=rule.actions,
+            created_at__gte=since,
+            lead_id__isnull=False,
+        )
+        .order_by()
+        .values('lead_id')
+        .annotate(last=Max('created_at'))
+    )
+    return {row['lead_id']: min(now, row['last'].timestamp()) for row in rows}
+
+
+def _observe_redis(rule, rule_name, counsellor_id, lead_id, now):
+    from django_redis import get_redis_connection
+
+    key = _key(rule_name, counsellor_id)
+    cutoff = now - rule.window_seconds
+    pipe = get_redis_connection('default').pipeline()
+    pipe.exists(key)
+    pipe.zadd(key, {lead_id: now})
+    pipe.zremrangebyscore(key, '-inf', cutoff)
+    pipe.zcard(key)
+    pipe.expire(key, rule.window_seconds)
+    existed, _, _, count, _ = pipe.execute()
+    if not existed:
+        seeded = _seed(rule, counsellor_id, now)
+        seeded.pop(lead_id, None)
+        if seeded:
+            pipe.zadd(key, seeded, nx=True)
+            pipe.zremrangebyscore(key, '-inf', cutoff)
+            pipe.zcard(key)
+            _, _, count = pipe.execute()
+    return count
+
+
+def _bucket_seconds(rule):
+    return max(1, rule.window_seconds // WINDOW_BUCKETS)
+
+
+def _bucket_key(rule_name, counsellor_id, bucket):
+    return f'{_key(rule_name, counsellor_id)}:b{bucket}'
+
+
+def _lead_key(rule_name, counsellor_id, lead_id):
+    return f'{_key(rule_name, counsellor_id)}:l{lead_id}'
+
+
+def _add_to_bucket(key, delta, timeout):
+    if cache.add(key, delta, timeout):
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Expired between add() and incr().
+        cache.set(key, delta, timeout)
+
+
+def _warn_if_process_local():
+    global _warned_local
+    if not _warned_local and isinstance(caches['default'], LocMemCache):
+        _warned_local = True
+        logger.warning(
+            "Access anomaly windows use a process-local cache; thresholds are counted per "
+            "process. Set REDIS_URL (or a shared CACHES backend) in production."
+        )
+
+
+def _observe_cache(rule, rule_name, counsellor_id, lead_id, now):
+    _warn_if_process_local()
+    size = _bucket_seconds(rule)
+    timeout = rule.window_seconds + size
+    current = int(now // size)
+    first = current - WINDOW_BUCKETS + 1
+
+    if cache.add(f'{_key(rule_name, counsellor_id)}:seeded', 1, rule.window_seconds):
+        seeded = _seed(rule, counsellor_id, now)
+        seeded.pop(lead_id, None)
+        buckets = {lead: int(seen // size) for lead, seen in seeded.items()}
+        buckets = {lead: bucket for lead, bucket in buckets.items() if bucket >= first}
+        cache.set_many(
+            {_lead_key(rule_name, counsellor_id, lead): bucket for lead, bucket in buckets.items()},
+            rule.window_seconds,
+        )
+        for bucket, count in sorted(Counter(buckets.values()).items()):
+            _add_to_bucket(_bucket_key(rule_name, counsellor_id, bucket), count, timeout)
+
+    lead_key = _lead_key(rule_name, counsellor_id, lead_id)
+    previous = cache.get(lead_key)
+    if previous != current:
+        cache.set(lead_key, current, rule.window_seconds)
+        _add_to_bucket(_bucket_key(rule_name, counsellor_id, current), 1, timeout)
+        if previous is not None and previous >= first:
+            try:
+                cache.decr(_bucket_key(rule_name, counsellor_id, previous))
+            except ValueError:
+                pass
+
+    counts = cache.get_many([
+        _bucket_key(rule_name, counsellor_id, bucket) for bucket in range(first, current + 1)
+    ])
+    return sum(max(0, count) for count in counts.values())
+
+
+def observe(rule_name, counsellor, lead_id):
+    """Record one access and return the distinct leads in the counsellor's window."""
+    rule = RULES[rule_name]
+    now = time.time()
+    if getattr(settings, 'REDIS_URL', None):
+        return _observe_redis(rule, rule_name, counsellor.pk, lead_id, now)
+    return _observe_cache(rule, rule_name, counsellor.pk, lead_id, now)
+
+
+def raise_alert(rule_name, counsellor, distinct_leads, limit, message, notification):
+    """
+    Record today's SecurityAlert for this rule and counsellor and notify every admin
+    with one bulk insert. Returns False (and does nothing) if it was already raised today.
+    """
+    from .badge_counts import invalidate_admin_notifications
+    from .models import Admin, NotificationAdmin, SecurityAlert
+
+    day = timezone.localdate()
+    marker = f'crm:access_alert:{rule_name}:{counsellor.pk}:{day.isoformat()}'
+    if cache.get(marker):
+        return False
+    try:
+        with transaction.atomic():
+            SecurityAlert.objects.create(
+                kind=rule_name,
+                counsellor=counsellor,
+                day=day,
+                distinct_leads=distinct_leads,
+                threshold=limit,
+                message=message,
+            )
+            admin_ids = list(Admin.objects.values_list('admin_id', flat=True))
+            NotificationAdmin.objects.bulk_create([
+                NotificationAdmin(admin_id=admin_id, message=notification) for admin_id in admin_ids
+            ])
+    except IntegrityError:
+        created = False
+    else:
+        created = True
+        invalidate_admin_notifications(admin_ids)
+    cache.set(marker, 1, 86400)
+    return created
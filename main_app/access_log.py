@@ -0,0 +1,355 @@
+"""
+Buffered DataAccessLog writer.
+
+Views call ``record_access()`` instead of ``DataAccessLog.objects.create``: the event is
+captured (with its request-time timestamp) and appended to a queue. Queued events are
+written with ``bulk_create`` from a request_finished hook, after the response has gone
+out and on the request's own thread and database connection, once
+DATA_ACCESS_LOG_FLUSH_SECONDS have passed since the last flush or as soon as
+DATA_ACCESS_LOG_BATCH_SIZE events are waiting. There is no background thread.
+
+How long an event can wait: with the memory backend there is no timer, so events
+queued by a process that then stops serving requests stay in memory until its next
+request finishes or it exits cleanly (atexit), and are lost if it is killed. At most
+DATA_ACCESS_LOG_MAX_BUFFER events are held; ``oldest_event_age_seconds`` in the
+metrics shows how long the oldest has waited. With the redis backend the beat task
+drains the shared queue every max(5, DATA_ACCESS_LOG_FLUSH_SECONDS) seconds whether or
+not any web process is busy.
+
+Backends (DATA_ACCESS_LOG_BUFFER):
+  memory  per-process deque. A crash loses what the process queued since its last
+          flush, never more than DATA_ACCESS_LOG_MAX_BUFFER; on a clean exit the rest is
+          written if the process still has a usable database connection.
+  redis   shared Redis list (needs REDIS_URL). Events survive web-process restarts; any
+          process's request hook, the Celery beat task or ``flush_data_access_log``
+          drains it, so a crash loses at most the one batch being written.
+  sync    write on the request path (the old behaviour; always used by the test runner).
+
+When the queue is full new events are dropped and counted rather than blocking requests.
+``metrics()`` reports this process's queue depth, drops and flush latency. Every flush
+also publishes that snapshot to the cache for METRICS_TTL seconds, so
+``published_metrics()`` (the admin ``data_access_log_metrics`` view and the
+``flush_data_access_log`` command) can show the web workers' numbers from another
+process. That needs a shared cache (REDIS_URL); with the per-process default cache
+each process only sees its own snapshot.
+"""
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = 'crm:data_access_log:queue'
+METRICS_KEY = 'crm:data_access_log:metrics:{}'
+METRICS_PROCESSES_KEY = 'crm:data_access_log:metrics:processes'
+METRICS_TTL = 600
+_FIELDS = ('user_id', 'counsellor_id', 'action', 'lead_id', 'business_id', 'ip_address', 'user_agent')
+
+_lock = threading.Lock()
+# 'pending': this process queued events since its last flush; 'full': a batch is waiting.
+_state = {'pid': None, 'queue': deque(), 'pending': False, 'full': False, 'last_flush': 0.0}
+_metrics = {
+    'flushed': 0,
+    'dropped': 0,
+    'flushes': 0,
+    'last_flush_at': None,
+    'last_flush_ms': 0.0,
+    'max_flush_ms': 0.0,
+    'last_error': '',
+}
+
+
+def _backend():
+    backend = getattr(settings, 'DATA_ACCESS_LOG_BUFFER', 'memory')
+    if backend == 'redis' and not getattr(settings, 'REDIS_URL', None):
+        return 'memory'
+    return backend
+
+
+def _flush_seconds():
+    return max(0.2, float(getattr(settings, 'DATA_ACCESS_LOG_FLUSH_SECONDS', 2)))
+
+
+def _batch_size():
+    return max(1, int(getattr(settings, 'DATA_ACCESS_LOG_BATCH_SIZE', 500)))
+
+
+def _max_buffer():
+    return max(1, int(getattr(settings, 'DATA_ACCESS_LOG_MAX_BUFFER', 10000)))
+
+
+def _redis():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection('default')
+
+
+# Capture / enqueue
+
+def _event(request, counsellor, action, lead=None, business=None):
+    return {
+        'user_id': request.user.pk,
+        'counsellor_id': counsellor.pk if counsellor is not None else None,
+        'action': action,
+        'lead_id': lead.pk if lead is not None else None,
+        'business_id': business.pk if business is not None else None,
+        'ip_address': request.META.get('REMOTE_ADDR') or None,
+        'user_agent': request.META.get('HTTP_USER_AGENT', '')[:500],
+        'created_at': timezone.now().isoformat(),
+    }
+
+
+def record_access(request, counsellor, action, lead=None, business=None):
+    """Queue one DataAccessLog row for the current request; never raises."""
+    try:
+        event = _event(request, counsellor, action, lead=lead, business=business)
+        backend = _backend()
+        if backend == 'sync':
+            _write([event])
+        elif backend == 'redis':
+            _enqueue_redis(event)
+        else:
+            _enqueue_memory(event)
+    except Exception:
+        logger.warning("Failed to record DataAccessLog event %s", action, exc_info=True)
+
+
+def _reset_after_fork():
+    """A forked child (e.g. a gunicorn worker) must not write its parent's queued events."""
+    pid = os.getpid()
+    if _state['pid'] != pid:
+        with _lock:
+            if _state['pid'] != pid:
+                _state.update(pid=pid, queue=deque(), pending=False, full=False, last_flush=time.monotonic())
+
+
+def _mark_pending(depth):
+    with _lock:
+        _state['pending'] = True
+        if depth >= _batch_size():
+            _state['full'] = True
+
+
+def _enqueue_memory(event):
+    _reset_after_fork()
+    with _lock:
+        queue = _state['queue']
+        if len(queue) >= _max_buffer():
+            _metrics['dropped'] += 1
+            return
+        queue.append(event)
+        depth = len(queue)
+    _mark_pending(depth)
+
+
+def _enqueue_redis(event):
+    _reset_after_fork()
+    client = _redis()
+    depth = client.rpush(REDIS_KEY, json.dumps(event))
+    if depth > _max_buffer():
+        # Keep the queue bounded: drop what we just added.
+        client.rpop(REDIS_KEY)
+        with _lock:
+            _metrics['dropped'] += 1
+        return
+    _mark_pending(depth)
+
+
+# Flushing
+
+def _write(events):
+    from .models import DataAccessLog
+
+    rows = []
+    for event in events:
+        created_at = parse_datetime(event['created_at']) if event.get('created_at') else None
+        rows.append(DataAccessLog(
+            created_at=created_at or timezone.now(),
+            **{name: event.get(name) for name in _FIELDS},
+        ))
+    DataAccessLog.objects.bulk_create(rows, batch_size=_batch_size())
+
+
+def _take_memory(limit):
+    with _lock:
+        queue = _state['queue']
+        return [queue.popleft() for _ in range(min(limit, len(queue)))]
+
+
+def _requeue_memory(events):
+    """Put a failed batch back at the head of the queue, as far as the bound allows."""
+    with _lock:
+        queue = _state['queue']
+        room = max(0, _max_buffer() - len(queue))
+        kept = events[:room]
+        queue.extendleft(reversed(kept))
+        _metrics['dropped'] += len(events) - len(kept)
+
+
+def _take_redis(limit):
+    pipe = _redis().pipeline()
+    pipe.lrange(REDIS_KEY, 0, limit - 1)
+    pipe.ltrim(REDIS_KEY, limit, -1)
+    raw, _ = pipe.execute()
+    return [json.loads(item) for item in raw]
+
+
+def _requeue_redis(events):
+    if events:
+        _redis().lpush(REDIS_KEY, *[json.dumps(e) for e in reversed(events)])
+
+
+def flush(max_batches=None):
+    """Write queued events in batches until the queue is empty; returns rows written."""
+    backend = _backend()
+    if backend == 'sync':
+        return 0
+    take, requeue = (
+        (_take_redis, _requeue_redis) if backend == 'redis' else (_take_memory, _requeue_memory)
+    )
+    written = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        events = take(_batch_size())
+        if not events:
+            break
+        batches += 1
+        started = time.perf_counter()
+        try:
+            _write(events)
+        except Exception as exc:
+            requeue(events)
+            with _lock:
+                _metrics['last_error'] = str(exc)[:200]
+            logger.warning("DataAccessLog flush of %s events failed; re-queued", len(events), exc_info=True)
+            break
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        written += len(events)
+        with _lock:
+            _metrics['flushed'] += len(events)
+            _metrics['flushes'] += 1
+            _metrics['last_flush_at'] = timezone.now()
+            _metrics['last_flush_ms'] = elapsed_ms
+            _metrics['max_flush_ms'] = max(_metrics['max_flush_ms'], elapsed_ms)
+        logger.debug("DataAccessLog flush: %s rows in %.1f ms", len(events), elapsed_ms)
+    if batches:
+        _publish_metrics()
+    return written
+
+
+def _flush_due():
+    """Claim the next flush for this request if one is due (only one thread gets True)."""
+    now = time.monotonic()
+    with _lock:
+        if not _state['pending']:
+            return False
+        if not _state['full'] and now - _state['last_flush'] < _flush_seconds():
+            return False
+        _state.update(pending=False, full=False, last_flush=now)
+        return True
+
+
+def _flush_after_request(sender, **kwargs):
+    """request_finished hook: write due events on this request's thread."""
+    if _state['pid'] != os.getpid() or not _flush_due():
+        return
+    dropped = _metrics['dropped']
+    try:
+        flush()
+    except Exception:
+        logger.warning("DataAccessLog flush after request failed", exc_info=True)
+    finally:
+        if _backend() == 'memory' and _state['queue']:
+            # The write failed and the batch was re-queued: try again after the next request.
+            with _lock:
+                _state['pending'] = True
+        # Django's own request_finished handler may already have run; apply its rules again.
+        close_old_connections()
+    if _metrics['dropped'] > dropped:
+        logger.warning("DataAccessLog buffer full: %s events dropped so far", _metrics['dropped'])
+
+
+request_finished.connect(_flush_after_request, dispatch_uid='main_app.access_log.flush_after_request')
+
+
+def _flush_at_exit():
+    """Write what a cleanly exiting process still holds, if the database is still reachable."""
+    if _backend() != 'memory' or not _state['queue'] or _state['pid'] != os.getpid():
+        return
+    try:
+        connection.ensure_connection()
+        usable = connection.is_usable()
+    except Exception:
+        usable = False
+    if not usable:
+        logger.warning("DataAccessLog: %s queued events lost at exit (no database connection)", len(_state['queue']))
+        return
+    try:
+        flush()
+    except Exception:
+        logger.warning("DataAccessLog flush at exit failed", exc_info=True)
+    finally:
+        connection.close()
+
+
+atexit.register(_flush_at_exit)
+
+
+def _oldest_event_age():
+    with _lock:
+        oldest = _state['queue'][0] if _state['queue'] else None
+    created_at = parse_datetime(oldest['created_at']) if oldest else None
+    return (timezone.now() - created_at).total_seconds() if created_at else 0.0
+
+
+def metrics():
+    """Queue depth, drops and flush latency for this process (depth is global with Redis)."""
+    backend = _backend()
+    age = 0.0
+    if backend == 'redis':
+        depth = _redis().llen(REDIS_KEY)
+    elif backend == 'memory':
+        depth = len(_state['queue'])
+        age = _oldest_event_age()
+    else:
+        depth = 0
+    with _lock:
+        return {'backend': backend, 'queue_depth': depth, 'oldest_event_age_seconds': age, **_metrics}
+
+
+def _process_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _publish_metrics():
+    """Store this process's metrics() in the cache for published_metrics(); never raises."""
+    try:
+        name = _process_name()
+        snapshot = {'process': name, 'published_at': timezone.now(), **metrics()}
+        cache.set(METRICS_KEY.format(name), snapshot, METRICS_TTL)
+        processes = cache.get(METRICS_PROCESSES_KEY) or {}
+        cutoff = time.time() - METRICS_TTL
+        processes = {p: seen for p, seen in processes.items() if seen >= cutoff}
+        processes[name] = time.time()
+        cache.set(METRICS_PROCESSES_KEY, processes, METRICS_TTL)
+    except Exception:
+        logger.debug("Could not publish DataAccessLog metrics", exc_info=True)
+
+
+def published_metrics():
+    """The latest metrics snapshot of every process that flushed in the last METRICS_TTL seconds."""
+    processes = cache.get(METRICS_PROCESSES_KEY) or {}
+    snapshots = cache.get_many([METRICS_KEY.format(name) for name in processes])
+    return sorted(snapshots.values(), key=lambda snapshot: snapshot['process'])
@@ -0,0 +1,162 @@
+"""
+Retention for DataAccessLog.
+
+Raw audit rows are kept for DATA_ACCESS_LOG_RETENTION_DAYS. ``apply_retention()``
+walks every older day, oldest first:
+
+1. rolls the day up into DataAccessDailySummary rows (events, distinct leads and
+   users per counsellor and action) unless that day was already summarised;
+2. writes the raw rows, one gzipped JSONL file per batch, to
+   ``<prefix>/YYYY/MM/data_access_log-YYYY-MM-DD-<first id>.jsonl.gz`` in the default
+   file storage (DATA_ACCESS_LOG_ARCHIVE_PREFIX);
+3. deletes them in batches of DATA_ACCESS_LOG_PURGE_BATCH, so no single statement
+   holds locks on a large range.
+
+Each batch is archived before it is deleted; a crash can only repeat the batch in
+flight in the archive, never lose it. With no archive prefix the raw rows are only
+rolled up and kept, unless DATA_ACCESS_LOG_PURGE_WITHOUT_ARCHIVE (or
+``purge_data_access_log --no-archive``) says to delete them anyway: a worker's local
+disk is not an archive. Runs daily from Celery beat or on demand with
+``manage.py purge_data_access_log``.
+"""
+import gzip
+import io
+import json
+import logging
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_ARCHIVE_FIELDS = (
+    'id', 'created_at', 'user_id', 'counsellor_id', 'action', 'lead_id', 'business_id',
+    'ip_address', 'user_agent',
+)
+
+
+def retention_days():
+    return max(1, int(getattr(settings, 'DATA_ACCESS_LOG_RETENTION_DAYS', 90)))
+
+
+def _batch_size():
+    return max(100, int(getattr(settings, 'DATA_ACCESS_LOG_PURGE_BATCH', 5000)))
+
+
+def _archive_prefix():
+    return (getattr(settings, 'DATA_ACCESS_LOG_ARCHIVE_PREFIX', '') or '').strip('/')
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, dt_time.min))
+    return start, start + timedelta(days=1)
+
+
+def _archive_name(prefix, day, first_id):
+    return f'{prefix}/{day:%Y}/{day:%m}/data_access_log-{day.isoformat()}-{first_id}.jsonl.gz'
+
+
+def _archive_batch(prefix, day, batch):
+    """Save one batch as a gzipped JSONL file in the default storage; returns its name."""
+    data = io.BytesIO()
+    with gzip.GzipFile(fileobj=data, mode='wb') as out:
+        for row in batch:
+            row['created_at'] = row['created_at'].isoformat()
+            out.write(json.dumps(row, separators=(',', ':')).encode('utf-8'))
+            out.write(b'\n')
+    return default_storage.save(_archive_name(prefix, day, batch[0]['id']), ContentFile(data.getvalue()))
+
+
+def summarise_day(day):
+    """Write the day's summary rows unless they exist; returns how many were written."""
+    from .models import DataAccessDailySummary, DataAccessLog
+
+    if DataAccessDailySummary.objects.filter(day=day).exists():
+        return 0
+    start, end = _day_bounds(day)
+    rows = (
+        DataAccessLog.objects
+        .filter(created_at__gte=start, created_at__lt=end)
+        .order_by()
+        .values('counsellor_id', 'action')
+        .annotate(
+            events=Count('id'),
+            distinct_leads=Count('lead_id', distinct=True),
+            distinct_users=Count('user_id', distinct=True),
+        )
+    )
+    summaries = [DataAccessDailySummary(day=day, **row) for row in rows]
+    DataAccessDailySummary.objects.bulk_create(summaries, ignore_conflicts=True)
+    return len(summaries)
+
+
+def purge_day(day, archive_prefix=None, batch_size=None):
+    """Archive (when archive_prefix is set) and delete one day's raw rows in id-ordered batches."""
+    from .models import DataAccessLog
+
+    batch_size = batch_size or _batch_size()
+    start, end = _day_bounds(day)
+    day_rows = DataAccessLog.objects.filter(created_at__gte=start, created_at__lt=end)
+    deleted = 0
+    while True:
+        batch = list(day_rows.order_by('id').values(*_ARCHIVE_FIELDS)[:batch_size])
+        if not batch:
+            break
+        if archive_prefix:
+            _archive_batch(archive_prefix, day, batch)
+        with transaction.atomic():
+            deleted += DataAccessLog.objects.filter(id__in=[row['id'] for row in batch]).delete()[0]
+    return deleted
+
+
+def apply_retention(days=None, archive=True, batch_size=None, dry_run=False):
+    """
+    Roll up, archive and delete raw rows older than the retention window. ``archive=False``
+    deletes without archiving; without an archive prefix the rows are only rolled up
+    (``stats['kept']``) unless DATA_ACCESS_LOG_PURGE_WITHOUT_ARCHIVE is set.
+    """
+    from .models import DataAccessLog
+
+    cutoff_day = timezone.localdate() - timedelta(days=retention_days() if days is None else days)
+    cutoff, _ = _day_bounds(cutoff_day)
+    oldest = DataAccessLog.objects.filter(created_at__lt=cutoff).aggregate(m=Min('created_at'))['m']
+    stats = {'days': 0, 'summaries': 0, 'deleted': 0, 'kept': 0}
+    archive_prefix = _archive_prefix() if archive else ''
+    purge = (
+        bool(archive_prefix) or not archive
+        or getattr(settings, 'DATA_ACCESS_LOG_PURGE_WITHOUT_ARCHIVE', False)
+    )
+
+    day = timezone.localtime(oldest).date() if oldest else cutoff_day
+    while day < cutoff_day:
+        start, end = _day_bounds(day)
+        pending = DataAccessLog.objects.filter(created_at__gte=start, created_at__lt=end).count()
+        if pending:
+            stats['days'] += 1
+            if not purge:
+                stats['kept'] += pending
+                if not dry_run:
+                    stats['summaries'] += summarise_day(day)
+            elif dry_run:
+                stats['deleted'] += pending
+            else:
+                stats['summaries'] += summarise_day(day)
+                stats['deleted'] += purge_day(day, archive_prefix=archive_prefix, batch_size=batch_size)
+        day += timedelta(days=1)
+
+    if stats['deleted'] and not dry_run:
+        logger.info(
+            "DataAccessLog retention: %(deleted)s rows from %(days)s days rolled up and purged", stats
+        )
+    if stats['kept'] and not dry_run:
+        logger.warning(
+            "DataAccessLog retention: %(kept)s rows past retention kept; set DATA_ACCESS_LOG_ARCHIVE_PREFIX "
+            "(or DATA_ACCESS_LOG_PURGE_WITHOUT_ARCHIVE) to purge them", stats
+        )
+    return stats
+
@@ -27,7 +27,7 @@ class UserModel(UserAdmin):
     )
 
 class CounsellorAdmin(admin.ModelAdmin):
-    list_display = ('employee_id', 'admin', 'department', 'performance_rating', 'total_leads_assigned', 'total_business_generated', 'is_active')
+    list_display = ('employee_id', 'admin', 'department', 'performance_rating', 'total_leads_assigned', 'total_business_generated', 'lead_capacity', 'is_active')
     list_filter = ('department', 'is_active', 'performance_rating')
     search_fields = ('employee_id', 'admin__first_name', 'admin__last_name', 'admin__email')
     ordering = ('employee_id',)
@@ -111,6 +111,30 @@ class NotificationAdminAdmin(admin.ModelAdmin):
     search_fields = ('admin__first_name', 'admin__last_name', 'admin__email', 'message')
     ordering = ('-created_at',)
 
+class DashboardCounterAdmin(admin.ModelAdmin):
+    list_display = ('metric', 'key', 'value', 'updated_at')
+    list_filter = ('metric',)
+    search_fields = ('metric', 'key')
+    ordering = ('metric', 'key')
+
+class DataAccessDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ('day', 'counsellor', 'action', 'events', 'distinct_leads', 'distinct_users')
+    list_filter = ('action', 'day')
+    search_fields = ('counsellor__employee_id',)
+    ordering = ('-day',)
+
+class SecurityAlertAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'counsellor', 'day', 'distinct_leads', 'threshold', 'created_at')
+    list_filter = ('kind', 'day')
+    search_fields = ('counsellor__employee_id', 'counsellor__admin__email')
+    ordering = ('-created_at',)
+
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('original_filename', 'source', 'status', 'rows_parsed', 'rows_inserted', 'rows_failed', 'created_by', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('original_filename',)
+    ordering = ('-created_at',)
+
 # Register models
 admin.site.register(CustomUser, UserModel)
 admin.site.register(Counsellor, CounsellorAdmin)
@@ -127,3 +151,7 @@ admin.site.register(NotificationCounsellor, NotificationCounsellorAdmin)
 admin.site.register(NotificationAdmin, NotificationAdminAdmin)
 admin.site.register(DailyTarget)
 admin.site.register(DailyTargetAssignment)
+admin.site.register(ImportJob, ImportJobAdmin)
+admin.site.register(DashboardCounter, DashboardCounterAdmin)
+admin.site.register(SecurityAlert, SecurityAlertAdmin)
+admin.site.register(DataAccessDailySummary, DataAccessDailySummaryAdmin)
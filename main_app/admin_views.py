@@ -1,12 +1,10 @@
+import heapq
 import json
 import logging
-import uuid
 from datetime import datetime, timedelta
 
 from django.db import transaction
-from django.core.cache import cache
 from django.contrib import messages
-from django.core.files.storage import FileSystemStorage
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import (HttpResponse, HttpResponseRedirect,
                               get_object_or_404, redirect, render)
@@ -17,154 +15,379 @@ from django.views.generic import UpdateView
 from django.views.decorators.http import require_POST
 from django.contrib.auth.hashers import make_password
 from django.db.models import Count, Sum, Avg, Q, Case, When, Value, DecimalField
-from django.db.models.functions import TruncMonth
 from django.utils import timezone
 
 from .forms import *
-from .lead_import_io import is_blank_import_value, iter_lead_import_rows
+from . import calendar_feed, daily_task_queue, dashboard_aggregates, lead_search
+from .lead_import_columns import build_import_batch
+from .lead_import_io import iter_lead_import_rows, iter_row_batches
 from .models import *
-from .utils import paginate_queryset, user_type_required, admin_perm_required, get_counsellor_activity_snapshot
+from .pagination import estimated_count, keyset_paginate
+from .profiles import admin_profile_or_404
+from .utils import paginate_queryset, user_type_required, admin_perm_required, get_counsellor_activity_snapshots
 
 admin_required = user_type_required('1')
 
 logger = logging.getLogger(__name__)
 
 
-def _import_cell_str(row, key, default=""):
-    """Normalize import cell to a clean string (handles empty / NaN from Excel)."""
-    if key not in row:
-        return default
-    val = row[key]
-    if is_blank_import_value(val):
-        return default
-    s = str(val).strip()
-    return s if s else default
+# Fields the "merge" duplicate policy copies onto the existing lead when blank there.
+_IMPORT_MERGE_FIELDS = (
+    'alternate_phone', 'school_name', 'course_interested', 'industry', 'graduation_year',
+)
 
 
-def _new_import_lead_id():
-    """Match Lead.save() format but longer suffix to avoid collisions on bulk import."""
-    return f"L-{datetime.now().strftime('%y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
+def _import_contact_keys(lead):
+    keys = [('phone', k) for k in (lead.phone_key, lead.alternate_phone_key) if k]
+    if lead.email_key:
+        keys.append(('email', lead.email_key))
+    return keys
 
 
-def _build_lead_from_import_row(row, source, assigned_counsellor):
-    """Construct an unsaved Lead from one import row dict (raises on bad data)."""
-    raw_gs = row.get("graduation_status", "NO")
-    if is_blank_import_value(raw_gs):
-        graduation_status = "NO"
-    else:
-        graduation_status = str(raw_gs).strip().upper()
-        if graduation_status not in ("YES", "NO"):
-            graduation_status = "NO"
+def _find_existing_duplicates(leads):
+    """
+    Resolve every phone/email key of a batch against the contact-key indexes at once.
+    Returns {('phone'|'email', key): existing_lead_id}, preferring the oldest lead.
+    """
+    phone_keys = set()
+    email_keys = set()
+    for lead in leads:
+        for kind, key in _import_contact_keys(lead):
+            (phone_keys if kind == 'phone' else email_keys).add(key)
+
+    matches = {}
+    lookup = Q()
+    if phone_keys:
+        lookup |= Q(phone_key__in=phone_keys) | Q(alternate_phone_key__in=phone_keys)
+    if email_keys:
+        lookup |= Q(email_key__in=email_keys)
+    if not lookup:
+        return matches
 
-    if graduation_status == "NO":
-        graduation_course = "Not Applicable"
-        graduation_college = "Not Applicable"
-    else:
-        graduation_course = row.get("graduation_course", "Not Specified")
-        graduation_college = row.get("graduation_college", "Not Specified")
-        if is_blank_import_value(graduation_course):
-            graduation_course = "Not Specified"
-        else:
-            graduation_course = str(graduation_course).strip() or "Not Specified"
-        if is_blank_import_value(graduation_college):
-            graduation_college = "Not Specified"
-        else:
-            graduation_college = str(graduation_college).strip() or "Not Specified"
+    for row in (
+        Lead.objects.filter(lookup)
+        .order_by('id')
+        .values('id', 'phone_key', 'alternate_phone_key', 'email_key')
+    ):
+        for key in (row['phone_key'], row['alternate_phone_key']):
+            if key in phone_keys:
+                matches.setdefault(('phone', key), row['id'])
+        if row['email_key'] in email_keys:
+            matches.setdefault(('email', row['email_key']), row['id'])
+
+    if phone_keys:
+        for row in (
+            LeadAlternatePhone.objects.filter(phone_key__in=phone_keys)
+            .order_by('lead_id')
+            .values('lead_id', 'phone_key')
+        ):
+            matches.setdefault(('phone', row['phone_key']), row['lead_id'])
+    return matches
+
+
+def _merge_import_fields(target, incoming):
+    """Copy non-blank import values onto blank fields of target; return changed field names."""
+    changed = []
+    for field in _IMPORT_MERGE_FIELDS:
+        value = getattr(incoming, field)
+        if value in (None, '') or getattr(target, field) not in (None, ''):
+            continue
+        setattr(target, field, value)
+        changed.append(field)
+    if 'alternate_phone' in changed:
+        # Keep duplicate detection and search able to find the merged number.
+        target.refresh_contact_keys()
+        target.refresh_search_text()
+        changed += ['alternate_phone_key', 'search_text']
+    return changed
+
+
+def _resolve_import_duplicates(leads, policy):
+    """
+    Apply a duplicate policy ('skip', 'merge' or 'flag') to one batch of built leads.
 
-    graduation_year = row.get("graduation_year", None)
-    if is_blank_import_value(graduation_year):
-        graduation_year = None
-    else:
+    Matches against existing leads come from one set-based lookup per batch; rows
+    repeating an earlier row of the same batch are matched in memory. Returns a dict
+    with the indexes to insert, per-policy counts and in-batch duplicate links
+    (dup_index, original_index) that can only be saved once the batch has pks.
+    """
+    existing = _find_existing_duplicates(leads)
+    seen = {}
+    result = {'insert': [], 'skipped': 0, 'merged': 0, 'flagged': 0, 'links': []}
+    merge_into = {}
+
+    for idx, lead in enumerate(leads):
+        keys = _import_contact_keys(lead)
+        existing_id = next((existing[k] for k in keys if k in existing), None)
+        batch_idx = next((seen[k] for k in keys if k in seen), None)
+
+        if existing_id is None and batch_idx is None:
+            result['insert'].append(idx)
+            for k in keys:
+                seen[k] = idx
+            continue
+
+        if policy == 'skip':
+            result['skipped'] += 1
+        elif policy == 'merge':
+            result['merged'] += 1
+            if existing_id is not None:
+                merge_into.setdefault(existing_id, []).append(lead)
+            elif _merge_import_fields(leads[batch_idx], lead):
+                for k in _import_contact_keys(leads[batch_idx]):
+                    seen.setdefault(k, batch_idx)
+        elif policy == 'flag':
+            result['flagged'] += 1
+            result['insert'].append(idx)
+            if existing_id is not None:
+                lead.duplicate_of_id = existing_id
+            else:
+                result['links'].append((idx, batch_idx))
+
+    if merge_into:
+        to_update = []
+        fields = set()
+        for target in Lead.objects.filter(id__in=list(merge_into)):
+            changed = []
+            for incoming in merge_into[target.id]:
+                changed += _merge_import_fields(target, incoming)
+            if changed:
+                fields.update(changed)
+                to_update.append(target)
+        if to_update:
+            _bulk_update_leads(to_update, sorted(fields))
+    return result
+
+
+def _lead_import_batch_size():
+    return max(50, int(getattr(settings, "LEAD_IMPORT_BATCH_SIZE", 400)))
+
+
+def _insert_import_batch(chunk):
+    """
+    Insert one batch of built leads. Returns (inserted_leads, failures) where
+    failures is a list of (index_in_chunk, error_message).
+    Falls back to per-row saves only for the failing batch.
+
+    On PostgreSQL (LEAD_IMPORT_USE_COPY) the batch goes through the COPY loader,
+    which rejects bad rows individually instead of retrying row by row.
+    """
+    from .lead_import_copy import copy_insert_leads, copy_supported
+
+    if getattr(settings, 'LEAD_IMPORT_USE_COPY', True) and copy_supported():
+        try:
+            inserted, failures = copy_insert_leads(chunk)
+            dashboard_aggregates.record_leads_created(inserted)
+            return inserted, failures
+        except Exception as e:
+            logger.warning(
+                "COPY load failed for %s rows (%s); falling back to bulk_create, then row by row.",
+                len(chunk),
+                str(e),
+                exc_info=True,
+            )
+    try:
+        with transaction.atomic():
+            Lead.objects.bulk_create(chunk, batch_size=len(chunk))
+        dashboard_aggregates.record_leads_created(chunk)
+        return chunk, []
+    except Exception as e:
+        logger.warning(
+            "Bulk insert failed for %s rows (%s); retrying one-by-one.",
+            len(chunk),
+            str(e),
+        )
+    inserted = []
+    failures = []
+    for idx, lead in enumerate(chunk):
         try:
-            graduation_year = int(float(graduation_year))
-        except (TypeError, ValueError):
-            graduation_year = None
+            with transaction.atomic():
+                lead.save()
+            inserted.append(lead)
+        except Exception as e2:
+            failures.append((idx, str(e2)))
+            logger.error("Error importing row: %s", str(e2), exc_info=True)
+    return inserted, failures
+
+
+def _with_import_pks(leads):
+    """bulk_create may omit pk on some DBs; auto-assign uses bulk_update and needs ids."""
+    if not any(getattr(l, "pk", None) is None for l in leads):
+        return leads
+    lids = [l.lead_id for l in leads if l.lead_id]
+    db_map = {x.lead_id: x for x in Lead.objects.filter(lead_id__in=lids)}
+    return [db_map[l.lead_id] for l in leads if l.lead_id in db_map]
+
+
+def _link_in_batch_duplicates(links):
+    """Point flagged rows at the earlier row of the same batch once both have pks."""
+    flagged = []
+    for dup, original in links:
+        if dup.pk and original.pk:
+            dup.duplicate_of_id = original.pk
+            flagged.append(dup)
+    if flagged:
+        _bulk_update_leads(flagged, ['duplicate_of'])
+
+
+def _assign_import_batch(leads, counsellors, assignment_method, offset):
+    if assignment_method == 'round_robin':
+        return _assign_round_robin(leads, counsellors, offset=offset)
+    if assignment_method == 'workload_balanced':
+        return _assign_workload_balanced(leads, counsellors)
+    if assignment_method == 'weighted_fair':
+        return _assign_weighted_fair(leads, counsellors)
+    if assignment_method == 'performance_based':
+        return _assign_performance_based(leads, counsellors)
+    if assignment_method == 'specialization_based':
+        return _assign_specialization_based(leads, counsellors)
+    return 0
+
+
+def _run_lead_import(rows, source, assigned_counsellor, auto_assign=False,
+                     assignment_method='round_robin', duplicate_policy=ImportJob.DEFAULT_DUPLICATE_POLICY,
+                     on_batch=None, on_error=None):
+    """
+    Stream (row_number, row_dict) pairs into the database in bounded batches.
 
-    alt = row.get("alternate_phone", "")
-    if is_blank_import_value(alt):
-        alternate_phone = ""
-    else:
-        alternate_phone = str(alt).strip()
-
-    is_graduated = "YES" if graduation_status == "YES" else "NO"
-
-    return Lead(
-        lead_id=_new_import_lead_id(),
-        first_name=_import_cell_str(row, "first_name"),
-        last_name=_import_cell_str(row, "last_name"),
-        email=_import_cell_str(row, "email"),
-        phone=_import_cell_str(row, "phone"),
-        alternate_phone=alternate_phone,
-        school_name=_import_cell_str(row, "School Name"),
-        graduation_status=graduation_status,
-        graduation_course=graduation_course,
-        graduation_year=graduation_year,
-        graduation_college=graduation_college,
-        course_interested=_import_cell_str(row, "course_interested"),
-        industry=_import_cell_str(row, "industry"),
-        source=source,
-        assigned_counsellor=assigned_counsellor,
-        is_graduated=is_graduated,
-    )
+    Only one batch of rows / Lead instances is held in memory at a time; each
+    batch is built, bulk-inserted and (optionally) auto-assigned before the next
+    one is read. ``on_batch(summary)`` is called after every batch with the
+    running counts; ``on_error(row_number, message)`` for every rejected row.
+    ``duplicate_policy`` is 'skip' (the default), 'merge', 'flag' or 'allow' (no check).
+    """
+    summary = {
+        'success_count': 0,
+        'error_count': 0,
+        'rows_parsed': 0,
+        'batches': 0,
+        'assigned_count': 0,
+        'assign_error': '',
+        'counsellors_available': False,
+        'duplicates_skipped': 0,
+        'duplicates_merged': 0,
+        'duplicates_flagged': 0,
+    }
 
+    counsellors = []
+    if auto_assign and not assigned_counsellor:
+        counsellors = list(Counsellor.objects.filter(is_active=True))
+        summary['counsellors_available'] = bool(counsellors)
+
+    for batch in iter_row_batches(rows, _lead_import_batch_size()):
+        built, built_rows, row_errors = build_import_batch(batch, source, assigned_counsellor)
+        for error in row_errors:
+            summary['error_count'] += 1
+            logger.warning("Rejected import row %s: %s", error.row_number, error)
+            if on_error is not None:
+                on_error(error.row_number, str(error))
+        summary['rows_parsed'] += len(batch)
+
+        links = []
+        if built and duplicate_policy in ('skip', 'merge', 'flag'):
+            resolved = _resolve_import_duplicates(built, duplicate_policy)
+            summary['duplicates_skipped'] += resolved['skipped']
+            summary['duplicates_merged'] += resolved['merged']
+            summary['duplicates_flagged'] += resolved['flagged']
+            links = [(built[d], built[o]) for d, o in resolved['links']]
+            built = [built[i] for i in resolved['insert']]
+            built_rows = [built_rows[i] for i in resolved['insert']]
+
+        inserted, failures = _insert_import_batch(built) if built else ([], [])
+        if links:
+            _link_in_batch_duplicates(links)
+        summary['success_count'] += len(inserted)
+        summary['error_count'] += len(failures)
+        summary['batches'] += 1
+        if on_error is not None:
+            for idx, message in failures:
+                on_error(built_rows[idx], message)
+
+        if counsellors and inserted and not summary['assign_error']:
+            try:
+                summary['assigned_count'] += _assign_import_batch(
+                    _with_import_pks(inserted),
+                    counsellors,
+                    assignment_method,
+                    summary['assigned_count'],
+                )
+            except Exception as e:
+                logger.exception("Auto-assignment failed during import")
+                summary['assign_error'] = str(e)
+
+        logger.info(
+            "Lead import batch %s: %s rows parsed, %s inserted, %s errors so far",
+            summary['batches'],
+            summary['rows_parsed'],
+            summary['success_count'],
+            summary['error_count'],
+        )
+        if on_batch is not None:
+            on_batch(summary)
 
-def _admin_home_month_key(dt):
-    if dt is None:
-        return None
-    return (dt.year, dt.month)
+    return summary
 
 
-def _fetch_admin_home_cached_payload():
+def _fetch_admin_home_payload():
     """
-    Dashboard aggregates (no ORM querysets — safe to cache).
+    Dashboard aggregates read from the maintained DashboardCounter rows
+    (see dashboard_aggregates); cost does not grow with the number of leads.
     Recent activities are loaded separately each request.
     """
-    # Basic Statistics
-    total_counsellors = Counsellor.objects.filter(is_active=True).count()
-    total_leads = Lead.objects.count()
-    total_business = Lead.objects.filter(status='CLOSED_WON').count()
+    from .dashboard_aggregates import read_counters
 
-    lead_status_counts = Lead.objects.values('status').annotate(
-        count=Count('id')
-    ).values_list('status', 'count')
-    lead_status_dict = dict(lead_status_counts)
+    current_month = timezone.localtime(timezone.now()).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+    # Last 6 calendar months
+    months_6 = []
+    y, mo = current_month.year, current_month.month
+    for _ in range(6):
+        months_6.insert(0, current_month.replace(year=y, month=mo, day=1))
+        mo -= 1
+        if mo < 1:
+            mo = 12
+            y -= 1
+    month_keys = [ms.strftime('%Y-%m') for ms in months_6]
+    this_month = month_keys[-1]
+
+    counters = read_counters(month_keys)
+
+    def counter(metric, key, cast=int):
+        return cast(counters.get(metric, {}).get(key, 0))
+
+    lead_status_dict = {k: int(v) for k, v in counters.get('lead_status', {}).items()}
+    total_leads = sum(lead_status_dict.values())
     new_leads = lead_status_dict.get('NEW', 0)
     contacted_leads = lead_status_dict.get('CONTACTED', 0)
     qualified_leads = lead_status_dict.get('QUALIFIED', 0)
     closed_won = lead_status_dict.get('CLOSED_WON', 0)
     closed_lost = lead_status_dict.get('CLOSED_LOST', 0)
 
-    current_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    monthly_leads = Lead.objects.filter(created_at__gte=current_month).count()
-    monthly_business = Lead.objects.filter(
-        status='CLOSED_WON',
-        created_at__gte=current_month,
-    ).count()
+    total_counsellors = Counsellor.objects.filter(is_active=True).count()
 
-    lead_sources = list(
-        LeadSource.objects.annotate(lead_count=Count('lead')).values('name', 'lead_count')
-    )
+    lead_sources = [
+        {'name': src['name'], 'lead_count': counter('lead_source', str(src['id']))}
+        for src in LeadSource.objects.values('id', 'name')
+    ]
 
-    counsellor_performance = list(
+    counsellor_performance = []
+    for c in (
         Counsellor.objects.filter(is_active=True)
-        .select_related('admin')
-        .annotate(
-            total_leads=Count('lead'),
-            total_business=Sum('business__value'),
-            conversion_rate=Case(
-                When(total_leads=0, then=Value(0.0)),
-                default=Count('business') * 100.0 / Count('lead'),
-                output_field=DecimalField(),
-            ),
-        )
-        .values(
-            'admin__first_name',
-            'admin__last_name',
-            'total_leads',
-            'total_business',
-            'conversion_rate',
-        )
-    )
+        .values('id', 'admin__first_name', 'admin__last_name')
+    ):
+        key = str(c['id'])
+        c_leads = counter('counsellor_leads', key)
+        c_business = counter('counsellor_business', key)
+        value = counters.get('counsellor_business_value', {}).get(key)
+        counsellor_performance.append({
+            'admin__first_name': c['admin__first_name'],
+            'admin__last_name': c['admin__last_name'],
+            'total_leads': c_leads,
+            'total_business': value,
+            'conversion_rate': round(c_business * 100.0 / c_leads, 2) if c_leads else 0.0,
+        })
 
     lead_status_data = {
         'NEW': new_leads,
@@ -174,56 +397,26 @@ def _fetch_admin_home_cached_payload():
         'CLOSED_LOST': closed_lost,
     }
 
-    # Last 6 calendar months — two queries (leads + business) instead of 12 range filters
-    anchor = current_month
-    months_6 = []
-    y, mo = anchor.year, anchor.month
-    for _ in range(6):
-        months_6.insert(0, anchor.replace(year=y, month=mo, day=1))
-        mo -= 1
-        if mo < 1:
-            mo = 12
-            y -= 1
-    oldest = months_6[0]
-
-    lead_map = {}
-    for row in (
-        Lead.objects.filter(created_at__gte=oldest)
-        .annotate(m=TruncMonth('created_at'))
-        .values('m')
-        .annotate(cnt=Count('id'))
-    ):
-        lead_map[_admin_home_month_key(row['m'])] = row['cnt']
-
-    biz_map = {}
-    for row in (
-        Business.objects.filter(created_at__gte=oldest, status='ACTIVE')
-        .annotate(m=TruncMonth('created_at'))
-        .values('m')
-        .annotate(total=Sum('value'))
-    ):
-        biz_map[_admin_home_month_key(row['m'])] = float(row['total'] or 0)
-
-    monthly_trend = []
-    for ms in months_6:
-        mk = (ms.year, ms.month)
-        monthly_trend.append({
+    monthly_trend = [
+        {
             'month': ms.strftime('%B %Y'),
-            'leads': lead_map.get(mk, 0),
-            'business': biz_map.get(mk, 0.0),
-        })
+            'leads': counter('lead_month', mk),
+            'business': counter('business_month', mk, float),
+        }
+        for ms, mk in zip(months_6, month_keys)
+    ]
 
     return {
         'total_counsellors': total_counsellors,
         'total_leads': total_leads,
-        'total_business': total_business,
+        'total_business': closed_won,
         'new_leads': new_leads,
         'contacted_leads': contacted_leads,
         'qualified_leads': qualified_leads,
         'closed_won': closed_won,
         'closed_lost': closed_lost,
-        'monthly_leads': monthly_leads,
-        'monthly_business': monthly_business,
+        'monthly_leads': counter('lead_month', this_month),
+        'monthly_business': counter('won_month', this_month),
         'lead_sources': lead_sources,
         'counsellor_performance': counsellor_performance,
         'lead_status_data': lead_status_data,
@@ -234,19 +427,10 @@ def _fetch_admin_home_cached_payload():
 @admin_required
 def admin_home(request):
     """Admin Dashboard with comprehensive CRM analytics"""
-    ttl = int(getattr(settings, 'ADMIN_DASHBOARD_CACHE_SECONDS', 45))
-    cache_key = 'crm:admin_home_dashboard_v2'
-
     try:
-        if ttl > 0:
-            payload = cache.get(cache_key)
-            if payload is None:
-                payload = _fetch_admin_home_cached_payload()
-                cache.set(cache_key, payload, ttl)
-        else:
-            payload = _fetch_admin_home_cached_payload()
+        payload = _fetch_admin_home_payload()
     except Exception:
-        logger.exception('admin_home cache/compute failed')
+        logger.exception('admin_home aggregates failed')
         payload = None
 
     if payload is None:
@@ -284,14 +468,15 @@ def admin_home(request):
 @admin_required
 def counsellor_activity_progress_report(request):
     """Per-counsellor pipeline, daily target, and activity metrics (separate from dashboard)."""
-    counsellor_activity_progress = []
-    for c in Counsellor.objects.filter(is_active=True).select_related('admin').order_by(
-        'admin__first_name', 'admin__last_name'
-    ):
-        counsellor_activity_progress.append({
-            'counsellor': c,
-            'progress': get_counsellor_activity_snapshot(c),
-        })
+    counsellors = list(
+        Counsellor.objects.filter(is_active=True).select_related('admin').order_by(
+            'admin__first_name', 'admin__last_name'
+        )
+    )
+    snapshots = get_counsellor_activity_snapshots(counsellors)
+    counsellor_activity_progress = [
+        {'counsellor': c, 'progress': snapshots[c.pk]} for c in counsellors
+    ]
     return render(
         request,
         'admin_template/counsellor_activity_progress.html',
@@ -372,6 +557,9 @@ def edit_counsellor(request, counsellor_id):
                 counsellor.employee_id = form.cleaned_data['employee_id']
                 counsellor.department = form.cleaned_data['department']
                 counsellor.is_active = form.cleaned_data['is_active']
+                counsellor.lead_capacity = form.cleaned_data['lead_capacity']
+                counsellor.lead_view_alert_threshold = form.cleaned_data['lead_view_alert_threshold']
+                counsellor.phone_reveal_alert_threshold = form.cleaned_data['phone_reveal_alert_threshold']
                 counsellor.save()
                 
                 messages.success(request, "Counsellor updated successfully!")
@@ -514,16 +702,9 @@ def manage_leads(request):
     counsellor_filter = request.GET.get('counsellor', '')
     source_filter = request.GET.get('source', '')
     
-    # Apply search filter
+    # Apply search filter (indexed: name, email, lead id, phone digits)
     if search_query:
-            leads_list = leads_list.filter(
-                Q(first_name__icontains=search_query) |
-                Q(last_name__icontains=search_query) |
-                Q(email__icontains=search_query) |
-                Q(phone__icontains=search_query) |
-                Q(alternate_phone__icontains=search_query) |
-                Q(lead_id__icontains=search_query)
-            )
+        leads_list = lead_search.search_leads(leads_list, search_query)
     
     # Apply status filter
     if status_filter:
@@ -576,15 +757,15 @@ def manage_leads(request):
     status_display = dict(LeadStatus.get_all_choices()).get(status_filter, status_filter) if status_filter else ''
     priority_display = dict(Lead.PRIORITY).get(priority_filter, priority_filter) if priority_filter else ''
     
-    # Paginate server-side to keep page load fast even with many leads
-    leads = paginate_queryset(request, leads_list, 50)
+    # Keyset pagination on (created_at, id): every page costs the same as the first
+    leads = keyset_paginate(request, leads_list, 50)
 
     # Preserve current filters in pagination links
     query_params = request.GET.copy()
-    if 'page' in query_params:
-        del query_params['page']
+    for param in ('page', 'cursor'):
+        query_params.pop(param, None)
     query_string = query_params.urlencode()
-    total_leads_in_system = Lead.objects.count()
+    total_leads_in_system = estimated_count(Lead.objects.all())
     context = {
         'leads': leads,
         'total_leads_in_system': total_leads_in_system,
@@ -656,7 +837,6 @@ def delete_lead(request, lead_id):
     lead = get_object_or_404(Lead, id=lead_id)
     try:
         lead.delete()
-        cache.delete('crm:admin_home_dashboard_v2')
         messages.success(request, "Lead deleted successfully!")
     except Exception as e:
         messages.error(request, f"Could not delete lead: {str(e)}")
@@ -677,8 +857,7 @@ def bulk_delete_leads(request):
     count = leads_qs.count()
 
     try:
-        leads_qs.delete()
-        cache.delete('crm:admin_home_dashboard_v2')
+        _delete_leads(leads_qs)
         messages.success(request, f"Successfully deleted {count} lead(s).")
     except Exception as e:
         messages.error(request, f"Could not delete selected leads: {str(e)}")
@@ -710,8 +889,7 @@ def delete_all_leads(request):
         if n == 0:
             messages.info(request, 'There are no leads to delete.')
             return redirect(reverse('manage_leads'))
-        Lead.objects.all().delete()
-        cache.delete('crm:admin_home_dashboard_v2')
+        _delete_leads(Lead.objects.all())
         messages.success(request, f'Successfully deleted all {n} lead(s).')
     except Exception as e:
         logger.exception('delete_all_leads failed')
@@ -739,90 +917,21 @@ def import_leads(request):
                     messages.error(request, f"File too large. Max size is {max_size_mb}MB.")
                     return redirect(reverse('import_leads'))
                 
-                success_count = 0
-                error_count = 0
-                imported_leads = []
-                pending = []
-                batch_size = max(50, int(getattr(settings, "LEAD_IMPORT_BATCH_SIZE", 400)))
-
-                for row_num, row in iter_lead_import_rows(file, file.name):
-                    try:
-                        pending.append(
-                            _build_lead_from_import_row(row, source, assigned_counsellor)
-                        )
-                    except Exception as e:
-                        error_count += 1
-                        logger.error(
-                            "Error parsing import row %s: %s",
-                            row_num,
-                            str(e),
-                            exc_info=True,
-                        )
-
-                for i in range(0, len(pending), batch_size):
-                    chunk = pending[i : i + batch_size]
-                    try:
-                        with transaction.atomic():
-                            Lead.objects.bulk_create(chunk, batch_size=batch_size)
-                        imported_leads.extend(chunk)
-                        success_count += len(chunk)
-                    except Exception as e:
-                        logger.warning(
-                            "Bulk insert failed for %s rows (%s); retrying one-by-one.",
-                            len(chunk),
-                            str(e),
-                        )
-                        for lead in chunk:
-                            try:
-                                with transaction.atomic():
-                                    lead.save()
-                                imported_leads.append(lead)
-                                success_count += 1
-                            except Exception as e2:
-                                error_count += 1
-                                logger.error("Error importing row: %s", str(e2), exc_info=True)
-
-                # bulk_create may omit pk on some DBs; auto-assign uses bulk_update and needs ids
-                if auto_assign and imported_leads:
-                    if any(getattr(l, "pk", None) is None for l in imported_leads):
-                        lids = [l.lead_id for l in imported_leads if l.lead_id]
-                        db_map = {
-                            x.lead_id: x for x in Lead.objects.filter(lead_id__in=lids)
-                        }
-                        imported_leads = [
-                            db_map[l.lead_id]
-                            for l in imported_leads
-                            if l.lead_id in db_map
-                        ]
-
-                # Auto-assign leads if requested
-                if auto_assign and imported_leads and not assigned_counsellor:
-                    try:
-                        active_counsellors = Counsellor.objects.filter(is_active=True)
-                        if active_counsellors.exists():
-                            unassigned_leads = [lead for lead in imported_leads if not lead.assigned_counsellor]
-                            
-                            if assignment_method == 'round_robin':
-                                _assign_round_robin(unassigned_leads, active_counsellors)
-                            elif assignment_method == 'workload_balanced':
-                                _assign_workload_balanced(unassigned_leads, active_counsellors)
-                            elif assignment_method == 'performance_based':
-                                _assign_performance_based(unassigned_leads, active_counsellors)
-                            elif assignment_method == 'specialization_based':
-                                _assign_specialization_based(unassigned_leads, active_counsellors)
-                            
-                            messages.success(request, f"Successfully imported {success_count} leads and auto-assigned them using {assignment_method.replace('_', ' ').title()} method. {error_count} errors occurred.")
-                        else:
-                            messages.warning(request, f"Successfully imported {success_count} leads but no active counsellors found for auto-assignment. {error_count} errors occurred.")
-                    except Exception as e:
-                        messages.warning(request, f"Successfully imported {success_count} leads but auto-assignment failed: {str(e)}. {error_count} errors occurred.")
-                else:
-                    if error_count > 0:
-                        messages.warning(request, f"Successfully imported {success_count} leads. {error_count} rows had errors and were skipped.")
-                    else:
-                        messages.success(request, f"Successfully imported {success_count} leads.")
-                
-                return redirect(reverse('manage_leads'))
+                job = ImportJob.objects.create(
+                    file=file,
+                    original_filename=file.name,
+                    source=source,
+                    assigned_counsellor=assigned_counsellor,
+                    auto_assign=bool(auto_assign),
+                    assignment_method=assignment_method,
+                    duplicate_policy=(
+                        form.cleaned_data.get('duplicate_policy') or ImportJob.DEFAULT_DUPLICATE_POLICY
+                    ),
+                    created_by=request.user,
+                )
+                _dispatch_import_job(job)
+                messages.info(request, f"Import of {file.name} started. This page updates as rows are processed.")
+                return redirect(reverse('import_job_detail', kwargs={'job_id': job.pk}))
                 
             except Exception as e:
                 logger.exception("Lead import failed")
@@ -830,16 +939,98 @@ def import_leads(request):
         else:
             messages.error(request, "Please fill the form properly!")
     
+    context['recent_jobs'] = ImportJob.objects.select_related('source', 'created_by')[:10]
     return render(request, 'admin_template/import_leads.html', context)
 
 
+def _dispatch_import_job(job):
+    """
+    Queue the import on Celery (the upload is in storage the worker can read, see
+    import_storage.py). With LEAD_IMPORT_ASYNC off, or if the broker refuses the task,
+    it runs inline in this request instead.
+    """
+    from .tasks import run_lead_import_job
+
+    if getattr(settings, 'LEAD_IMPORT_ASYNC', False):
+        try:
+            run_lead_import_job.delay(job.pk)
+            return
+        except Exception:
+            logger.exception("Could not queue import job %s; running inline", job.pk)
+    run_lead_import_job(job.pk)
+
+
+def _import_job_progress_payload(job):
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'finished': job.is_finished,
+        'rows_parsed': job.rows_parsed,
+        'rows_inserted': job.rows_inserted,
+        'rows_failed': job.rows_failed,
+        'rows_assigned': job.rows_assigned,
+        'rows_skipped': job.rows_skipped,
+        'rows_merged': job.rows_merged,
+        'rows_flagged': job.rows_flagged,
+        'batches': job.batches,
+        'elapsed_seconds': round(job.elapsed_seconds(), 1),
+        'rows_per_second': job.rows_per_second(),
+        'message': job.message,
+        'error_report_url': (
+            reverse('download_import_error_report', kwargs={'job_id': job.pk})
+            if job.error_report else ''
+        ),
+    }
+
+
+@admin_required
+def import_job_detail(request, job_id):
+    """Progress page for a background lead import (polls import_job_progress)."""
+    job = get_object_or_404(ImportJob.objects.select_related('source', 'assigned_counsellor__admin'), id=job_id)
+    context = {
+        'job': job,
+        'progress': _import_job_progress_payload(job),
+        'page_title': 'Import Progress',
+    }
+    return render(request, 'admin_template/import_job_detail.html', context)
+
+
+@admin_required
+def import_job_progress(request, job_id):
+    """JSON progress for a background lead import."""
+    job = get_object_or_404(ImportJob, id=job_id)
+    return JsonResponse(_import_job_progress_payload(job))
+
+
+@admin_required
+def download_import_error_report(request, job_id):
+    """Download the per-row error CSV of an import job."""
+    from django.http import FileResponse
+
+    job = get_object_or_404(ImportJob, id=job_id)
+    if not job.error_report:
+        return HttpResponse('No errors recorded for this import', status=404)
+    try:
+        report = job.error_report.open('rb')
+    except FileNotFoundError:
+        return HttpResponse('The error report is no longer available', status=404)
+    response = FileResponse(report, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="import_{job.pk}_errors.csv"'
+    return response
+
+
 @admin_required
 def assign_leads_to_counsellors(request):
     """Automatically assign unassigned leads to counsellors using multiple strategies"""
     if request.method == 'POST':
         try:
             assignment_method = request.POST.get('assignment_method', 'round_robin')
-            unassigned_leads = Lead.objects.filter(assigned_counsellor__isnull=True)
+            # Only the columns the strategies read; 100k full rows would dominate memory.
+            unassigned_leads = (
+                Lead.objects.filter(assigned_counsellor__isnull=True)
+                .only('id', 'industry', 'source_id', 'assigned_counsellor_id', 'status', 'created_at')
+            )
             active_counsellors = Counsellor.objects.filter(is_active=True)
             
             if not active_counsellors.exists():
@@ -856,6 +1047,8 @@ def assign_leads_to_counsellors(request):
                 assigned_count = _assign_round_robin(unassigned_leads, active_counsellors)
             elif assignment_method == 'workload_balanced':
                 assigned_count = _assign_workload_balanced(unassigned_leads, active_counsellors)
+            elif assignment_method == 'weighted_fair':
+                assigned_count = _assign_weighted_fair(unassigned_leads, active_counsellors)
             elif assignment_method == 'performance_based':
                 assigned_count = _assign_performance_based(unassigned_leads, active_counsellors)
             elif assignment_method == 'specialization_based':
@@ -927,8 +1120,83 @@ def assign_leads_to_counsellors(request):
         return redirect(reverse('manage_leads'))
 
 
-def _assign_round_robin(unassigned_leads, active_counsellors):
-    """Round-robin assignment - distribute leads evenly"""
+def _bulk_update_leads(leads, fields):
+    """bulk_update in LEAD_BULK_UPDATE_BATCH_SIZE chunks so no single UPDATE grows unbounded."""
+    batch_size = max(50, int(getattr(settings, 'LEAD_BULK_UPDATE_BATCH_SIZE', 500)))
+    fields = lead_search.refresh(leads, fields)
+    Lead.objects.bulk_update(leads, fields, batch_size=batch_size)
+    if {'status', 'assigned_counsellor', 'next_follow_up'} & set(fields):
+        counsellor_ids = set()
+        for lead in leads:
+            loaded = getattr(lead, '_loaded_values', None) or {}
+            counsellor_ids.update((lead.assigned_counsellor_id, loaded.get('assigned_counsellor_id')))
+        daily_task_queue.rebuild(counsellor_ids)
+    if {'assigned_counsellor', 'next_follow_up'} & set(fields):
+        calendar_feed.record_leads_changed(leads)
+    if {'status', 'source', 'assigned_counsellor'} & set(fields):
+        dashboard_aggregates.record_lead_updates(leads)
+
+
+def _delete_leads(leads_qs):
+    """
+    Delete the leads of ``leads_qs`` and everything that cascades from them.
+
+    The cascade runs with the per-row LeadActivity receivers muted (see
+    ``activity_receivers_muted``): instead of refreshing the badge, calendar and daily
+    queue once per activity, they are refreshed once per affected counsellor here.
+    Lead and Business receivers still run, inside the dashboard / calendar batches.
+    Returns the number of leads deleted.
+    """
+    from .badge_counts import invalidate_pending_tasks
+
+    activities = LeadActivity.objects.filter(lead_id__in=leads_qs.values('id'))
+    counsellor_ids, moments, completed = set(), set(), set()
+    for counsellor_id, scheduled, is_completed in (
+        activities.values_list('counsellor_id', 'scheduled_date', 'is_completed').iterator()
+    ):
+        counsellor_ids.add(counsellor_id)
+        moments.add(scheduled)
+        if is_completed:
+            completed.add(counsellor_id)
+
+    # Each deleted lead's follow-up week is collected by calendar_feed.batched() and dropped on exit.
+    with calendar_feed.batched():
+        with transaction.atomic(), dashboard_aggregates.batched(), activity_receivers_muted():
+            _, per_model = leads_qs.delete()
+        calendar_feed.invalidate(counsellor_ids, moments)
+
+    invalidate_pending_tasks(counsellor_ids)
+    daily_task_queue.refresh_completed_counts(completed)
+    return per_model.get(Lead._meta.label, 0)
+
+
+def _assign_from_heap(leads, heap, next_key):
+    """
+    Pop the best counsellor for each lead from a heap of (key..., seq, counsellor)
+    entries and push it back with ``next_key(key)``: O(n log k) for n leads, k counsellors.
+    The monotonically increasing seq breaks ties first-in-first-out.
+    """
+    seq = len(heap)
+    for lead in leads:
+        entry = heapq.heappop(heap)
+        counsellor = entry[-1]
+        lead.assigned_counsellor = counsellor
+        heapq.heappush(heap, (*next_key(entry[:-2]), seq, counsellor))
+        seq += 1
+
+
+def _counsellor_workloads(active_counsellors):
+    workload_qs = (
+        Lead.objects
+        .filter(assigned_counsellor__in=active_counsellors)
+        .values('assigned_counsellor')
+        .annotate(count=Count('id'))
+    )
+    return {row['assigned_counsellor']: row['count'] for row in workload_qs}
+
+
+def _assign_round_robin(unassigned_leads, active_counsellors, offset=0):
+    """Round-robin assignment - distribute leads evenly (``offset`` continues a previous run)"""
     counsellor_list = list(active_counsellors)
     if not counsellor_list:
         return 0
@@ -938,10 +1206,9 @@ def _assign_round_robin(unassigned_leads, active_counsellors):
         return 0
 
     for i, lead in enumerate(leads):
-        lead.assigned_counsellor = counsellor_list[i % len(counsellor_list)]
+        lead.assigned_counsellor = counsellor_list[(offset + i) % len(counsellor_list)]
 
-    # Single bulk update instead of per-lead saves
-    Lead.objects.bulk_update(leads, ['assigned_counsellor'])
+    _bulk_update_leads(leads, ['assigned_counsellor'])
     return len(leads)
 
 
@@ -955,37 +1222,48 @@ def _assign_workload_balanced(unassigned_leads, active_counsellors):
     if not leads:
         return 0
 
-    # Get current workload for each counsellor in a single query
-    from django.db.models import Count
+    workload_map = _counsellor_workloads(active_counsellors)
 
-    workload_qs = (
-        Lead.objects
-        .filter(assigned_counsellor__in=active_counsellors)
-        .values('assigned_counsellor')
-        .annotate(count=Count('id'))
-    )
-    workload_map = {row['assigned_counsellor']: row['count'] for row in workload_qs}
+    # Min-heap on current lead count
+    heap = [
+        (workload_map.get(c.id, 0), seq, c)
+        for seq, c in enumerate(active_counsellors)
+    ]
+    heapq.heapify(heap)
+    _assign_from_heap(leads, heap, lambda key: (key[0] + 1,))
 
-    counsellor_workload = []
-    for counsellor in active_counsellors:
-        counsellor_workload.append({
-            'counsellor': counsellor,
-            'lead_count': workload_map.get(counsellor.id, 0),
-        })
+    _bulk_update_leads(leads, ['assigned_counsellor'])
+    return len(leads)
 
-    # Sort counsellors by workload (ascending)
-    counsellor_workload.sort(key=lambda x: x['lead_count'])
 
-    for lead in leads:
-        # Assign to counsellor with least workload
-        target = counsellor_workload[0]
-        lead.assigned_counsellor = target['counsellor']
+def _assign_weighted_fair(unassigned_leads, active_counsellors):
+    """
+    Weighted-fair assignment - share leads in proportion to each counsellor's
+    ``lead_capacity``: always pick the lowest (current leads + 1) / capacity.
+    """
+    active_counsellors = [c for c in active_counsellors if c.lead_capacity > 0]
+    if not active_counsellors:
+        return 0
 
-        # Update workload count in memory
-        target['lead_count'] += 1
-        counsellor_workload.sort(key=lambda x: x['lead_count'])
+    leads = list(unassigned_leads)
+    if not leads:
+        return 0
+
+    workload_map = _counsellor_workloads(active_counsellors)
+
+    # Key: (virtual finish ratio, current load, capacity)
+    heap = []
+    for seq, c in enumerate(active_counsellors):
+        load = workload_map.get(c.id, 0)
+        heap.append(((load + 1) / c.lead_capacity, load, c.lead_capacity, seq, c))
+    heapq.heapify(heap)
+    _assign_from_heap(
+        leads,
+        heap,
+        lambda key: ((key[1] + 2) / key[2], key[1] + 1, key[2]),
+    )
 
-    Lead.objects.bulk_update(leads, ['assigned_counsellor'])
+    _bulk_update_leads(leads, ['assigned_counsellor'])
     return len(leads)
 
 
@@ -999,8 +1277,6 @@ def _assign_performance_based(unassigned_leads, active_counsellors):
     if not leads:
         return 0
 
-    from django.db.models import Count
-
     # Aggregate total leads and closed-won per counsellor in as few queries as possible
     lead_stats = (
         Lead.objects
@@ -1019,40 +1295,27 @@ def _assign_performance_based(unassigned_leads, active_counsellors):
         if status == 'CLOSED_WON':
             perf['won'] += count
 
-    counsellor_performance = []
-    for counsellor in active_counsellors:
+    # Heap ordered by conversion rate (descending) and then by total leads (ascending)
+    heap = []
+    for seq, counsellor in enumerate(active_counsellors):
         stats = performance_map.get(counsellor.id, {'total': 0, 'won': 0})
         total_leads = stats['total']
         closed_won = stats['won']
         conversion_rate = (closed_won / total_leads * 100) if total_leads > 0 else 0
-        counsellor_performance.append({
-            'counsellor': counsellor,
-            'conversion_rate': conversion_rate,
-            'total_leads': total_leads,
-        })
+        heap.append((-conversion_rate, total_leads, seq, counsellor))
+    heapq.heapify(heap)
+    _assign_from_heap(leads, heap, lambda key: (key[0], key[1] + 1))
 
-    # Sort by conversion rate (descending) and then by total leads (ascending)
-    counsellor_performance.sort(
-        key=lambda x: (-x['conversion_rate'], x['total_leads'])
-    )
-
-    for lead in leads:
-        # Assign to top-performing counsellor
-        target = counsellor_performance[0]
-        lead.assigned_counsellor = target['counsellor']
-
-        # Update lead count in memory and re-sort
-        target['total_leads'] += 1
-        counsellor_performance.sort(
-            key=lambda x: (-x['conversion_rate'], x['total_leads'])
-        )
-
-    Lead.objects.bulk_update(leads, ['assigned_counsellor'])
+    _bulk_update_leads(leads, ['assigned_counsellor'])
     return len(leads)
 
 
 def _assign_specialization_based(unassigned_leads, active_counsellors):
     """Specialization-based assignment - assign based on counsellor expertise"""
+    from .assignment_affinity import (
+        WORKLOAD_PENALTY, affinity_scores, get_affinity_matrix, record_assignments,
+    )
+
     active_counsellors = list(active_counsellors)
     if not active_counsellors:
         return 0
@@ -1061,83 +1324,33 @@ def _assign_specialization_based(unassigned_leads, active_counsellors):
     if not leads:
         return 0
 
-    # Get counsellor specializations (based on department and past performance)
-    counsellor_specializations = {}
-
-    # Prefetch all leads for the active counsellors in a single query
-    counsellor_leads_qs = Lead.objects.filter(
-        assigned_counsellor__in=active_counsellors
-    ).select_related('source')
-
-    leads_by_counsellor = {}
-    for lead in counsellor_leads_qs:
-        leads_by_counsellor.setdefault(lead.assigned_counsellor_id, []).append(lead)
-
-    for counsellor in active_counsellors:
-        industry_success = {}
-        source_success = {}
-        clist = leads_by_counsellor.get(counsellor.id, [])
-
-        for l in clist:
-            if l.industry:
-                stats = industry_success.setdefault(
-                    l.industry, {'total': 0, 'won': 0}
-                )
-                stats['total'] += 1
-                if l.status == 'CLOSED_WON':
-                    stats['won'] += 1
-
-            if l.source:
-                stats = source_success.setdefault(
-                    l.source_id, {'total': 0, 'won': 0}
-                )
-                stats['total'] += 1
-                if l.status == 'CLOSED_WON':
-                    stats['won'] += 1
-
-        counsellor_specializations[counsellor.id] = {
-            'counsellor': counsellor,
-            'industry_success': industry_success,
-            'source_success': source_success,
-            'current_workload': len(clist),
-        }
+    # Industry / source success rates come from the cached SQL-aggregated matrix
+    counsellor_ids = [c.id for c in active_counsellors]
+    matrix = get_affinity_matrix(counsellor_ids)
+    workload_map = _counsellor_workloads(active_counsellors)
+    workload = [workload_map.get(cid, 0) for cid in counsellor_ids]
 
+    # Leads sharing (industry, source) share one score vector: score it once, then
+    # hand the group out from a heap where only the chosen counsellor's score moves.
+    groups = {}
     for lead in leads:
-        best_counsellor = None
-        best_score = -1
-
-        for counsellor_data in counsellor_specializations.values():
-            score = 0
-
-            # Industry expertise bonus
-            if lead.industry and lead.industry in counsellor_data['industry_success']:
-                stats = counsellor_data['industry_success'][lead.industry]
-                success_rate = stats['won'] / stats['total'] if stats['total'] else 0
-                score += success_rate * 100
-
-            # Source expertise bonus
-            if lead.source and lead.source.id in counsellor_data['source_success']:
-                stats = counsellor_data['source_success'][lead.source.id]
-                success_rate = stats['won'] / stats['total'] if stats['total'] else 0
-                score += success_rate * 50
-
-            # Workload penalty (prefer counsellors with fewer leads)
-            workload_penalty = counsellor_data['current_workload'] * 2
-            score -= workload_penalty
-
-            if score > best_score:
-                best_score = score
-                best_counsellor = counsellor_data['counsellor']
-
-        if best_counsellor:
-            lead.assigned_counsellor = best_counsellor
-            # Update workload in memory
-            data = counsellor_specializations.get(best_counsellor.id)
-            if data:
-                data['current_workload'] += 1
-
-    # Persist all assignments in a single bulk update
-    Lead.objects.bulk_update(leads, ['assigned_counsellor'])
+        groups.setdefault((lead.industry or '', lead.source_id), []).append(lead)
+
+    for (industry, source_id), group in groups.items():
+        bonus = affinity_scores(matrix, counsellor_ids, industry, source_id)
+        heap = [
+            (-(bonus[pos] - workload[pos] * WORKLOAD_PENALTY), pos, pos)
+            for pos in range(len(counsellor_ids))
+        ]
+        heapq.heapify(heap)
+        for lead in group:
+            neg_score, seq, pos = heapq.heappop(heap)
+            lead.assigned_counsellor = active_counsellors[pos]
+            workload[pos] += 1
+            heapq.heappush(heap, (neg_score + WORKLOAD_PENALTY, seq, pos))
+
+    _bulk_update_leads(leads, ['assigned_counsellor'])
+    record_assignments(leads)
     return len(leads)
 
 
@@ -1549,6 +1762,8 @@ def update_daily_target(request, target_id):
             raise ValueError("Must be at least 1")
         target.target_count = new_count
         target.save()
+        # Today's materialised queues are cut to the old count; rebuild them at the new one.
+        daily_task_queue.rebuild(target.assignments.values_list('counsellor_id', flat=True))
         messages.success(request, f"Target updated to {new_count} tasks for {target.target_date}.")
     except (ValueError, TypeError) as e:
         messages.error(request, f"Invalid value: {e}")
@@ -1650,7 +1865,7 @@ def send_counsellor_notification(request):
 @admin_required
 def admin_view_profile(request):
     """Admin profile view"""
-    admin = get_object_or_404(Admin, admin=request.user)
+    admin = admin_profile_or_404(request)
     context = {
         'admin': admin,
         'page_title': 'Admin Profile'
@@ -1658,6 +1873,15 @@ def admin_view_profile(request):
     return render(request, 'admin_template/admin_view_profile.html', context)
 
 
+@admin_required
+@admin_perm_required('settings')
+def data_access_log_metrics(request):
+    """JSON buffer metrics of the DataAccessLog writer: this process and every published snapshot."""
+    from .access_log import metrics, published_metrics
+
+    return JsonResponse({'this_process': metrics(), 'processes': published_metrics()})
+
+
 @admin_required
 def admin_view_notifications(request):
     """View admin notifications"""
@@ -1831,108 +2055,12 @@ def manual_route_student(request, lead_id):
 
 @admin_required
 def get_admin_calendar_events(request):
-    """API endpoint to get calendar events for all leads (admin view)"""
-    # Get date range from request (optional)
-    start_date_str = request.GET.get('start')
-    end_date_str = request.GET.get('end')
-    
-    events = []
-    
-    # Parse dates if provided
-    start_date = None
-    end_date = None
-    if start_date_str:
-        try:
-            start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
-            if timezone.is_naive(start_date):
-                start_date = timezone.make_aware(start_date)
-        except (ValueError, AttributeError):
-            pass
-    
-    if end_date_str:
-        try:
-            end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-            if timezone.is_naive(end_date):
-                end_date = timezone.make_aware(end_date)
-        except (ValueError, AttributeError):
-            pass
-    
-    # Get scheduled activities for all leads
-    activities_query = LeadActivity.objects.filter(
-        scheduled_date__isnull=False
-    ).select_related('lead', 'counsellor__admin')
-    
-    if start_date and end_date:
-        activities_query = activities_query.filter(
-            scheduled_date__gte=start_date,
-            scheduled_date__lte=end_date
-        )
-    
-    for activity in activities_query:
-        if activity.scheduled_date:
-            start_iso = activity.scheduled_date.isoformat()
-            end_iso = None
-            if activity.duration:
-                end_time = activity.scheduled_date + timedelta(minutes=activity.duration)
-                end_iso = end_time.isoformat()
-            else:
-                end_time = activity.scheduled_date + timedelta(hours=1)
-                end_iso = end_time.isoformat()
-            
-            activity_type_display = dict(ActivityType.get_all_choices()).get(activity.activity_type, activity.activity_type)
-            counsellor_name = f"{activity.counsellor.admin.first_name} {activity.counsellor.admin.last_name}" if activity.counsellor else "Unassigned"
-            
-            events.append({
-                'id': f'activity_{activity.id}',
-                'title': f"{activity_type_display}: {activity.lead.first_name} {activity.lead.last_name}",
-                'start': start_iso,
-                'end': end_iso,
-                'color': '#007bff',  # Blue for activities
-                'textColor': '#ffffff',
-                'extendedProps': {
-                    'type': 'activity',
-                    'lead_name': f"{activity.lead.first_name} {activity.lead.last_name}",
-                    'counsellor_name': counsellor_name,
-                    'description': activity.description or 'No description',
-                    'activity_id': activity.id,
-                    'lead_id': activity.lead.id,
-                }
-            })
-    
-    # Get follow-ups from all leads
-    followups_query = Lead.objects.filter(
-        next_follow_up__isnull=False
-    ).select_related('source', 'assigned_counsellor__admin')
-    
-    if start_date and end_date:
-        followups_query = followups_query.filter(
-            next_follow_up__gte=start_date,
-            next_follow_up__lte=end_date
-        )
-    
-    for lead in followups_query:
-        if lead.next_follow_up:
-            followup_date = lead.next_follow_up.date()
-            counsellor_name = f"{lead.assigned_counsellor.admin.first_name} {lead.assigned_counsellor.admin.last_name}" if lead.assigned_counsellor else "Unassigned"
-            
-            events.append({
-                'id': f'followup_{lead.id}',
-                'title': f"Follow-up: {lead.first_name} {lead.last_name}",
-                'start': followup_date.isoformat(),
-                'allDay': True,
-                'color': '#28a745',  # Green for follow-ups
-                'textColor': '#ffffff',
-                'extendedProps': {
-                    'type': 'followup',
-                    'lead_name': f"{lead.first_name} {lead.last_name}",
-                    'counsellor_name': counsellor_name,
-                    'lead_id': lead.id,
-                    'course_interested': lead.course_interested or 'N/A',
-                    'school_name': lead.school_name or 'N/A',
-                }
-            })
-    
-    return JsonResponse(events, safe=False)
+    """API endpoint to get calendar events for all leads (admin view) between ?start= and ?end="""
+    try:
+        start, end = calendar_feed.parse_range(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(calendar_feed.events(calendar_feed.ALL, start, end), safe=False)
 
 
 @admin_required
@@ -2033,16 +2161,29 @@ def counsellor_work_view(request):
         activities_query = activities_query.filter(lead__priority=lead_priority_f)
         followups_query = followups_query.filter(priority=lead_priority_f)
 
-    total_activities = activities_query.count()
-    completed_activities = activities_query.filter(is_completed=True).count()
-    pending_activities = activities_query.filter(is_completed=False).count()
+    activity_counts = activities_query.order_by().aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(is_completed=True)),
+    )
+    total_activities = activity_counts['total']
+    completed_activities = activity_counts['completed']
+    pending_activities = total_activities - completed_activities
     total_followups = followups_query.count()
 
-    activities = paginate_queryset(request, activities_query, 50)
+    # Newest first by the activity's own date (scheduled, else when it was logged);
+    # activity_date_id_idx serves this order and the cursor seek.
+    activities = keyset_paginate(
+        request,
+        activities_query.annotate(activity_date=LeadActivity.ACTIVITY_DATE),
+        50,
+        keys=('-activity_date', '-id'),
+        total=total_activities,
+    )
     followups = followups_query[:100]
 
     filter_params = request.GET.copy()
     filter_params.pop('page', None)
+    filter_params.pop('cursor', None)
     filter_query = filter_params.urlencode()
 
     selected_source_name = ''
@@ -0,0 +1,107 @@
+"""
+Counsellor x feature affinity matrix for specialization-based lead assignment.
+
+Won/total counts per (industry, counsellor) and (source, counsellor) are aggregated
+in SQL and cached as a compact nested dict, so an assignment run never loads lead
+history into Python. Assignment runs and Lead status changes into or out of
+CLOSED_WON (see the post_save receiver in models.py) bump a generation counter
+with an atomic cache.incr; a matrix built under an older generation is rebuilt on
+its next read. The build reads the generation before aggregating, so a change that
+lands during a rebuild still invalidates it. Other drift (manual transfers, edited
+industries) is bounded by the cache timeout.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+CACHE_KEY = "crm:assignment_affinity:v1"
+GENERATION_KEY = "crm:assignment_affinity:generation"
+WON_STATUS = "CLOSED_WON"
+# Score weights, as in the original per-lead loop.
+INDUSTRY_WEIGHT = 100
+SOURCE_WEIGHT = 50
+WORKLOAD_PENALTY = 2
+
+
+def _cache_timeout():
+    return int(getattr(settings, "ASSIGNMENT_AFFINITY_CACHE_SECONDS", 3600))
+
+
+def build_affinity_matrix(counsellor_ids):
+    """Aggregate won/total counts per feature and counsellor with two GROUP BY queries."""
+    from .models import Lead
+
+    won = Count("id", filter=Q(status=WON_STATUS))
+    base = Lead.objects.filter(assigned_counsellor__in=counsellor_ids).order_by()
+    matrix = {"ids": sorted(counsellor_ids), "industry": {}, "source": {}}
+    for row in (
+        base.exclude(industry="")
+        .values("industry", "assigned_counsellor")
+        .annotate(total=Count("id"), won=won)
+    ):
+        matrix["industry"].setdefault(row["industry"], {})[row["assigned_counsellor"]] = [
+            row["won"], row["total"]
+        ]
+    for row in (
+        base.values("source", "assigned_counsellor").annotate(total=Count("id"), won=won)
+    ):
+        matrix["source"].setdefault(row["source"], {})[row["assigned_counsellor"]] = [
+            row["won"], row["total"]
+        ]
+    return matrix
+
+
+def _generation():
+    return cache.get_or_set(GENERATION_KEY, 0, None)
+
+
+def get_affinity_matrix(counsellor_ids):
+    """Cached matrix for exactly this set of counsellors (rebuilt when the set or generation changes)."""
+    ids = sorted(counsellor_ids)
+    generation = _generation()
+    matrix = cache.get(CACHE_KEY)
+    if matrix is None or matrix["ids"] != ids or matrix.get("generation") != generation:
+        matrix = build_affinity_matrix(ids)
+        matrix["generation"] = generation
+        cache.set(CACHE_KEY, matrix, _cache_timeout())
+    return matrix
+
+
+def invalidate():
+    """Mark the cached matrix stale; the next read rebuilds it."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # The counter was evicted (it restarts at 0); drop the matrix itself instead.
+        cache.delete(CACHE_KEY)
+
+
+def record_assignments(leads):
+    """Freshly assigned leads change their counsellors' totals."""
+    if any(lead.assigned_counsellor_id for lead in leads):
+        invalidate()
+
+
+def record_status_change(lead, previous_status):
+    """A lead moving into or out of CLOSED_WON changes its counsellor's won count."""
+    if lead.assigned_counsellor_id and (lead.status == WON_STATUS) != (previous_status == WON_STATUS):
+        invalidate()
+
+
+def affinity_scores(matrix, counsellor_ids, industry, source_id):
+    """Industry + source bonus for every counsellor (aligned with counsellor_ids)."""
+    scores = [0.0] * len(counsellor_ids)
+    for kind, key, weight in (
+        ("industry", industry, INDUSTRY_WEIGHT),
+        ("source", source_id, SOURCE_WEIGHT),
+    ):
+        if not key:
+            continue
+        counts = matrix[kind].get(key)
+        if not counts:
+            continue
+        for pos, cid in enumerate(counsellor_ids):
+            won_total = counts.get(cid)
+            if won_total and won_total[1]:
+                scores[pos] += won_total[0] / won_total[1] * weight
+    return scores
@@ -0,0 +1,81 @@
+"""
+Cached sidebar / navbar badge counts.
+
+Unread notifications (per user) and pending tasks (per counsellor) are cached for
+BADGE_COUNT_CACHE_SECONDS. Writes that change them (notification and activity
+saves, lead follow-up changes, mark-as-read) delete the affected keys; the short
+TTL bounds anything that slips past (queryset.update, time passing a follow-up).
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _ttl():
+    return int(getattr(settings, 'BADGE_COUNT_CACHE_SECONDS', 30))
+
+
+def _admin_notification_key(user_id):
+    return f'crm:badge:notifications:admin:{user_id}'
+
+
+def _counsellor_notification_key(counsellor_id):
+    return f'crm:badge:notifications:counsellor:{counsellor_id}'
+
+
+def _pending_key(counsellor_id):
+    return f'crm:badge:pending_tasks:{counsellor_id}'
+
+
+def _cached(key, compute):
+    ttl = _ttl()
+    if ttl <= 0:
+        return compute()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, ttl)
+    return value
+
+
+def notification_count(user, counsellor=None):
+    """Unread notifications: NotificationCounsellor for counsellors, NotificationAdmin otherwise."""
+    from .models import NotificationAdmin, NotificationCounsellor
+
+    if counsellor is not None:
+        return _cached(
+            _counsellor_notification_key(counsellor.pk),
+            lambda: NotificationCounsellor.objects.filter(counsellor=counsellor, is_read=False).count(),
+        )
+    return _cached(
+        _admin_notification_key(user.pk),
+        lambda: NotificationAdmin.objects.filter(admin=user, is_read=False).count(),
+    )
+
+
+def pending_task_count(counsellor):
+    """Incomplete activities plus upcoming visits, as shown on the Pending Tasks page."""
+    from django.utils import timezone
+    from .models import Lead, LeadActivity
+
+    def compute():
+        incomplete = LeadActivity.objects.filter(counsellor=counsellor, is_completed=False).count()
+        upcoming_visits = Lead.objects.filter(
+            assigned_counsellor=counsellor,
+            next_follow_up__isnull=False,
+            next_follow_up__gte=timezone.now(),
+        ).count()
+        return incomplete + upcoming_visits
+
+    return _cached(_pending_key(counsellor.pk), compute)
+
+
+def invalidate_admin_notifications(user_ids):
+    cache.delete_many([_admin_notification_key(pk) for pk in user_ids if pk])
+
+
+def invalidate_counsellor_notifications(counsellor_ids):
+    cache.delete_many([_counsellor_notification_key(pk) for pk in counsellor_ids if pk])
+
+
+def invalidate_pending_tasks(counsellor_ids):
+    cache.delete_many([_pending_key(pk) for pk in counsellor_ids if pk])
@@ -0,0 +1,284 @@
+"""
+Event feed for the counsellor and admin calendars (FullCalendar JSON).
+
+Both feeds require a ``start`` / ``end`` range, clamped to CALENDAR_MAX_RANGE_DAYS.
+Rows are read with values() (only the columns an event needs) and cached in week
+blocks (Monday 00:00 local time) per scope: one counsellor, or ``all`` for the admin
+feed, which every admin shares. A request fetches its blocks with one get_many; the
+missing weeks are loaded with one query per event kind spanning them, split into
+blocks and stored for CALENDAR_CACHE_SECONDS. Cached rows are turned into events per
+request through the activity-type label map memoised by reference_data, so a renamed
+type shows at once.
+
+Saving or deleting a LeadActivity, and saving or deleting a Lead with a follow-up,
+deletes the week blocks the row was and is in (receivers in models.py;
+``_bulk_update_leads`` for bulk reassignment). Inside ``batched()`` (bulk deletes) the
+invalidations are collected and applied once on exit. Lead name edits reach activity
+events once the TTL lapses.
+"""
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import reference_data
+
+ALL = 'all'
+ACTIVITY_COLOR = '#007bff'
+FOLLOWUP_COLOR = '#28a745'
+
+ACTIVITY_FIELDS = (
+    'id', 'activity_type', 'subject', 'description', 'scheduled_date', 'duration',
+    'lead_id', 'lead__first_name', 'lead__last_name',
+)
+FOLLOWUP_FIELDS = ('id', 'first_name', 'last_name', 'next_follow_up', 'course_interested', 'school_name')
+ADMIN_ACTIVITY_FIELDS = ACTIVITY_FIELDS + ('counsellor__admin__first_name', 'counsellor__admin__last_name')
+ADMIN_FOLLOWUP_FIELDS = FOLLOWUP_FIELDS + (
+    'assigned_counsellor__admin__first_name', 'assigned_counsellor__admin__last_name',
+)
+
+_local = threading.local()
+
+# "+05:30" arrives as " 05:30" when the caller did not URL-encode the offset.
+_DECODED_OFFSET = re.compile(r' (\d{2}:?\d{2})$')
+
+
+def _ttl():
+    return int(getattr(settings, 'CALENDAR_CACHE_SECONDS', 300))
+
+
+def _max_days():
+    return max(1, int(getattr(settings, 'CALENDAR_MAX_RANGE_DAYS', 62)))
+
+
+def _parse(request, name):
+    raw = (request.GET.get(name) or '').strip()
+    if not raw:
+        raise ValueError(f"'{name}' is required")
+    raw = _DECODED_OFFSET.sub(r'+\1', raw).replace('Z', '+00:00')
+    try:
+        value = datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' is not an ISO 8601 date") from None
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def parse_range(request):
+    """
+    (start, end) from the ``start`` / ``end`` query parameters, with ``end`` clamped to
+    CALENDAR_MAX_RANGE_DAYS after ``start``. ValueError when either is missing or invalid.
+    """
+    start, end = _parse(request, 'start'), _parse(request, 'end')
+    if end < start:
+        raise ValueError("'end' is before 'start'")
+    return start, min(end, start + timedelta(days=_max_days()))
+
+
+# Week blocks
+
+def _week_start(dt):
+    day = timezone.localtime(dt).date()
+    return day - timedelta(days=day.weekday())
+
+
+def _week_bounds(monday):
+    start = timezone.make_aware(datetime.combine(monday, time.min))
+    return start, timezone.make_aware(datetime.combine(monday + timedelta(days=7), time.min))
+
+
+def _weeks(start, end):
+    monday, last = _week_start(start), _week_start(end)
+    weeks = []
+    while monday <= last:
+        weeks.append(monday)
+        monday += timedelta(days=7)
+    return weeks
+
+
+def _key(scope, monday):
+    return f'crm:calendar:{scope}:{monday.isoformat()}'
+
+
+def _load_blocks(scope, weeks):
+    """{monday: {'activities': [...], 'followups': [...]}} for ``weeks``, two queries in all."""
+    from .models import Lead, LeadActivity
+
+    range_start, _ = _week_bounds(weeks[0])
+    _, range_end = _week_bounds(weeks[-1])
+    activities = LeadActivity.objects.filter(scheduled_date__gte=range_start, scheduled_date__lt=range_end)
+    followups = Lead.objects.filter(next_follow_up__gte=range_start, next_follow_up__lt=range_end)
+    if scope == ALL:
+        activity_fields, followup_fields = ADMIN_ACTIVITY_FIELDS, ADMIN_FOLLOWUP_FIELDS
+    else:
+        activities = activities.filter(counsellor_id=scope)
+        followups = followups.filter(assigned_counsellor_id=scope)
+        activity_fields, followup_fields = ACTIVITY_FIELDS, FOLLOWUP_FIELDS
+
+    blocks = {monday: {'activities': [], 'followups': []} for monday in weeks}
+    for row in activities.order_by('scheduled_date', 'id').values(*activity_fields):
+        block = blocks.get(_week_start(row['scheduled_date']))
+        if block is not None:
+            block['activities'].append(row)
+    for row in followups.order_by('next_follow_up', 'id').values(*followup_fields):
+        block = blocks.get(_week_start(row['next_follow_up']))
+        if block is not None:
+            block['followups'].append(row)
+    return blocks
+
+
+def _blocks(scope, weeks):
+    ttl = _ttl()
+    if ttl <= 0:
+        return _load_blocks(scope, weeks)
+    keys = {monday: _key(scope, monday) for monday in weeks}
+    hits = cache.get_many(list(keys.values()))
+    blocks = {monday: hits[key] for monday, key in keys.items() if key in hits}
+    missing = [monday for monday in weeks if monday not in blocks]
+    if missing:
+        loaded = _load_blocks(scope, missing)
+        cache.set_many({keys[monday]: block for monday, block in loaded.items()}, ttl)
+        blocks.update(loaded)
+    return blocks
+
+
+# Serialisation
+
+def _activity_labels(tables):
+    return {e.code: e.name for e in tables['activity_type']}
+
+
+def activity_type_labels():
+    """{code: display name} for every activity type, memoised with the reference-data snapshot."""
+    return reference_data.derived('activity_type_labels', _activity_labels)
+
+
+def _name(first, last):
+    return f"{first} {last}"
+
+
+def _counsellor_name(first, last):
+    return _name(first, last) if first is not None else "Unassigned"
+
+
+def _activity_event(row, labels, admin):
+    scheduled = row['scheduled_date']
+    end = scheduled + (timedelta(minutes=row['duration']) if row['duration'] else timedelta(hours=1))
+    lead_name = _name(row['lead__first_name'], row['lead__last_name'])
+    label = labels.get(row['activity_type'], row['activity_type'])
+    props = {
+        'type': 'activity',
+        'lead_name': lead_name,
+        'description': row['description'] or 'No description',
+        'activity_id': row['id'],
+        'lead_id': row['lead_id'],
+    }
+    if admin:
+        props['counsellor_name'] = _counsellor_name(
+            row['counsellor__admin__first_name'], row['counsellor__admin__last_name'],
+        )
+    return {
+        'id': f"activity_{row['id']}",
+        'title': f"{label}: {lead_name if admin else row['subject']}",
+        'start': scheduled.isoformat(),
+        'end': end.isoformat(),
+        'color': ACTIVITY_COLOR,
+        'textColor': '#ffffff',
+        'extendedProps': props,
+    }
+
+
+def _followup_event(row, admin):
+    lead_name = _name(row['first_name'], row['last_name'])
+    props = {
+        'type': 'followup',
+        'lead_name': lead_name,
+        'lead_id': row['id'],
+        'course_interested': row['course_interested'] or 'N/A',
+        'school_name': row['school_name'] or 'N/A',
+    }
+    if admin:
+        props['counsellor_name'] = _counsellor_name(
+            row['assigned_counsellor__admin__first_name'], row['assigned_counsellor__admin__last_name'],
+        )
+    return {
+        'id': f"followup_{row['id']}",
+        'title': f"{'Follow-up' if admin else 'Visit'}: {lead_name}",
+        # Follow-ups are all-day events on their local date.
+        'start': timezone.localtime(row['next_follow_up']).date().isoformat(),
+        'allDay': True,
+        'color': FOLLOWUP_COLOR,
+        'textColor': '#ffffff',
+        'extendedProps': props,
+    }
+
+
+def events(scope, start, end):
+    """FullCalendar events for ``scope`` (a counsellor pk or ALL) between start and end inclusive."""
+    weeks = _weeks(start, end)
+    blocks = _blocks(scope, weeks)
+    labels = activity_type_labels()
+    admin = scope == ALL
+    activity_events, followup_events = [], []
+    for monday in weeks:
+        block = blocks[monday]
+        activity_events += [
+            _activity_event(row, labels, admin) for row in block['activities']
+            if start <= row['scheduled_date'] <= end
+        ]
+        followup_events += [
+            _followup_event(row, admin) for row in block['followups']
+            if start <= row['next_follow_up'] <= end
+        ]
+    return activity_events + followup_events
+
+
+# Invalidation
+
+@contextmanager
+def batched():
+    """Collect invalidations (e.g. one per deleted lead) and apply them once on exit."""
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = (set(), set())
+    try:
+        yield
+        counsellor_ids, moments = _local.pending
+    finally:
+        _local.pending = None
+    invalidate(counsellor_ids, moments)
+
+
+def invalidate(counsellor_ids, moments):
+    """Drop the week blocks holding ``moments`` for each counsellor and the admin feed."""
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending[0].update(counsellor_ids)
+        pending[1].update(moments)
+        return
+    weeks = {_week_start(moment) for moment in moments if moment is not None}
+    scopes = {pk for pk in counsellor_ids if pk} | {ALL}
+    if weeks:
+        cache.delete_many([_key(scope, monday) for scope in scopes for monday in weeks])
+
+
+def record_activity_changed(activity):
+    loaded = getattr(activity, '_loaded_values', None) or {}
+    invalidate(
+        (activity.counsellor_id, loaded.get('counsellor_id')),
+        (activity.scheduled_date, loaded.get('scheduled_date')),
+    )
+    activity.remember_loaded_values()
+
+
+def record_leads_changed(leads):
+    counsellor_ids, moments = set(), set()
+    for lead in leads:
+        loaded = getattr(lead, '_loaded_values', None) or {}
+        counsellor_ids.update((lead.assigned_counsellor_id, loaded.get('assigned_counsellor_id')))
+        moments.update((lead.next_follow_up, loaded.get('next_follow_up')))
+    invalidate(counsellor_ids, moments)
@@ -0,0 +1,53 @@
+"""
+Normalized contact keys used to detect duplicate leads.
+
+Phone keys are digits-only E.164 numbers (country code + national number, no "+"),
+email keys are trimmed and lower-cased. Both are stored on Lead / LeadAlternatePhone
+and indexed so a whole import batch can be matched with one IN (...) lookup.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any
+
+from django.conf import settings
+
+_NON_DIGITS = re.compile(r"\D+")
+
+
+def _default_country_code() -> str:
+    return str(getattr(settings, "DEFAULT_PHONE_COUNTRY_CODE", "91")).lstrip("+")
+
+
+def normalize_phone(value: Any) -> str:
+    """
+    "+91 98765-43210", "098765 43210" and "9876543210" all map to "919876543210".
+    Returns "" for values that cannot be a phone number.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:  # NaN from Excel
+            return ""
+        value = int(value)
+    raw = str(value).strip()
+    digits = _NON_DIGITS.sub("", raw)
+    if not digits:
+        return ""
+    if raw.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    else:
+        national = digits.lstrip("0")
+        if len(national) == 10:
+            digits = _default_country_code() + national
+    if not 8 <= len(digits) <= 15:
+        return ""
+    return digits
+
+
+def normalize_email(value: Any) -> str:
+    if value is None:
+        return ""
+    return str(value).strip().lower()
@@ -1,42 +1,40 @@
-from .models import NotificationCounsellor, NotificationAdmin, Admin
-
-def notification_count(request):
-    count = 0
-    if request.user.is_authenticated:
-        if hasattr(request.user, 'counsellor'):
-            count = NotificationCounsellor.objects.filter(counsellor=request.user.counsellor, is_read=False).count()
-        elif hasattr(request.user, 'admin'):
-            count = NotificationAdmin.objects.filter(admin=request.user, is_read=False).count()
-    return {'notification_count': count}
-
-
-def pending_task_count(request):
-    """Provide pending task count for counsellor sidebar badge."""
-    if not request.user.is_authenticated or getattr(request.user, 'user_type', None) != '2':
-        return {}
-    try:
-        from .models import Counsellor, LeadActivity, Lead
-        from django.utils import timezone
-        counsellor = Counsellor.objects.get(admin=request.user)
-        incomplete = LeadActivity.objects.filter(counsellor=counsellor, is_completed=False).count()
-        upcoming_visits = Lead.objects.filter(
-            assigned_counsellor=counsellor,
-            next_follow_up__isnull=False,
-            next_follow_up__gte=timezone.now(),
-        ).count()
-        return {'pending_task_count': incomplete + upcoming_visits}
-    except Exception:
-        return {'pending_task_count': 0}
+from django.utils.functional import SimpleLazyObject
+
+from .profiles import get_admin_profile, get_counsellor
+
+
+def _notification_count(request):
+    from .badge_counts import notification_count
 
+    user = request.user
+    if user.user_type == '2':
+        counsellor = get_counsellor(request)
+        if counsellor is None:
+            return 0
+        return notification_count(user, counsellor=counsellor)
+    if user.user_type == '1':
+        return notification_count(user)
+    return 0
 
-def lead_status_info(request):
+
+def _pending_task_count(request):
+    """Pending task count for the counsellor sidebar badge."""
+    from .badge_counts import pending_task_count
+
+    if request.user.user_type != '2':
+        return 0
+    counsellor = get_counsellor(request)
+    return pending_task_count(counsellor) if counsellor is not None else 0
+
+
+def _lead_status_info():
     """
-    Provide a status_code → {name, color} map and a choices list to every template.
+    A status_code → {name, color} map and a choices list.
     Templates can use {{ lead_status_map }} for badge rendering and {{ lead_status_choices }} for dropdowns.
     """
-    from .models import LeadStatus
+    from .reference_data import entries
     try:
-        statuses = LeadStatus.objects.all().order_by('sort_order', 'name')
+        statuses = entries('lead_status')
         status_map = {s.code: {'name': s.name, 'color': s.color} for s in statuses}
         status_choices = [(s.code, s.name) for s in statuses if s.is_active]
     except Exception:
@@ -48,18 +46,53 @@ def lead_status_info(request):
     }
 
 
-def admin_permissions(request):
-    """Make admin permission flags available in all templates."""
-    if not request.user.is_authenticated or getattr(request.user, 'user_type', None) != '1':
-        return {}
-    try:
-        admin_obj = Admin.objects.get(admin=request.user)
-        return {
-            'perm_delete': admin_obj.has_perm_delete(),
-            'perm_performance': admin_obj.has_perm_performance(),
-            'perm_counsellor_work': admin_obj.has_perm_counsellor_work(),
-            'perm_settings': admin_obj.has_perm_settings(),
-            'is_superadmin': admin_obj.is_superadmin,
-        }
-    except Admin.DoesNotExist:
-        return {}
+def _admin_permissions(request):
+    """Admin permission flags (all False for anyone without an Admin profile)."""
+    admin_obj = None
+    if request.user.user_type == '1':
+        admin_obj = get_admin_profile(request)
+    if admin_obj is None:
+        return dict.fromkeys(
+            ('perm_delete', 'perm_performance', 'perm_counsellor_work', 'perm_settings', 'is_superadmin'),
+            False,
+        )
+    return {
+        'perm_delete': admin_obj.has_perm_delete(),
+        'perm_performance': admin_obj.has_perm_performance(),
+        'perm_counsellor_work': admin_obj.has_perm_counsellor_work(),
+        'perm_settings': admin_obj.has_perm_settings(),
+        'is_superadmin': admin_obj.is_superadmin,
+    }
+
+
+def crm_context(request):
+    """
+    Every CRM template variable in one processor. Each value is lazy: its query only
+    runs if the template actually reads it, profiles come from ProfileMiddleware,
+    and the badge counts come from badge_counts' short-lived per-user cache.
+    """
+    lazy = {}
+
+    def memo(build):
+        def get():
+            if build not in lazy:
+                lazy[build] = build()
+            return lazy[build]
+        return get
+
+    status_info = memo(_lead_status_info)
+    context = {
+        'lead_status_map': SimpleLazyObject(lambda: status_info()['lead_status_map']),
+        'lead_status_choices': SimpleLazyObject(lambda: status_info()['lead_status_choices']),
+    }
+    if not request.user.is_authenticated:
+        return context
+
+    perms = memo(lambda: _admin_permissions(request))
+    context.update({
+        'notification_count': SimpleLazyObject(lambda: _notification_count(request)),
+        'pending_task_count': SimpleLazyObject(lambda: _pending_task_count(request)),
+    })
+    for name in ('perm_delete', 'perm_performance', 'perm_counsellor_work', 'perm_settings', 'is_superadmin'):
+        context[name] = SimpleLazyObject(lambda name=name: perms()[name])
+    return context
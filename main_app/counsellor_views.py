@@ -1,7 +1,7 @@
 import json
 from datetime import datetime, timedelta
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import (HttpResponseRedirect, get_object_or_404,
                               redirect, render)
 from django.urls import reverse
@@ -10,12 +10,16 @@ from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 from .forms import *
+from . import access_anomaly, calendar_feed, daily_task_queue, reference_data, reminders
+from .access_log import record_access
+from .badge_counts import invalidate_counsellor_notifications
+from .pagination import keyset_paginate
+from .profiles import counsellor_or_404
 from .models import *
 from .utils import (
     paginate_queryset,
     user_type_required,
     get_counsellor_activity_snapshot,
-    get_counsellor_daily_target_progress,
 )
 import os
 import requests
@@ -29,10 +33,7 @@ counsellor_required = user_type_required('2')
 @counsellor_required
 def counsellor_home(request):
     """Counsellor Dashboard"""
-    counsellor = get_object_or_404(
-        Counsellor.objects.select_related('admin'),
-        admin=request.user,
-    )
+    counsellor = counsellor_or_404(request)
     
     # My Leads Statistics - optimized: single aggregation query
     my_leads = Lead.objects.filter(assigned_counsellor=counsellor)
@@ -129,7 +130,7 @@ def counsellor_home(request):
 @counsellor_required
 def my_leads(request):
     """View assigned leads"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     leads_list = Lead.objects.filter(assigned_counsellor=counsellor).select_related('source').order_by('-created_at')
     
     # Filter by status if provided
@@ -137,24 +138,18 @@ def my_leads(request):
     if status_filter:
         leads_list = leads_list.filter(status=status_filter)
     
-    # Use server-side pagination to keep response fast with many leads
-    leads = paginate_queryset(request, leads_list, 50)
+    # Keyset pagination on (created_at, id) keeps every page as fast as the first
+    leads = keyset_paginate(request, leads_list, 50)
+    query_params = request.GET.copy()
+    query_params.pop('cursor', None)
 
-    # Audit: log that this counsellor listed their leads (once per request)
-    try:
-        DataAccessLog.objects.create(
-            user=request.user,
-            counsellor=counsellor,
-            action='list_my_leads',
-            ip_address=request.META.get('REMOTE_ADDR'),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
-        )
-    except Exception:
-        logging.getLogger(__name__).warning("Failed to write DataAccessLog for my_leads", exc_info=True)
+    # Audit: log that this counsellor listed their leads (once per request, buffered)
+    record_access(request, counsellor, 'list_my_leads')
     context = {
         'leads': leads,
         'page_title': 'My Leads',
-        'status_filter': status_filter
+        'status_filter': status_filter,
+        'query_string': query_params.urlencode(),
     }
     return render(request, 'counsellor_template/my_leads.html', context)
 
@@ -162,62 +157,29 @@ def my_leads(request):
 @counsellor_required
 def lead_detail(request, lead_id):
     """View lead details and activities"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     activities = LeadActivity.objects.filter(lead=lead, counsellor=counsellor).order_by('-completed_date')
 
     # Audit: log this lead view
     try:
-        DataAccessLog.objects.create(
-            user=request.user,
-            counsellor=counsellor,
-            action='view_lead_detail',
-            lead=lead,
-            ip_address=request.META.get('REMOTE_ADDR'),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
-        )
-
-        # Simple anomaly rule: if a counsellor views more than 200 distinct leads in 24 hours,
-        # create admin notifications so it can be reviewed.
-        from django.utils import timezone
-        from .models import Admin, NotificationAdmin
+        record_access(request, counsellor, 'view_lead_detail', lead=lead)
 
-        now = timezone.now()
-        window_start = now - timedelta(hours=24)
-
-        recent_views = (
-            DataAccessLog.objects
-            .filter(
-                counsellor=counsellor,
-                action='view_lead_detail',
-                created_at__gte=window_start,
+        # Anomaly rule: if a counsellor views more distinct leads in 24 hours than their
+        # threshold (default 200), alert the admins (once per counsellor per day).
+        recent_views = access_anomaly.observe('lead_views', counsellor, lead.pk)
+        limit = access_anomaly.threshold('lead_views', counsellor)
+        if recent_views >= limit:
+            msg = (
+                f"Potential data-leak risk: counsellor {counsellor.admin.get_full_name()} "
+                f"({counsellor.employee_id}, {counsellor.admin.email}) has viewed "
+                f"{recent_views} unique leads in the last 24 hours. "
+                f"Please review their activity and access."
+            )
+            access_anomaly.raise_alert(
+                'lead_views', counsellor, recent_views, limit, msg,
+                f"Security alert: possible data export or leak by counsellor {counsellor.employee_id}. {msg}",
             )
-            .values('lead_id')
-            .distinct()
-            .count()
-        )
-
-        THRESHOLD = 200
-        if recent_views >= THRESHOLD:
-            # Avoid spamming: only create one alert per counsellor per day for this threshold
-            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            already_flagged = NotificationAdmin.objects.filter(
-                created_at__gte=today_start,
-                message__icontains=f"possible data export or leak by counsellor {counsellor.employee_id}",
-            ).exists()
-
-            if not already_flagged:
-                msg = (
-                    f"Potential data-leak risk: counsellor {counsellor.admin.get_full_name()} "
-                    f"({counsellor.employee_id}, {counsellor.admin.email}) has viewed "
-                    f"{recent_views} unique leads in the last 24 hours. "
-                    f"Please review their activity and access."
-                )
-                for admin_profile in Admin.objects.select_related('admin').all():
-                    NotificationAdmin.objects.create(
-                        admin=admin_profile.admin,
-                        message=f"Security alert: possible data export or leak by counsellor {counsellor.employee_id}. {msg}",
-                    )
     except Exception:
         logging.getLogger(__name__).warning("Failed to write DataAccessLog / security alert", exc_info=True)
 
@@ -237,7 +199,7 @@ def lead_detail(request, lead_id):
 @require_POST
 def add_alternate_phone(request, lead_id):
     """Allow counsellor to add an additional alternate phone number for a lead."""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
 
     from .forms import LeadAlternatePhoneForm
@@ -265,22 +227,15 @@ def reveal_phone(request, lead_id):
     Reveal a lead's phone number on demand, log the access,
     and alert admins if a counsellor reveals too many numbers.
     """
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
 
     try:
         # Audit log for phone reveal
-        DataAccessLog.objects.create(
-            user=request.user,
-            counsellor=counsellor,
-            action='reveal_phone',
-            lead=lead,
-            ip_address=request.META.get('REMOTE_ADDR'),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
-        )
+        record_access(request, counsellor, 'reveal_phone', lead=lead)
 
         # Threshold check: distinct leads with any phone/alternate reveal in last 1h
-        _check_phone_reveal_threshold(counsellor)
+        _check_phone_reveal_threshold(counsellor, lead)
 
     except Exception:
         logging.getLogger(__name__).warning("Failed to log phone reveal / create alert", exc_info=True)
@@ -288,47 +243,26 @@ def reveal_phone(request, lead_id):
     return JsonResponse({'phone': lead.phone})
 
 
-def _check_phone_reveal_threshold(counsellor):
+def _check_phone_reveal_threshold(counsellor, lead):
     """
-    If counsellor has revealed phones for too many distinct leads in the last 1 hour,
-    notify admins (at most once per day per counsellor).
-    End-to-end: endpoints reveal_phone + reveal_alternate_phone → DataAccessLog → this check → NotificationAdmin.
+    Record a reveal for ``lead``; if counsellor has revealed phones for too many distinct
+    leads in the last 1 hour, notify admins (at most once per day per counsellor).
+    End-to-end: endpoints reveal_phone + reveal_alternate_phone → access_anomaly window → this check → SecurityAlert + NotificationAdmin.
     Templates: counsellor lead_detail (main + alternate), my_leads table; JS calls endpoints on View click.
     """
-    from .models import Admin, NotificationAdmin
-
-    now = timezone.now()
-    window_start = now - timedelta(hours=1)  # Check window: last 1 hour
-    recent_reveals = (
-        DataAccessLog.objects
-        .filter(
-            counsellor=counsellor,
-            action__in=('reveal_phone', 'reveal_alternate_phone'),
-            created_at__gte=window_start,
+    recent_reveals = access_anomaly.observe('phone_reveals', counsellor, lead.pk)
+    limit = access_anomaly.threshold('phone_reveals', counsellor)
+    if recent_reveals >= limit:
+        msg = (
+            f"Data-protection alert: counsellor {counsellor.admin.get_full_name()} "
+            f"({counsellor.employee_id}, {counsellor.admin.email}) has revealed phone numbers "
+            f"for {recent_reveals} unique leads in the last 1 hour. "
+            f"Please review their activity."
+        )
+        access_anomaly.raise_alert(
+            'phone_reveals', counsellor, recent_reveals, limit, msg,
+            f"Security alert: phone reveal threshold exceeded by counsellor {counsellor.employee_id}. {msg}",
         )
-        .values('lead_id')
-        .distinct()
-        .count()
-    )
-    REVEAL_THRESHOLD = 60
-    if recent_reveals >= REVEAL_THRESHOLD:
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        already_flagged = NotificationAdmin.objects.filter(
-            created_at__gte=today_start,
-            message__icontains=f"phone reveal threshold exceeded by counsellor {counsellor.employee_id}",
-        ).exists()
-        if not already_flagged:
-            msg = (
-                f"Data-protection alert: counsellor {counsellor.admin.get_full_name()} "
-                f"({counsellor.employee_id}, {counsellor.admin.email}) has revealed phone numbers "
-                f"for {recent_reveals} unique leads in the last 1 hour. "
-                f"Please review their activity."
-            )
-            for admin_profile in Admin.objects.select_related('admin').all():
-                NotificationAdmin.objects.create(
-                    admin=admin_profile.admin,
-                    message=f"Security alert: phone reveal threshold exceeded by counsellor {counsellor.employee_id}. {msg}",
-                )
 
 
 @counsellor_required
@@ -339,7 +273,7 @@ def reveal_alternate_phone(request, lead_id):
     POST with which=primary for lead.alternate_phone, or which=<id> for LeadAlternatePhone id.
     Logs access and uses same threshold alert as main phone reveal.
     """
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     which = (request.POST.get('which') or '').strip()
     phone = None
@@ -353,15 +287,8 @@ def reveal_alternate_phone(request, lead_id):
         except (ValueError, LeadAlternatePhone.DoesNotExist):
             return JsonResponse({'error': 'Invalid which'}, status=400)
     try:
-        DataAccessLog.objects.create(
-            user=request.user,
-            counsellor=counsellor,
-            action='reveal_alternate_phone',
-            lead=lead,
-            ip_address=request.META.get('REMOTE_ADDR'),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
-        )
-        _check_phone_reveal_threshold(counsellor)
+        record_access(request, counsellor, 'reveal_alternate_phone', lead=lead)
+        _check_phone_reveal_threshold(counsellor, lead)
     except Exception:
         logging.getLogger(__name__).warning("Failed to log alternate phone reveal / create alert", exc_info=True)
     return JsonResponse({'phone': phone})
@@ -370,7 +297,7 @@ def reveal_alternate_phone(request, lead_id):
 @counsellor_required
 def edit_my_lead(request, lead_id):
     """Allow counsellor to update key lead details for their own leads"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
 
     form = CounsellorLeadForm(request.POST or None, instance=lead)
@@ -398,7 +325,7 @@ def edit_my_lead(request, lead_id):
 @counsellor_required
 def add_lead_activity(request, lead_id):
     """Add activity for a lead"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     form = LeadActivityForm(request.POST or None)
     
@@ -456,7 +383,7 @@ def add_lead_activity(request, lead_id):
 @counsellor_required
 def edit_lead_activity(request, lead_id, activity_id):
     """Edit an existing activity for a lead"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     activity = get_object_or_404(LeadActivity, id=activity_id, lead=lead, counsellor=counsellor)
     
@@ -517,7 +444,7 @@ def edit_lead_activity(request, lead_id, activity_id):
 @require_POST
 def delete_lead_activity(request, lead_id, activity_id):
     """Delete an activity."""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     activity = get_object_or_404(LeadActivity, id=activity_id, lead=lead, counsellor=counsellor)
     activity.delete()
@@ -529,7 +456,7 @@ def delete_lead_activity(request, lead_id, activity_id):
 @require_POST
 def mark_activity_complete(request, lead_id, activity_id):
     """Quick action to mark an activity as completed"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     activity = get_object_or_404(LeadActivity, id=activity_id, lead=lead, counsellor=counsellor)
     
@@ -554,7 +481,7 @@ def mark_activity_complete(request, lead_id, activity_id):
 @counsellor_required
 def update_lead_status(request, lead_id):
     """Update lead status"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     
     if request.method == 'POST':
@@ -573,7 +500,7 @@ def update_lead_status(request, lead_id):
 @counsellor_required
 def create_business(request, lead_id):
     """Create business from lead"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     form = BusinessForm(request.POST or None)
     
@@ -609,7 +536,7 @@ def create_business(request, lead_id):
 @counsellor_required
 def my_businesses(request):
     """View my businesses"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     businesses_list = Business.objects.filter(counsellor=counsellor).select_related('lead').order_by('-created_at')
     
     # Filter by status if provided
@@ -629,7 +556,7 @@ def my_businesses(request):
 @counsellor_required
 def business_detail(request, business_id):
     """View business details"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     business = get_object_or_404(Business, id=business_id, counsellor=counsellor)
     
     context = {
@@ -642,7 +569,7 @@ def business_detail(request, business_id):
 @counsellor_required
 def update_business_status(request, business_id):
     """Update business status"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     business = get_object_or_404(Business, id=business_id, counsellor=counsellor)
     
     if request.method == 'POST':
@@ -660,7 +587,7 @@ def update_business_status(request, business_id):
 @counsellor_required
 def request_lead_transfer(request, lead_id):
     """Request lead transfer to another counsellor"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     form = LeadTransferForm(request.POST or None)
     
@@ -691,7 +618,7 @@ def request_lead_transfer(request, lead_id):
 @counsellor_required
 def my_activities(request):
     """View my activities"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     activities_list = LeadActivity.objects.filter(counsellor=counsellor).select_related('lead').order_by('-completed_date')
     
     # Filter by activity type if provided
@@ -715,7 +642,7 @@ def pending_tasks(request):
     1. Incomplete activities (is_completed=False)
     2. Completed activities that have a next_action set (the next action is the pending task)
     """
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
 
     # Incomplete activities
     incomplete_activities = LeadActivity.objects.filter(
@@ -723,27 +650,23 @@ def pending_tasks(request):
         is_completed=False,
     ).select_related('lead').order_by('scheduled_date')
 
-    # Completed activities that generated a next_action (which hasn't been acted on yet)
-    # We consider an action "pending" if the activity has a next_action and no newer activity
-    # exists for the same lead with the next_action as activity_type.
+    # Completed activities that generated a next_action which hasn't been acted on yet:
+    # no later activity by this counsellor on the same lead has the next_action as its type.
+    # One correlated NOT EXISTS query, paged by (completed_date, id).
+    from django.db.models import Exists, OuterRef
+    followed_up = LeadActivity.objects.filter(
+        lead=OuterRef('lead'),
+        counsellor=counsellor,
+        activity_type=OuterRef('next_action'),
+        completed_date__gt=OuterRef('completed_date'),
+    )
     pending_next_actions = LeadActivity.objects.filter(
         counsellor=counsellor,
         is_completed=True,
     ).exclude(
         next_action='',
-    ).select_related('lead').order_by('-completed_date')
-
-    # Filter: only show if there's no subsequent activity for that lead matching the next_action
-    truly_pending = []
-    for act in pending_next_actions:
-        has_followup = LeadActivity.objects.filter(
-            lead=act.lead,
-            counsellor=counsellor,
-            activity_type=act.next_action,
-            completed_date__gt=act.completed_date,
-        ).exists()
-        if not has_followup:
-            truly_pending.append(act)
+    ).filter(~Exists(followed_up)).select_related('lead')
+    truly_pending = keyset_paginate(request, pending_next_actions, 50, keys=('-completed_date', '-id'))
 
     # Also get upcoming visits (next_follow_up in the future)
     upcoming_visits = Lead.objects.filter(
@@ -753,7 +676,7 @@ def pending_tasks(request):
     ).select_related('source').order_by('next_follow_up')
 
     # Build the next_action display map
-    na_map = dict(NextAction.get_all_choices()) if NextAction.objects.exists() else {}
+    na_map = dict(NextAction.get_all_choices())
 
     context = {
         'page_title': 'Pending Tasks',
@@ -768,88 +691,14 @@ def pending_tasks(request):
 @counsellor_required
 def my_daily_target(request):
     """
-    Auto-build a prioritised task list up to target_count for today.
+    Today's prioritised task list, up to target_count.
     Order: today's pending visits → pending activities → leads by status (NEW last).
+    The list is materialised per counsellor each day (see daily_task_queue.py).
     """
-    from datetime import date
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
-    today = date.today()
-
-    progress = get_counsellor_daily_target_progress(counsellor)
-    assignment = progress['assignment']
-    assignment.completed_count = progress['completed_toward_target']
-    assignment.save(update_fields=['completed_count', 'updated_at'])
-
-    limit = assignment.target.target_count
-    remaining = limit
-
-    # ── 1. Today's pending visits (highest priority) ──
-    visits = list(
-        Lead.objects.filter(
-            assigned_counsellor=counsellor,
-            next_follow_up__date__lte=today,
-        ).select_related('source').order_by('next_follow_up')[:remaining]
-    )
-    remaining -= len(visits)
-
-    # ── 2. Pending activities ──
-    activities = []
-    if remaining > 0:
-        activities = list(
-            LeadActivity.objects.filter(
-                counsellor=counsellor,
-                is_completed=False,
-            ).select_related('lead').order_by('scheduled_date')[:remaining]
-        )
-        remaining -= len(activities)
-
-    # ── 3. Leads by status, excluding NEW (they come last) ──
-    status_leads = []
-    if remaining > 0:
-        statuses = (
-            LeadStatus.objects
-            .filter(is_active=True)
-            .exclude(code__in=['NEW', 'CLOSED_WON', 'CLOSED_LOST', 'TRANSFERRED'])
-            .order_by('sort_order')
-        )
-        for st in statuses:
-            if remaining <= 0:
-                break
-            chunk = list(
-                Lead.objects.filter(
-                    assigned_counsellor=counsellor, status=st.code,
-                ).select_related('source').order_by('-created_at')[:remaining]
-            )
-            if chunk:
-                status_leads.append({'status': st, 'leads': chunk})
-                remaining -= len(chunk)
-
-    # ── 4. NEW leads (lowest priority) ──
-    new_leads = []
-    if remaining > 0:
-        new_leads = list(
-            Lead.objects.filter(
-                assigned_counsellor=counsellor, status='NEW',
-            ).select_related('source').order_by('-created_at')[:remaining]
-        )
-
-    total_items = len(visits) + len(activities) + sum(len(s['leads']) for s in status_leads) + len(new_leads)
-
-    completed_today = progress['completed_toward_target']
-
+    counsellor = counsellor_or_404(request)
     context = {
         'page_title': "Today's Target",
-        'assignment': assignment,
-        'today': today,
-        'visits': visits,
-        'activities': activities,
-        'status_leads': status_leads,
-        'new_leads': new_leads,
-        'total_items': total_items,
-        'completed_today': completed_today,
-        'daily_target': progress['daily_target'],
-        'target_remaining': progress['target_remaining'],
-        'target_progress_pct': progress['target_progress_pct'],
+        **daily_task_queue.read(counsellor),
     }
     return render(request, 'counsellor_template/my_daily_target.html', context)
 
@@ -859,7 +708,7 @@ def my_daily_target(request):
 @counsellor_required
 def counsellor_view_profile(request):
     """Counsellor profile view"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     
     # Performance statistics
     total_leads = counsellor.lead_set.count()
@@ -883,12 +732,13 @@ def counsellor_view_profile(request):
 @counsellor_required
 def counsellor_view_notifications(request):
     """View counsellor notifications"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     notifications = NotificationCounsellor.objects.filter(counsellor=counsellor).order_by('-created_at')
     
     # Mark notifications as read
     if request.method == 'POST':
         notifications.update(is_read=True)
+        invalidate_counsellor_notifications([counsellor.pk])
         messages.success(request, "All notifications marked as read!")
     
     context = {
@@ -915,7 +765,7 @@ def get_my_analytics(request):
     """AJAX endpoint for counsellor analytics"""
     if request.method == 'GET':
         try:
-            counsellor = get_object_or_404(Counsellor, admin=request.user)
+            counsellor = counsellor_or_404(request)
             
             # Lead status distribution
             status_data = counsellor.lead_set.values('status').annotate(
@@ -950,7 +800,7 @@ def get_my_analytics(request):
 @counsellor_required
 def schedule_follow_up(request, lead_id):
     """Schedule follow-up for a lead"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     
     if request.method == 'POST':
@@ -984,7 +834,7 @@ def schedule_follow_up(request, lead_id):
 @require_POST
 def mark_followup_complete(request, lead_id):
     """Mark follow-up as completed and create an activity record"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     
     if not lead.next_follow_up:
@@ -1023,7 +873,7 @@ def mark_followup_complete(request, lead_id):
 @counsellor_required
 def evaluate_conversion_score(request, lead_id):
     """Call AI API to assign an admission likelihood score (0-100) based on student profile."""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
 
     prompt = (
@@ -1126,7 +976,7 @@ def evaluate_conversion_score(request, lead_id):
 @counsellor_required
 def run_agentic_workflow(request, lead_id):
     """Agentic AI workflow for college admissions: enrich → score → route (with reasoning)."""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
 
     openai_key = os.environ.get('OPENAI_API_KEY')
@@ -1432,7 +1282,7 @@ def execute_academic_routing(lead, routed_to, routing_reason):
 @counsellor_required
 def mark_lead_lost(request, lead_id):
     """Mark lead as lost"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     
     if request.method == 'POST':
@@ -1448,7 +1298,7 @@ def mark_lead_lost(request, lead_id):
 @counsellor_required
 def counsellor_calendar(request):
     """Counsellor calendar view showing activities and follow-ups"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     
     context = {
         'page_title': 'My Calendar',
@@ -1459,219 +1309,41 @@ def counsellor_calendar(request):
 
 @counsellor_required
 def get_calendar_events(request):
-    """API endpoint to get calendar events (activities and follow-ups)"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
-    
-    # Get date range from request (optional)
-    start_date_str = request.GET.get('start')
-    end_date_str = request.GET.get('end')
-    
-    events = []
-    
-    # Parse dates if provided
-    start_date = None
-    end_date = None
-    if start_date_str:
-        try:
-            start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
-            if timezone.is_naive(start_date):
-                start_date = timezone.make_aware(start_date)
-        except (ValueError, AttributeError):
-            pass
-    
-    if end_date_str:
-        try:
-            end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-            if timezone.is_naive(end_date):
-                end_date = timezone.make_aware(end_date)
-        except (ValueError, AttributeError):
-            pass
-    
-    # Get scheduled activities
-    activities_query = LeadActivity.objects.filter(
-        counsellor=counsellor,
-        scheduled_date__isnull=False
-    ).select_related('lead')
-    
-    if start_date and end_date:
-        activities_query = activities_query.filter(
-            scheduled_date__gte=start_date,
-            scheduled_date__lte=end_date
-        )
-    
-    for activity in activities_query:
-        if activity.scheduled_date:
-            start_iso = activity.scheduled_date.isoformat()
-            end_iso = None
-            if activity.duration:
-                end_time = activity.scheduled_date + timedelta(minutes=activity.duration)
-                end_iso = end_time.isoformat()
-            else:
-                # Default 1 hour duration if not specified
-                end_time = activity.scheduled_date + timedelta(hours=1)
-                end_iso = end_time.isoformat()
-            
-            # Get activity type display name
-            activity_type_display = dict(ActivityType.get_all_choices()).get(activity.activity_type, activity.activity_type)
-            
-            events.append({
-                'id': f'activity_{activity.id}',
-                'title': f"{activity_type_display}: {activity.subject}",
-                'start': start_iso,
-                'end': end_iso,
-                'color': '#007bff',  # Blue for activities
-                'textColor': '#ffffff',
-                'extendedProps': {
-                    'type': 'activity',
-                    'lead_name': f"{activity.lead.first_name} {activity.lead.last_name}",
-                    'description': activity.description or 'No description',
-                    'activity_id': activity.id,
-                    'lead_id': activity.lead.id,
-                }
-            })
-    
-    # Get follow-ups from leads
-    followups_query = Lead.objects.filter(
-        assigned_counsellor=counsellor,
-        next_follow_up__isnull=False
-    ).select_related('source')
-    
-    if start_date and end_date:
-        followups_query = followups_query.filter(
-            next_follow_up__gte=start_date,
-            next_follow_up__lte=end_date
-        )
-    
-    for lead in followups_query:
-        if lead.next_follow_up:
-            # Follow-ups are all-day events, so we only set the date part
-            followup_date = lead.next_follow_up.date()
-            events.append({
-                'id': f'followup_{lead.id}',
-                'title': f"Visit: {lead.first_name} {lead.last_name}",
-                'start': followup_date.isoformat(),
-                'allDay': True,
-                'color': '#28a745',  # Green for visits
-                'textColor': '#ffffff',
-                'extendedProps': {
-                    'type': 'followup',
-                    'lead_name': f"{lead.first_name} {lead.last_name}",
-                    'lead_id': lead.id,
-                    'course_interested': lead.course_interested or 'N/A',
-                    'school_name': lead.school_name or 'N/A',
-                }
-            })
-    
-    return JsonResponse(events, safe=False)
+    """API endpoint to get calendar events (activities and follow-ups) between ?start= and ?end="""
+    counsellor = counsellor_or_404(request)
+    try:
+        start, end = calendar_feed.parse_range(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(calendar_feed.events(counsellor.pk, start, end), safe=False)
 
 
 @counsellor_required
 def check_current_time_notifications(request):
-    """API endpoint to check for activities/follow-ups at current time"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
-    now = timezone.now()
-    
-    # Time window: check within 1 minute before and after current time (exact match)
-    time_window_start = now - timedelta(minutes=1)
-    time_window_end = now + timedelta(minutes=1)
-    
-    notifications = []
-    notified_keys = set()  # Track all notification keys in this response
-    
-    # Check for scheduled activities at current time
-    activities = LeadActivity.objects.filter(
-        counsellor=counsellor,
-        scheduled_date__isnull=False,
-        scheduled_date__gte=time_window_start,
-        scheduled_date__lte=time_window_end
-    ).select_related('lead').order_by('scheduled_date')
-    
-    for activity in activities:
-        # Check if times match (same hour and minute)
-        activity_time = activity.scheduled_date
-        time_diff_seconds = abs((activity_time - now).total_seconds())
-        
-        # Only notify if within 60 seconds (1 minute) of scheduled time
-        if time_diff_seconds <= 60:
-            # Create unique notification key for this specific activity and time
-            notification_key = f'activity_notified_{activity.id}_{activity_time.date()}_{activity_time.hour}_{activity_time.minute}'
-            
-            # Check session to avoid duplicates
-            if not request.session.get(notification_key, False):
-                activity_type_display = dict(ActivityType.get_all_choices()).get(activity.activity_type, activity.activity_type)
-                notification_data = {
-                    'type': 'activity',
-                    'id': activity.id,
-                    'title': f"{activity_type_display}: {activity.subject}",
-                    'message': f"You have a scheduled {activity_type_display.lower()} with {activity.lead.first_name} {activity.lead.last_name}",
-                    'lead_id': activity.lead.id,
-                    'lead_name': f"{activity.lead.first_name} {activity.lead.last_name}",
-                    'scheduled_time': activity.scheduled_date.isoformat(),
-                    'description': activity.description or 'No description',
-                    'notification_key': notification_key,
-                    'unique_id': f'activity_{activity.id}_{activity_time.timestamp()}'
-                }
-                notifications.append(notification_data)
-                notified_keys.add(notification_key)
-                # Mark as notified in session (expires after 10 minutes)
-                request.session[notification_key] = True
-                request.session.set_expiry(600)  # 10 minutes
-    
-    # Check for follow-ups at current time
-    followups = Lead.objects.filter(
-        assigned_counsellor=counsellor,
-        next_follow_up__isnull=False,
-        next_follow_up__gte=time_window_start,
-        next_follow_up__lte=time_window_end
-    ).select_related('source')
-    
-    for lead in followups:
-        if lead.next_follow_up:
-            # Check if times match (within 1 minute)
-            time_diff_seconds = abs((lead.next_follow_up - now).total_seconds())
-            
-            if time_diff_seconds <= 60:
-                # Create unique notification key for this specific follow-up and time
-                notification_key = f'followup_notified_{lead.id}_{lead.next_follow_up.date()}_{lead.next_follow_up.hour}_{lead.next_follow_up.minute}'
-                
-                if not request.session.get(notification_key, False):
-                    notification_data = {
-                        'type': 'followup',
-                        'id': lead.id,
-                        'title': f"Visit: {lead.first_name} {lead.last_name}",
-                        'message': f"You have a visit scheduled with {lead.first_name} {lead.last_name}",
-                        'lead_id': lead.id,
-                        'lead_name': f"{lead.first_name} {lead.last_name}",
-                        'scheduled_time': lead.next_follow_up.isoformat(),
-                        'course_interested': lead.course_interested or 'N/A',
-                        'notification_key': notification_key,
-                        'unique_id': f'followup_{lead.id}_{lead.next_follow_up.timestamp()}'
-                    }
-                    notifications.append(notification_data)
-                    notified_keys.add(notification_key)
-                    # Mark as notified in session
-                    request.session[notification_key] = True
-                    request.session.set_expiry(600)  # 10 minutes
-    
-    # Group notifications by scheduled time for better organization
-    grouped_notifications = {}
-    for notification in notifications:
-        scheduled_time = notification['scheduled_time']
-        if scheduled_time not in grouped_notifications:
-            grouped_notifications[scheduled_time] = []
-        grouped_notifications[scheduled_time].append(notification)
-    
-    return JsonResponse({
-        'notifications': notifications,
-        'grouped': grouped_notifications,
-        'count': len(notifications)
-    }, safe=False)
+    """Poll for due activity / visit reminders (for clients without the reminder stream)"""
+    counsellor = counsellor_or_404(request)
+    return JsonResponse(reminders.response_body(reminders.poll(counsellor.pk)))
+
+
+@counsellor_required
+def counsellor_reminder_stream(request):
+    """Server-Sent Events stream of due activity / visit reminders (see reminders.py)"""
+    from django.core.handlers.asgi import ASGIRequest
+
+    counsellor = counsellor_or_404(request)
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(reminders.stream(counsellor.pk), content_type='text/event-stream')
+    else:
+        response = HttpResponse(reminders.single_response(counsellor.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @counsellor_required
 def get_lead_calendar_events(request, lead_id):
     """API endpoint to get calendar events for a specific lead"""
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     lead = get_object_or_404(Lead, id=lead_id, assigned_counsellor=counsellor)
     
     # Get date range from request (optional)
@@ -1712,6 +1384,7 @@ def get_lead_calendar_events(request, lead_id):
             scheduled_date__lte=end_date
         )
     
+    activity_type_labels = dict(ActivityType.get_all_choices())
     for activity in activities_query:
         if activity.scheduled_date:
             start_iso = activity.scheduled_date.isoformat()
@@ -1723,7 +1396,7 @@ def get_lead_calendar_events(request, lead_id):
                 end_time = activity.scheduled_date + timedelta(hours=1)
                 end_iso = end_time.isoformat()
             
-            activity_type_display = dict(ActivityType.get_all_choices()).get(activity.activity_type, activity.activity_type)
+            activity_type_display = activity_type_labels.get(activity.activity_type, activity.activity_type)
             status_class = 'success' if activity.is_completed else 'warning'
             activity_color = '#28a745' if activity.is_completed else '#ffc107'  # Green if completed, yellow if pending
             
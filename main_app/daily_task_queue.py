@@ -0,0 +1,364 @@
+"""
+Materialised Today's Target queue.
+
+Each counsellor's DailyTargetAssignment for today owns DailyTaskItem rows holding
+the prioritised list my_daily_target shows: visits due by the end of today, pending
+activities, leads in an active status (LeadStatus order), NEW leads last, capped at
+the target count. ``build_all`` materialises every active counsellor's queue at day
+start (Celery beat, or the ``build_daily_task_queue`` command); after that the rows
+are maintained from the Lead / LeadActivity receivers in models.py:
+
+* an activity saved as completed leaves the queue and refreshes completed_count;
+  a pending one is (re)filed;
+* a lead whose status, counsellor or follow-up changes is re-filed (closed and
+  inactive statuses leave the queue);
+* bulk reassignments (``_bulk_update_leads``) rebuild the affected queues, and bulk
+  lead deletes (``_delete_leads``) recount completed_count once per counsellor.
+
+Each save costs at most four queries: dropping the row's old items (skipped for new
+rows), finding today's built assignment, filing the new items and one trimming DELETE.
+Additions are trimmed back to the target count, lowest priority first. Removals do not
+pull in replacements: the list shrinks as the day's work gets done. The page
+reads the queue in one ordered query and never writes; until today's queue exists it
+computes the same list in memory against today's assignment, or an unsaved stand-in
+when the counsellor has none yet.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from . import reference_data
+from .utils import (
+    DEFAULT_DAILY_TARGET,
+    _daily_target_assignments,
+    _target_progress,
+    _toward_target_q,
+    local_day_bounds,
+)
+
+logger = logging.getLogger(__name__)
+
+EXCLUDED_STATUSES = ('NEW', 'CLOSED_WON', 'CLOSED_LOST', 'TRANSFERRED')
+QUEUE_ORDER = ('bucket', 'status_order', 'sort_key', 'id')
+
+# Activities without a scheduled date sort after every dated one (a timestamp far in the future).
+_UNSCHEDULED = 1e12
+
+
+def _status_order():
+    """{status code: position} for the active statuses filed between activities and NEW."""
+    entries = [
+        st for st in reference_data.entries('lead_status', active_only=True)
+        if st.code not in EXCLUDED_STATUSES
+    ]
+    return {st.code: position for position, st in enumerate(entries)}
+
+
+def _lead_items(assignment, lead, today_end, status_order):
+    from .models import DailyTaskItem
+
+    items = []
+    if lead.next_follow_up is not None and lead.next_follow_up < today_end:
+        items.append(DailyTaskItem(
+            assignment=assignment, bucket=DailyTaskItem.VISIT, lead=lead,
+            sort_key=lead.next_follow_up.timestamp(),
+        ))
+    if lead.status == 'NEW':
+        items.append(DailyTaskItem(
+            assignment=assignment, bucket=DailyTaskItem.NEW, lead=lead,
+            sort_key=-lead.created_at.timestamp(),
+        ))
+    elif lead.status in status_order:
+        items.append(DailyTaskItem(
+            assignment=assignment, bucket=DailyTaskItem.STATUS, lead=lead,
+            status_order=status_order[lead.status], sort_key=-lead.created_at.timestamp(),
+        ))
+    return items
+
+
+def _activity_item(assignment, activity):
+    from .models import DailyTaskItem
+
+    scheduled = activity.scheduled_date
+    return DailyTaskItem(
+        assignment=assignment, bucket=DailyTaskItem.ACTIVITY, lead_id=activity.lead_id,
+        activity=activity, sort_key=scheduled.timestamp() if scheduled else _UNSCHEDULED,
+    )
+
+
+def candidate_items(assignment):
+    """
+    Today's prioritised list for ``assignment`` as unsaved DailyTaskItems (with lead /
+    activity attached), computed from the lead and activity tables in four queries.
+    """
+    from .models import DailyTaskItem, Lead, LeadActivity
+
+    counsellor_id = assignment.counsellor_id
+    _, _, today_end = local_day_bounds()
+    status_order = _status_order()
+    remaining = assignment.target.target_count
+    items = []
+
+    visits = list(
+        Lead.objects.filter(assigned_counsellor_id=counsellor_id, next_follow_up__lt=today_end)
+        .select_related('source').order_by('next_follow_up', 'id')[:remaining]
+    )
+    items += [DailyTaskItem(assignment=assignment, bucket=DailyTaskItem.VISIT, lead=lead,
+                            sort_key=lead.next_follow_up.timestamp()) for lead in visits]
+    remaining -= len(visits)
+
+    if remaining > 0:
+        activities = list(
+            LeadActivity.objects.filter(counsellor_id=counsellor_id, is_completed=False)
+            .select_related('lead').order_by(F('scheduled_date').asc(nulls_last=True), 'id')[:remaining]
+        )
+        items += [_activity_item(assignment, activity) for activity in activities]
+        remaining -= len(activities)
+
+    if remaining > 0 and status_order:
+        position = Case(
+            *(When(status=code, then=Value(n)) for code, n in status_order.items()),
+            output_field=IntegerField(),
+        )
+        status_leads = list(
+            Lead.objects.filter(assigned_counsellor_id=counsellor_id, status__in=list(status_order))
+            .select_related('source').order_by(position, '-created_at', 'id')[:remaining]
+        )
+        items += [DailyTaskItem(assignment=assignment, bucket=DailyTaskItem.STATUS, lead=lead,
+                                status_order=status_order[lead.status],
+                                sort_key=-lead.created_at.timestamp()) for lead in status_leads]
+        remaining -= len(status_leads)
+
+    if remaining > 0:
+        new_leads = list(
+            Lead.objects.filter(assigned_counsellor_id=counsellor_id, status='NEW')
+            .select_related('source').order_by('-created_at', 'id')[:remaining]
+        )
+        items += [DailyTaskItem(assignment=assignment, bucket=DailyTaskItem.NEW, lead=lead,
+                                sort_key=-lead.created_at.timestamp()) for lead in new_leads]
+    return items
+
+
+def _completed_toward_target(counsellor_id):
+    from .models import LeadActivity
+
+    _, today_start, today_end = local_day_bounds()
+    return LeadActivity.objects.filter(
+        _toward_target_q(today_start, today_end), counsellor_id=counsellor_id, is_completed=True,
+    ).count()
+
+
+def build(assignment):
+    """Replace ``assignment``'s queue with a freshly computed one."""
+    from .models import DailyTargetAssignment, DailyTaskItem
+
+    items = candidate_items(assignment)
+    completed = _completed_toward_target(assignment.counsellor_id)
+    with transaction.atomic():
+        DailyTaskItem.objects.filter(assignment=assignment).delete()
+        DailyTaskItem.objects.bulk_create(items)
+        assignment.completed_count = completed
+        assignment.queue_built_at = timezone.now()
+        DailyTargetAssignment.objects.filter(pk=assignment.pk).update(
+            completed_count=completed, queue_built_at=assignment.queue_built_at, updated_at=timezone.now(),
+        )
+    return len(items)
+
+
+def build_all():
+    """Build today's queue for every active counsellor and drop earlier days' rows."""
+    from .models import Counsellor, DailyTaskItem
+
+    today, _, _ = local_day_bounds()
+    DailyTaskItem.objects.filter(assignment__target__target_date__lt=today).delete()
+    counsellors = list(Counsellor.objects.filter(is_active=True).order_by('pk'))
+    assignments = _daily_target_assignments(counsellors, today)
+    total = 0
+    for assignment in assignments.values():
+        total += build(assignment)
+    logger.info("Built daily task queues for %d counsellors (%d items)", len(assignments), total)
+    return len(assignments), total
+
+
+def rebuild(counsellor_ids):
+    """Rebuild today's already-built queues for ``counsellor_ids`` (bulk write paths)."""
+    from .models import DailyTargetAssignment
+
+    today, _, _ = local_day_bounds()
+    ids = {pk for pk in counsellor_ids if pk}
+    if not ids:
+        return
+    for assignment in (
+        DailyTargetAssignment.objects
+        .filter(counsellor_id__in=ids, target__target_date=today, queue_built_at__isnull=False)
+        .select_related('target')
+    ):
+        build(assignment)
+
+
+def _built_assignment(counsellor_id):
+    from .models import DailyTargetAssignment
+
+    if not counsellor_id:
+        return None
+    today, _, _ = local_day_bounds()
+    return (
+        DailyTargetAssignment.objects
+        .filter(counsellor_id=counsellor_id, target__target_date=today, queue_built_at__isnull=False)
+        .select_related('target')
+        .order_by('pk')
+        .first()
+    )
+
+
+def _trim(assignment):
+    """Delete the queue's items past the target count, lowest priority first, in one statement."""
+    from .models import DailyTaskItem
+
+    excess = (
+        DailyTaskItem.objects.filter(assignment=assignment)
+        .order_by(*QUEUE_ORDER).values('id')[assignment.target.target_count:]
+    )
+    DailyTaskItem.objects.filter(id__in=excess).delete()
+
+
+def record_activity_saved(activity, created=False):
+    from .models import DailyTaskItem
+
+    if not created:
+        DailyTaskItem.objects.filter(activity_id=activity.pk).delete()
+    assignment = _built_assignment(activity.counsellor_id)
+    if assignment is None:
+        return
+    if activity.is_completed:
+        _refresh_completed_count(assignment)
+    else:
+        _activity_item(assignment, activity).save()
+        _trim(assignment)
+
+
+def record_activity_deleted(activity):
+    if activity.is_completed:
+        assignment = _built_assignment(activity.counsellor_id)
+        if assignment is not None:
+            _refresh_completed_count(assignment)
+
+
+def refresh_completed_counts(counsellor_ids):
+    """Recount completed_count of today's built queues after activities were removed in bulk."""
+    for counsellor_id in {pk for pk in counsellor_ids if pk}:
+        assignment = _built_assignment(counsellor_id)
+        if assignment is not None:
+            _refresh_completed_count(assignment)
+
+
+def _refresh_completed_count(assignment):
+    from .models import DailyTargetAssignment
+
+    DailyTargetAssignment.objects.filter(pk=assignment.pk).update(
+        completed_count=_completed_toward_target(assignment.counsellor_id), updated_at=timezone.now(),
+    )
+
+
+def record_lead_saved(lead, loaded, created):
+    """Re-file a saved lead; ``loaded`` holds its values from before the save."""
+    from .models import DailyTaskItem
+
+    if not created and loaded and all(
+        name in loaded and loaded[name] == getattr(lead, name)
+        for name in ('status', 'assigned_counsellor_id', 'next_follow_up')
+    ):
+        return
+    if not created:
+        DailyTaskItem.objects.filter(lead_id=lead.pk, activity__isnull=True).delete()
+    assignment = _built_assignment(lead.assigned_counsellor_id)
+    if assignment is None:
+        return
+    _, _, today_end = local_day_bounds()
+    items = _lead_items(assignment, lead, today_end, _status_order())
+    if items:
+        DailyTaskItem.objects.bulk_create(items)
+        _trim(assignment)
+
+
+# Reading
+
+def _unbuilt_assignment(counsellor_id, today):
+    """Today's assignment if it exists, else an unsaved one against today's (or the default) target."""
+    from .models import DailyTarget, DailyTargetAssignment
+
+    assignment = (
+        DailyTargetAssignment.objects
+        .filter(counsellor_id=counsellor_id, target__target_date=today)
+        .select_related('target')
+        .order_by('pk')
+        .first()
+    )
+    if assignment is None:
+        target = (
+            DailyTarget.objects.filter(target_date=today).order_by('pk').first()
+            or DailyTarget(target_date=today, target_count=DEFAULT_DAILY_TARGET)
+        )
+        assignment = DailyTargetAssignment(target=target, counsellor_id=counsellor_id)
+    return assignment
+
+
+def _attach(item):
+    """Share the item's lead with its activity so the template's a.lead costs no query."""
+    if item.activity is not None:
+        item.activity._meta.get_field('lead').set_cached_value(item.activity, item.lead)
+    return item.activity or item.lead
+
+
+def read(counsellor):
+    """
+    Context for my_daily_target: today's queue grouped into visits, activities,
+    status_leads ([{'status': entry, 'leads': [...]}]) and new_leads, plus progress.
+    """
+    from .models import DailyTaskItem
+
+    today, _, _ = local_day_bounds()
+    assignment = _built_assignment(counsellor.pk)
+    if assignment is not None:
+        items = list(
+            DailyTaskItem.objects.filter(assignment=assignment)
+            .select_related('lead__source', 'activity')
+            .order_by(*QUEUE_ORDER)
+        )
+        progress = _target_progress(assignment, {'completed': assignment.completed_count})
+    else:
+        assignment = _unbuilt_assignment(counsellor.pk, today)
+        assignment.completed_count = _completed_toward_target(counsellor.pk)
+        progress = _target_progress(assignment, {'completed': assignment.completed_count})
+        items = candidate_items(assignment)
+
+    statuses = {st.code: st for st in reference_data.entries('lead_status')}
+    visits, activities, status_leads, new_leads = [], [], [], []
+    for item in items:
+        row = _attach(item)
+        if item.bucket == DailyTaskItem.VISIT:
+            visits.append(row)
+        elif item.bucket == DailyTaskItem.ACTIVITY:
+            activities.append(row)
+        elif item.bucket == DailyTaskItem.NEW:
+            new_leads.append(row)
+        elif row.status in statuses:
+            if not status_leads or status_leads[-1]['status'].code != row.status:
+                status_leads.append({'status': statuses[row.status], 'leads': []})
+            status_leads[-1]['leads'].append(row)
+
+    return {
+        'assignment': assignment,
+        'today': today,
+        'visits': visits,
+        'activities': activities,
+        'status_leads': status_leads,
+        'new_leads': new_leads,
+        'total_items': len(items),
+        'completed_today': progress['completed_toward_target'],
+        'daily_target': progress['daily_target'],
+        'target_remaining': progress['target_remaining'],
+        'target_progress_pct': progress['target_progress_pct'],
+    }
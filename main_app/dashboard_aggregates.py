@@ -0,0 +1,298 @@
+"""
+Maintained admin-dashboard aggregates.
+
+Every number on the admin home page lives in a DashboardCounter row keyed by
+(metric, key). Lead and Business post_save / post_delete receivers (models.py)
+and the bulk import / assignment paths push +/- deltas, and rendering the dashboard
+reads a handful of small rows instead of scanning the lead table.
+
+The deltas are written with F() updates once the surrounding transaction commits
+(``transaction.on_commit``; dropped on rollback), each update in its own short
+autocommit statement and in sorted (metric, key) order. A lead save therefore never
+holds a lock on the shared rows (lead_status[NEW], the current lead_month) for the
+rest of its transaction, and two writers cannot take those locks in opposite orders.
+``reconcile()`` recomputes everything from the source tables and repairs drift from
+writes that bypass both (raw queryset.update(), deferred-field saves) or a process
+that died between commit and flush; it runs periodically from Celery beat or the
+``reconcile_dashboard_aggregates`` command.
+
+Metrics:
+  lead_status[status], lead_source[source_id], lead_month[YYYY-MM],
+  won_month[YYYY-MM] (CLOSED_WON leads by creation month),
+  counsellor_leads[id], counsellor_business[id], counsellor_business_value[id],
+  business_month[YYYY-MM] (value of ACTIVE business by creation month).
+"""
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+WON_STATUS = 'CLOSED_WON'
+ACTIVE_BUSINESS = 'ACTIVE'
+MONTH_METRICS = ('lead_month', 'won_month', 'business_month')
+
+_local = threading.local()
+
+
+def month_key(dt):
+    if dt is None:
+        dt = timezone.now()
+    if timezone.is_aware(dt):
+        dt = timezone.localtime(dt)
+    return dt.strftime('%Y-%m')
+
+
+def _apply(deltas):
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending.update(deltas)
+        return
+    _flush_on_commit(deltas)
+
+
+def _flush_on_commit(deltas):
+    deltas = {term: delta for term, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: _flush(deltas), robust=True)
+
+
+def _flush(deltas):
+    from .models import DashboardCounter
+
+    for (metric, key), delta in sorted(deltas.items()):
+        rows = DashboardCounter.objects.filter(metric=metric, key=key)
+        if rows.update(value=F('value') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                DashboardCounter.objects.create(metric=metric, key=key, value=delta)
+        except IntegrityError:
+            rows.update(value=F('value') + delta)
+
+
+@contextmanager
+def batched():
+    """Collect deltas in memory (e.g. one per deleted lead) and write them once, after commit."""
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = Counter()
+    try:
+        yield
+        deltas = _local.pending
+    finally:
+        _local.pending = None
+    _flush_on_commit(deltas)
+
+
+# Leads
+
+def _lead_terms(status, source_id, counsellor_id, created_at):
+    month = month_key(created_at)
+    terms = [('lead_status', status), ('lead_source', str(source_id)), ('lead_month', month)]
+    if counsellor_id:
+        terms.append(('counsellor_leads', str(counsellor_id)))
+    if status == WON_STATUS:
+        terms.append(('won_month', month))
+    return terms
+
+
+def _lead_state(lead):
+    """(status, source_id, counsellor_id, created_at) or None if any field is deferred."""
+    names = ('status', 'source_id', 'assigned_counsellor_id', 'created_at')
+    if any(name not in lead.__dict__ for name in names):
+        return None
+    return tuple(lead.__dict__[name] for name in names)
+
+
+def _add_lead_change(deltas, lead, created):
+    state = _lead_state(lead)
+    if state is None:
+        return
+    if created:
+        for term in _lead_terms(*state):
+            deltas[term] += 1
+    else:
+        loaded = getattr(lead, '_loaded_values', None) or {}
+        if all(name in loaded for name in ('status', 'source_id', 'assigned_counsellor_id')):
+            previous = (loaded['status'], loaded['source_id'], loaded['assigned_counsellor_id'])
+            if previous != state[:3]:
+                for term in _lead_terms(*previous, state[3]):
+                    deltas[term] -= 1
+                for term in _lead_terms(*state):
+                    deltas[term] += 1
+    lead.remember_loaded_values()
+
+
+def record_lead_saved(lead, created):
+    deltas = Counter()
+    _add_lead_change(deltas, lead, created)
+    _apply(deltas)
+
+
+def record_leads_created(leads):
+    """bulk_create / COPY inserts (no signals)."""
+    deltas = Counter()
+    for lead in leads:
+        _add_lead_change(deltas, lead, True)
+    _apply(deltas)
+
+
+def record_lead_updates(leads):
+    """bulk_update of tracked fields (no signals); diffs against the loaded values."""
+    deltas = Counter()
+    for lead in leads:
+        _add_lead_change(deltas, lead, False)
+    _apply(deltas)
+
+
+def record_lead_deleted(lead):
+    state = _lead_state(lead)
+    if state is None:
+        return
+    _apply(Counter({term: -1 for term in _lead_terms(*state)}))
+
+
+# Business
+
+def _business_terms(status, value, counsellor_id, created_at):
+    value = Decimal(value or 0)
+    terms = [
+        (('counsellor_business', str(counsellor_id)), 1),
+        (('counsellor_business_value', str(counsellor_id)), value),
+    ]
+    if status == ACTIVE_BUSINESS:
+        terms.append((('business_month', month_key(created_at)), value))
+    return terms
+
+
+def _business_state(business):
+    names = ('status', 'value', 'counsellor_id', 'created_at')
+    if any(name not in business.__dict__ for name in names):
+        return None
+    return tuple(business.__dict__[name] for name in names)
+
+
+def record_business_saved(business, created):
+    state = _business_state(business)
+    if state is None:
+        return
+    deltas = Counter()
+    if created:
+        for term, amount in _business_terms(*state):
+            deltas[term] += amount
+    else:
+        loaded = getattr(business, '_loaded_values', None) or {}
+        if all(name in loaded for name in ('status', 'value', 'counsellor_id')):
+            previous = (loaded['status'], loaded['value'], loaded['counsellor_id'])
+            if previous != state[:3]:
+                for term, amount in _business_terms(*previous, state[3]):
+                    deltas[term] -= amount
+                for term, amount in _business_terms(*state):
+                    deltas[term] += amount
+    business.remember_loaded_values()
+    _apply(deltas)
+
+
+def record_business_deleted(business):
+    state = _business_state(business)
+    if state is None:
+        return
+    deltas = Counter()
+    for term, amount in _business_terms(*state):
+        deltas[term] -= amount
+    _apply(deltas)
+
+
+# Reconciliation / reads
+
+def _month_rows(queryset, aggregate):
+    for row in queryset.annotate(m=TruncMonth('created_at')).values('m').annotate(v=aggregate):
+        if row['m'] is not None:
+            yield row['m'].strftime('%Y-%m'), row['v'] or 0
+
+
+def compute_counters():
+    """Every counter recomputed from Lead / Business with GROUP BY queries."""
+    from .models import Business, Lead
+
+    leads = Lead.objects.order_by()
+    business = Business.objects.order_by()
+    expected = Counter()
+    for row in leads.values('status').annotate(n=Count('id')):
+        expected[('lead_status', row['status'])] = row['n']
+    for row in leads.values('source').annotate(n=Count('id')):
+        expected[('lead_source', str(row['source']))] = row['n']
+    for row in (
+        leads.filter(assigned_counsellor__isnull=False)
+        .values('assigned_counsellor').annotate(n=Count('id'))
+    ):
+        expected[('counsellor_leads', str(row['assigned_counsellor']))] = row['n']
+    for month, n in _month_rows(leads, Count('id')):
+        expected[('lead_month', month)] = n
+    for month, n in _month_rows(leads.filter(status=WON_STATUS), Count('id')):
+        expected[('won_month', month)] = n
+    for row in business.values('counsellor').annotate(n=Count('id'), v=Sum('value')):
+        expected[('counsellor_business', str(row['counsellor']))] = row['n']
+        expected[('counsellor_business_value', str(row['counsellor']))] = row['v'] or 0
+    for month, v in _month_rows(business.filter(status=ACTIVE_BUSINESS), Sum('value')):
+        expected[('business_month', month)] = v
+    return expected
+
+
+def reconcile():
+    """Rewrite counters that drifted from the source tables; returns how many were repaired."""
+    from .models import DashboardCounter
+
+    expected = compute_counters()
+    repaired = 0
+    with transaction.atomic():
+        existing = {(c.metric, c.key): c for c in DashboardCounter.objects.select_for_update()}
+        to_update = []
+        for term, counter in existing.items():
+            want = Decimal(expected.pop(term, 0))
+            if counter.value != want:
+                counter.value = want
+                to_update.append(counter)
+        to_create = [
+            DashboardCounter(metric=metric, key=key, value=value)
+            for (metric, key), value in expected.items()
+            if value
+        ]
+        if to_update:
+            DashboardCounter.objects.bulk_update(to_update, ['value'], batch_size=500)
+        if to_create:
+            DashboardCounter.objects.bulk_create(to_create, batch_size=500)
+        repaired = len(to_update) + len(to_create)
+    if repaired:
+        logger.info("Dashboard aggregates reconciled: %s counters repaired", repaired)
+    return repaired
+
+
+def read_counters(months):
+    """{metric: {key: value}} for the non-monthly metrics plus the given YYYY-MM months."""
+    from .models import DashboardCounter, Lead
+
+    def load():
+        out = {}
+        rows = DashboardCounter.objects.exclude(metric__in=MONTH_METRICS) | DashboardCounter.objects.filter(
+            metric__in=MONTH_METRICS, key__in=months
+        )
+        for metric, key, value in rows.values_list('metric', 'key', 'value'):
+            out.setdefault(metric, {})[key] = value
+        return out
+
+    counters = load()
+    if not counters and Lead.objects.exists():
+        # First use after deploying the counters table: build it once.
+        reconcile()
+        counters = load()
+    return counters
@@ -362,6 +362,21 @@ class CounsellorEditForm(CustomUserForm):
     employee_id = forms.CharField(max_length=20, required=True)
     department = forms.CharField(max_length=100, required=False)
     is_active = forms.BooleanField(required=False)
+    lead_capacity = forms.IntegerField(
+        min_value=0,
+        initial=100,
+        help_text='Relative share of leads in weighted-fair assignment (0 = none).',
+    )
+    lead_view_alert_threshold = forms.IntegerField(
+        min_value=1,
+        required=False,
+        help_text='Distinct leads viewed in 24 hours before admins are alerted (blank = default).',
+    )
+    phone_reveal_alert_threshold = forms.IntegerField(
+        min_value=1,
+        required=False,
+        help_text='Distinct leads with phone reveals in 1 hour before admins are alerted (blank = default).',
+    )
     
     def __init__(self, *args, **kwargs):
         # Extract counsellor instance if provided
@@ -373,6 +388,9 @@ class CounsellorEditForm(CustomUserForm):
             self.fields['employee_id'].initial = counsellor_instance.employee_id
             self.fields['department'].initial = counsellor_instance.department
             self.fields['is_active'].initial = counsellor_instance.is_active
+            self.fields['lead_capacity'].initial = counsellor_instance.lead_capacity
+            self.fields['lead_view_alert_threshold'].initial = counsellor_instance.lead_view_alert_threshold
+            self.fields['phone_reveal_alert_threshold'].initial = counsellor_instance.phone_reveal_alert_threshold
 
     class Meta(CustomUserForm.Meta):
         model = CustomUser
@@ -395,6 +413,13 @@ class LeadImportForm(forms.Form):
         required=False,
         label='Assign to Counsellor (Optional)'
     )
+    duplicate_policy = forms.ChoiceField(
+        choices=ImportJob.DUPLICATE_POLICY_CHOICES,
+        initial=ImportJob.DEFAULT_DUPLICATE_POLICY,
+        required=False,
+        label='Duplicate phone / email',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
 
     def clean_file(self):
         uploaded = self.cleaned_data.get('file')
@@ -0,0 +1,62 @@
+"""
+Storage for lead import uploads and their error reports.
+
+The web process saves the upload and a Celery worker on another host opens it, so the
+files must live somewhere both can reach. With object storage (AWS_STORAGE_BUCKET_NAME)
+or a MEDIA_ROOT shared between web and worker (LEAD_IMPORT_SHARED_MEDIA) that is the
+default file storage. Otherwise the files are kept in the database (ImportFile rows);
+uploads are capped at MAX_LEAD_IMPORT_MB and deleted when the job completes.
+"""
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, Storage, default_storage
+
+
+class DatabaseStorage(Storage):
+    """Minimal Storage keeping each file's bytes in an ImportFile row."""
+
+    def _rows(self, name):
+        from .models import ImportFile
+
+        return ImportFile.objects.filter(name=name)
+
+    def _open(self, name, mode='rb'):
+        content = self._rows(name).values_list('content', flat=True).first()
+        if content is None:
+            raise FileNotFoundError(name)
+        return ContentFile(bytes(content), name=name)
+
+    def _save(self, name, content):
+        from .models import ImportFile
+
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        ImportFile.objects.create(name=name, content=b''.join(content.chunks()))
+        return name
+
+    def exists(self, name):
+        return self._rows(name).exists()
+
+    def delete(self, name):
+        self._rows(name).delete()
+
+    def size(self, name):
+        content = self._rows(name).values_list('content', flat=True).first()
+        if content is None:
+            raise FileNotFoundError(name)
+        return len(content)
+
+    def url(self, name):
+        raise NotImplementedError("Import files are served by the import job views.")
+
+
+def default_storage_is_shared():
+    """True when a worker on another host can open files saved to the default storage."""
+    if getattr(settings, 'LEAD_IMPORT_SHARED_MEDIA', False):
+        return True
+    return not isinstance(default_storage, FileSystemStorage)
+
+
+def import_file_storage():
+    """FileField storage callable for ImportJob.file / error_report."""
+    return default_storage if default_storage_is_shared() else DatabaseStorage()
@@ -0,0 +1,138 @@
+"""
+PostgreSQL COPY loader for lead imports.
+
+Rows of a batch are checked against the column constraints in Python, streamed with
+``COPY ... FROM STDIN`` into a transaction-scoped staging table and merged into the
+lead table with one ``INSERT ... SELECT ... ON CONFLICT (lead_id) DO NOTHING``.
+Rows whose lead_id already exists and rows that fail the Python checks come back
+individually, so they never trigger a per-row save retry of their batch. Any other
+violation (a foreign key, a constraint added later) is not absorbed by the ON CONFLICT
+clause: it raises, and ``_insert_import_batch`` logs it and retries the batch with
+bulk_create and then row by row, which reports the real error per row.
+"""
+from __future__ import annotations
+
+import io
+import logging
+from typing import List, Tuple
+
+from django.db import connection, transaction
+from django.utils.text import capfirst
+
+from .models import Lead
+
+logger = logging.getLogger(__name__)
+
+STAGE_TABLE = "lead_import_stage"
+_ROW_COLUMN = "import_row"
+
+
+def copy_supported() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def _copy_fields():
+    return [f for f in Lead._meta.concrete_fields if not f.primary_key]
+
+
+def _copy_text(value) -> str:
+    """Encode one value for COPY's text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _row_values(lead, fields) -> list:
+    """DB values for one unsaved lead, as bulk_create would send them (auto_now included)."""
+    values = []
+    for field in fields:
+        value = field.get_db_prep_save(field.pre_save(lead, True), connection=connection)
+        if value is None and not field.null:
+            raise ValueError(f"{capfirst(field.verbose_name)} cannot be empty.")
+        max_length = getattr(field, "max_length", None)
+        if max_length and value is not None and len(str(value)) > max_length:
+            raise ValueError(
+                f"{capfirst(field.verbose_name)} has {len(str(value))} characters (max {max_length})."
+            )
+        values.append(value)
+    return values
+
+
+def _copy_from(cursor, sql: str, buffer: io.StringIO) -> None:
+    raw = cursor.cursor
+    if hasattr(raw, "copy_expert"):  # psycopg2
+        raw.copy_expert(sql, buffer)
+    else:  # psycopg 3
+        with raw.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+def copy_insert_leads(leads: List[Lead]) -> Tuple[List[Lead], List[Tuple[int, str]]]:
+    """
+    Insert unsaved leads through COPY + set-wise merge.
+    Returns (inserted_leads, failures) like ``_insert_import_batch``; inserted leads get
+    their primary keys set.
+    """
+    fields = _copy_fields()
+    failures: List[Tuple[int, str]] = []
+    buffer = io.StringIO()
+    staged = {}
+    for idx, lead in enumerate(leads):
+        try:
+            values = _row_values(lead, fields)
+        except (TypeError, ValueError) as e:
+            failures.append((idx, str(e)))
+            continue
+        staged[idx] = lead
+        buffer.write("\t".join(_copy_text(v) for v in values + [idx]))
+        buffer.write("\n")
+    if not staged:
+        return [], failures
+    buffer.seek(0)
+
+    qn = connection.ops.quote_name
+    table = qn(Lead._meta.db_table)
+    columns = ", ".join(qn(f.column) for f in fields)
+    pk_column = qn(Lead._meta.pk.column)
+    lead_id_column = qn(Lead._meta.get_field("lead_id").column)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Same column types as the lead table, no constraints; dropped at commit.
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} ON COMMIT DROP AS "
+            f"SELECT {columns} FROM {table} WITH NO DATA"
+        )
+        cursor.execute(f"ALTER TABLE {STAGE_TABLE} ADD COLUMN IF NOT EXISTS {_ROW_COLUMN} integer")
+        cursor.execute(f"TRUNCATE {STAGE_TABLE}")
+        _copy_from(
+            cursor,
+            f"COPY {STAGE_TABLE} ({columns}, {_ROW_COLUMN}) FROM STDIN",
+            buffer,
+        )
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) "
+            f"SELECT {columns} FROM {STAGE_TABLE} ORDER BY {_ROW_COLUMN} "
+            f"ON CONFLICT ({lead_id_column}) DO NOTHING RETURNING {pk_column}, {lead_id_column}"
+        )
+        pks = dict((lead_id, pk) for pk, lead_id in cursor.fetchall())
+
+    inserted = []
+    for idx, lead in staged.items():
+        pk = pks.pop(lead.lead_id, None)
+        if pk is None:
+            failures.append((idx, f"Lead ID {lead.lead_id} already exists."))
+            continue
+        lead.pk = pk
+        lead._state.adding = False
+        lead._state.db = connection.alias
+        inserted.append(lead)
+    failures.sort()
+    return inserted, failures
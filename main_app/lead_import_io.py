@@ -1,12 +1,18 @@
 """
 CSV / Excel row iteration for lead import without pandas (lighter Railway deploys).
+
+Rows are streamed from the uploaded file: CSV is decoded incrementally and
+openpyxl reads the sheet in read-only mode, so memory stays flat regardless
+of file size.
 """
 from __future__ import annotations
 
 import csv
 import io
 import math
-from typing import Any, Dict, Iterator, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, TypeVar
+
+T = TypeVar("T")
 
 
 def is_blank_import_value(val: Any) -> bool:
@@ -25,13 +31,32 @@ def _normalize_header(name: Any) -> str:
     return str(name).strip()
 
 
+def _rewind(file) -> None:
+    if hasattr(file, "seek"):
+        try:
+            file.seek(0)
+        except (OSError, ValueError):
+            pass
+
+
 def _iter_csv_rows(file) -> Iterator[Tuple[int, Dict[str, Any]]]:
-    raw = file.read()
-    if isinstance(raw, bytes):
-        text = raw.decode("utf-8-sig")
-    else:
-        text = str(raw)
-    reader = csv.DictReader(io.StringIO(text))
+    _rewind(file)
+    # Django UploadedFile / FieldFile wrap the real stream (BytesIO or a file on disk).
+    raw = file
+    while getattr(raw, "file", None) is not None and raw.file is not raw:
+        raw = raw.file
+    if isinstance(raw, io.TextIOBase):
+        yield from _iter_csv_reader(csv.DictReader(raw))
+        return
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    try:
+        yield from _iter_csv_reader(csv.DictReader(text))
+    finally:
+        # Leave the upload open; Django closes it at the end of the request.
+        text.detach()
+
+
+def _iter_csv_reader(reader: csv.DictReader) -> Iterator[Tuple[int, Dict[str, Any]]]:
     if not reader.fieldnames:
         return
     # Strip header keys so " email " matches "email"
@@ -54,9 +79,9 @@ def _iter_csv_rows(file) -> Iterator[Tuple[int, Dict[str, Any]]]:
 def _iter_xlsx_rows(file) -> Iterator[Tuple[int, Dict[str, Any]]]:
     from openpyxl import load_workbook
 
-    data = file.read()
-    bio = io.BytesIO(data)
-    wb = load_workbook(bio, read_only=True, data_only=True)
+    _rewind(file)
+    # read_only mode parses the sheet XML lazily straight from the zip member.
+    wb = load_workbook(file, read_only=True, data_only=True)
     try:
         ws = wb.active
         rows = ws.iter_rows(values_only=True)
@@ -78,15 +103,37 @@ def _iter_xlsx_rows(file) -> Iterator[Tuple[int, Dict[str, Any]]]:
         wb.close()
 
 
-def iter_lead_import_rows(file, filename: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+def iter_lead_import_rows(
+    file, filename: str, xlsx_workers: int = 0
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
     """
     Yield (row_number, row_dict) for each data row.
     Row numbers start at 2 (row 1 is headers).
+
+    ``xlsx_workers`` > 0 parses .xlsx sheets with the multi-process backend in
+    ``lead_import_xlsx``; 0 keeps the single-threaded openpyxl reader.
     """
     name = (filename or "").lower()
     if name.endswith(".csv"):
         yield from _iter_csv_rows(file)
     elif name.endswith(".xlsx"):
-        yield from _iter_xlsx_rows(file)
+        if xlsx_workers > 0:
+            from .lead_import_xlsx import iter_xlsx_rows_parallel
+
+            yield from iter_xlsx_rows_parallel(file, workers=xlsx_workers)
+        else:
+            yield from _iter_xlsx_rows(file)
     else:
         raise ValueError("Only .csv and .xlsx lead imports are supported.")
+
+
+def iter_row_batches(rows: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    """Group an iterator into lists of at most ``batch_size`` items without materialising it."""
+    batch: List[T] = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,323 @@
+"""
+Parallel .xlsx row parser for large lead workbooks.
+
+openpyxl's read-only reader walks the sheet XML cell by cell in one thread, which
+dominates the cost of importing big workbooks. This backend lets openpyxl read the
+workbook metadata (shared strings, date styles, active sheet), inflates the sheet XML
+once into a temp file, cuts it into byte ranges on ``<row>`` boundaries and parses
+the ranges in a process pool. Rows come back in sheet order as the same
+``(row_number, row_dict)`` tuples that ``lead_import_io._iter_xlsx_rows`` yields.
+Workbooks the planner cannot split safely (or an openpyxl without the reader
+internals used here) are read with that serial reader instead.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from openpyxl.utils.cell import column_index_from_string
+from openpyxl.utils.datetime import from_ISO8601, from_excel
+
+from .lead_import_io import _iter_xlsx_rows, _normalize_header, _rewind, is_blank_import_value
+
+logger = logging.getLogger(__name__)
+
+# Uncompressed sheet XML handed to one worker task (~15-25k typical lead rows).
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+
+_SHEET_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_ROW_TAG = "{%s}row" % _SHEET_NS
+_CELL_TAG = "{%s}c" % _SHEET_NS
+_VALUE_TAG = "{%s}v" % _SHEET_NS
+_INLINE_TAG = "{%s}is" % _SHEET_NS
+_TEXT_TAG = "{%s}t" % _SHEET_NS
+_RUN_TAG = "{%s}r" % _SHEET_NS
+_SCAN_BLOCK = 256 * 1024
+
+
+class _Unsupported(Exception):
+    """The sheet cannot be split safely; the caller falls back to the serial reader."""
+
+
+# Set in each worker by _init_worker (and in-process for the serial fallback).
+_state: Dict[str, Any] = {}
+
+
+def _init_worker(shared_strings, date_styles, timedelta_styles, epoch, wrapper):
+    _state.update(
+        shared_strings=shared_strings,
+        date_styles=date_styles,
+        timedelta_styles=timedelta_styles,
+        epoch=epoch,
+        wrapper=wrapper,
+    )
+
+
+@lru_cache(maxsize=512)
+def _column_index(letters: str) -> int:
+    return column_index_from_string(letters)
+
+
+def _split_ref(ref: str) -> Tuple[int, int]:
+    letters = ref.rstrip("0123456789")
+    return int(ref[len(letters):]), _column_index(letters)
+
+
+def _cast_cell(cell) -> Any:
+    """Mirror openpyxl's read-only, data_only cell conversion."""
+    data_type = cell.get("t", "n")
+    if data_type == "inlineStr":
+        node = cell.find(_INLINE_TAG)
+        if node is None:
+            return None
+        # Same as openpyxl's Text.content: plain <t> plus the <t> of each rich-text run.
+        parts = [node.findtext(_TEXT_TAG)] + [run.findtext(_TEXT_TAG) for run in node.iter(_RUN_TAG)]
+        return "".join(p for p in parts if p is not None)
+
+    value = cell.findtext(_VALUE_TAG) or None
+    if value is None:
+        return None
+    if data_type == "n":
+        value = float(value) if ("." in value or "E" in value or "e" in value) else int(value)
+        style_id = int(cell.get("s") or 0)
+        if style_id in _state["date_styles"]:
+            try:
+                return from_excel(
+                    value, _state["epoch"], timedelta=style_id in _state["timedelta_styles"]
+                )
+            except (OverflowError, ValueError):
+                return "#VALUE!"
+        return value
+    if data_type == "s":
+        return _state["shared_strings"][int(value)]
+    if data_type == "b":
+        return bool(int(value))
+    if data_type == "d":
+        return from_ISO8601(value)
+    return value
+
+
+def _parse_range(path: str, start: int, end: int) -> List[Tuple[Optional[int], Dict[int, Any]]]:
+    """
+    Parse the ``<row>`` elements in bytes [start, end) of the inflated sheet XML.
+    Returns (row_number, {column_index: value}); row_number is None when the row has
+    no ``r`` attribute and must be numbered from the previous row by the caller.
+    """
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        data = fh.read(end - start)
+    head, tail = _state["wrapper"]
+    root = ET.fromstring(head + data + tail)
+
+    out = []
+    for row in root.iter(_ROW_TAG):
+        r = row.get("r")
+        values: Dict[int, Any] = {}
+        col = 0
+        for cell in row.iter(_CELL_TAG):
+            ref = cell.get("r")
+            col = _split_ref(ref)[1] if ref else col + 1
+            value = _cast_cell(cell)
+            if value is not None:
+                values[col] = value
+        out.append((int(r) if r else None, values))
+        row.clear()
+    return out
+
+
+def _find(fh, pattern: re.Pattern, pos: int, limit: Optional[int] = None):
+    """First match of pattern at or after pos, scanning the file in blocks."""
+    overlap = 64
+    while limit is None or pos < limit:
+        fh.seek(pos)
+        block = fh.read(_SCAN_BLOCK)
+        if not block:
+            return None
+        m = pattern.search(block)
+        if m:
+            return pos + m.start(), m
+        if len(block) < _SCAN_BLOCK:
+            return None
+        pos += len(block) - overlap
+    return None
+
+
+def _rfind(fh, needle: bytes, start: int, end: int) -> Optional[int]:
+    """Last occurrence of needle in bytes [start, end), scanning backwards in blocks."""
+    pos = end
+    while pos > start:
+        block_start = max(start, pos - _SCAN_BLOCK)
+        fh.seek(block_start)
+        # Read past pos by len(needle) - 1 so a match straddling two blocks is found.
+        block = fh.read(min(end, pos + len(needle) - 1) - block_start)
+        idx = block.rfind(needle)
+        if idx >= 0:
+            return block_start + idx
+        pos = block_start
+    return None
+
+
+def _plan_ranges(path: str, size: int, chunk_bytes: int):
+    """
+    Locate <sheetData> in the inflated sheet and split its body on row starts.
+    Returns (ranges, wrapper) or None when the sheet has no rows; raises
+    _Unsupported when the end of <sheetData> cannot be found.
+    """
+    with open(path, "rb") as fh:
+        found = _find(fh, re.compile(rb"<(?:(\w+):)?sheetData\b[^>]*?(/?)>"), 0)
+        if found is None or found[1].group(2):
+            return None
+        sheet_data_pos, m = found
+        prefix = m.group(1) or b""
+        data_start = sheet_data_pos + len(m.group(0))
+
+        # Namespace declarations live on the <worksheet> root; reuse them for each range.
+        fh.seek(0)
+        root_tag = re.search(rb"<(?:\w+:)?worksheet\b[^>]*>", fh.read(sheet_data_pos))
+        decls = b" ".join(re.findall(
+            rb"xmlns(?::\w+)?=(?:\"[^\"]*\"|'[^']*')", root_tag.group(0) if root_tag else b""
+        ))
+        qual = prefix + b":" if prefix else b""
+        wrapper = (b"<" + qual + b"sheetData " + decls + b">", b"</" + qual + b"sheetData>")
+
+        # Parts after the rows (hyperlinks, merged cells, ...) can be any size: search back to the tag.
+        data_end = _rfind(fh, b"</" + qual + b"sheetData>", data_start, size)
+        if data_end is None:
+            raise _Unsupported("no </sheetData> after <sheetData>")
+
+        row_start = re.compile(b"<" + re.escape(qual) + rb"row[\s>]")
+        bounds = [data_start]
+        target = data_start + chunk_bytes
+        while target < data_end:
+            hit = _find(fh, row_start, target, data_end)
+            if hit is None or hit[0] >= data_end:
+                break
+            bounds.append(hit[0])
+            target = hit[0] + chunk_bytes
+        bounds.append(data_end)
+    return list(zip(bounds, bounds[1:])), wrapper
+
+
+def _iter_parsed_ranges(path, ranges, workers, initargs):
+    """Yield parsed ranges in order, keeping at most ``2 * workers`` in flight."""
+    if workers <= 1 or len(ranges) == 1:
+        _init_worker(*initargs)
+        for start, end in ranges:
+            yield _parse_range(path, start, end)
+        return
+
+    executor = None
+    try:
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=initargs
+        )
+        pending = deque()
+        todo = iter(ranges)
+        for start, end in todo:
+            pending.append(executor.submit(_parse_range, path, start, end))
+            if len(pending) >= workers * 2:
+                break
+    except (AssertionError, OSError, NotImplementedError) as exc:
+        # e.g. daemonic Celery prefork children may not start processes of their own.
+        logger.warning("XLSX process pool unavailable (%s); parsing in-process", exc)
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        _init_worker(*initargs)
+        for start, end in ranges:
+            yield _parse_range(path, start, end)
+        return
+
+    try:
+        while pending:
+            yield pending.popleft().result()
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append(executor.submit(_parse_range, path, *nxt))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _inflate_active_sheet(wb, sheet) -> Tuple[tuple, int]:
+    """
+    Copy the active sheet's XML into ``sheet``; return (worker initargs, size).
+    The reader state comes from openpyxl internals, so a version without them
+    raises _Unsupported.
+    """
+    try:
+        ws = wb.active
+        initargs = (
+            list(wb.shared_strings),
+            frozenset(wb._date_formats),
+            frozenset(wb._timedelta_formats),
+            wb.epoch,
+        )
+        member = wb._archive.open(ws._worksheet_path)
+    except (AttributeError, KeyError) as exc:
+        raise _Unsupported(f"openpyxl reader internals changed: {exc!r}") from None
+    with member as src:
+        shutil.copyfileobj(src, sheet, 1024 * 1024)
+    sheet.flush()
+    return initargs, sheet.tell()
+
+
+def _prepare(file, sheet, chunk_bytes: int):
+    """Inflate the active sheet into ``sheet`` and plan its ranges: (initargs, plan)."""
+    from openpyxl import load_workbook
+
+    _rewind(file)
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        initargs, size = _inflate_active_sheet(wb, sheet)
+    finally:
+        wb.close()
+    return initargs, _plan_ranges(sheet.name, size, max(chunk_bytes, 64 * 1024))
+
+
+def iter_xlsx_rows_parallel(
+    file, workers: int = 2, chunk_bytes: int = DEFAULT_CHUNK_BYTES
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (row_number, row_dict) for the active sheet like ``_iter_xlsx_rows``,
+    parsing ``chunk_bytes`` slices of the sheet XML on ``workers`` processes.
+    """
+    sheet = tempfile.NamedTemporaryFile(prefix="lead-import-", suffix=".xml")
+    try:
+        try:
+            initargs, plan = _prepare(file, sheet, chunk_bytes)
+        except _Unsupported as exc:
+            logger.warning("Parallel XLSX parsing unavailable (%s); using the serial reader", exc)
+            yield from _iter_xlsx_rows(file)
+            return
+        if plan is None:
+            return
+        ranges, wrapper = plan
+
+        headers: Optional[List[str]] = None
+        prev_row = 0
+        for parsed in _iter_parsed_ranges(sheet.name, ranges, workers, initargs + (wrapper,)):
+            for row_number, values in parsed:
+                row_number = row_number or prev_row + 1
+                prev_row = row_number
+                if headers is None:
+                    # openpyxl treats sheet row 1 as the header, even when it is empty.
+                    if row_number != 1:
+                        return
+                    width = max(values, default=0)
+                    headers = [_normalize_header(values.get(j)) for j in range(1, width + 1)]
+                    continue
+                d: Dict[str, Any] = {}
+                for j, name in enumerate(headers, start=1):
+                    if name:
+                        d[name] = values.get(j)
+                if not any(not is_blank_import_value(v) for v in d.values()):
+                    continue
+                yield row_number, d
+    finally:
+        sheet.close()
@@ -0,0 +1,203 @@
+"""
+Indexed lead search for the manage_leads search box.
+
+Every lead stores ``search_text``: its name, email and lead id lower-cased, plus the
+digits of its phone numbers (as typed and E.164-normalized, see contact_keys.py).
+Lead.save(), the import builders and ``_bulk_update_leads`` keep it current. A
+search is then one substring match on one column, which is indexed per backend:
+
+* PostgreSQL: a pg_trgm GIN index on search_text, used by ``LIKE '%term%'``.
+* SQLite: an FTS5 table with the trigram tokenizer, kept in sync with the lead table
+  by triggers and queried with MATCH.
+
+Terms under three characters (too short for trigrams) and other backends fall back
+to a plain ``contains`` on search_text. A term made only of digits and phone
+punctuation is searched by its digits, so "+91 98765-43210", "98765 43210" and
+"9876543210" all find the same lead.
+"""
+import logging
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .contact_keys import normalize_phone
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'main_app_lead_search'
+TRIGRAM_INDEX = 'main_app_lead_search_trgm'
+
+# Lead fields search_text is built from; changing any of them needs a refresh.
+SOURCE_FIELDS = ('first_name', 'last_name', 'email', 'lead_id', 'phone', 'alternate_phone')
+
+_NON_DIGITS = re.compile(r'\D+')
+_PHONE_TERM = re.compile(r'^[\d\s()+\-./]+$')
+_SPACES = re.compile(r'\s+')
+_fts_ready = {}
+
+
+def _text(value):
+    return _SPACES.sub(' ', str(value or '')).strip().lower()
+
+
+def _phone_parts(value):
+    digits = _NON_DIGITS.sub('', str(value or ''))
+    key = normalize_phone(value)
+    if not digits:
+        return []
+    if key and digits in key:
+        return [key]
+    return [digits, key] if key else [digits]
+
+
+def build_search_text(first_name, last_name, email, lead_id, phone, alternate_phone):
+    parts = [
+        _text(f'{first_name or ""} {last_name or ""}'),
+        _text(email),
+        _text(lead_id),
+        *_phone_parts(phone),
+        *_phone_parts(alternate_phone),
+    ]
+    return '\n'.join(p for p in parts if p)
+
+
+def search_text_for(lead):
+    return build_search_text(*(getattr(lead, f) for f in SOURCE_FIELDS))
+
+
+def normalize_term(term):
+    """The strings a search term is matched as (any one of them may match)."""
+    term = _text(term)
+    if not term:
+        return []
+    if _PHONE_TERM.match(term):
+        digits = _NON_DIGITS.sub('', term)
+        if len(digits) >= 3:
+            key = normalize_phone(term)
+            return [digits, key] if key and key != digits else [digits]
+    return [term]
+
+
+def fts_available():
+    """
+    Whether the SQLite FTS5 table and its sync triggers exist. Migrations that rebuild
+    the lead table drop its triggers; searches then fall back to contains() until
+    ``manage.py rebuild_lead_search`` recreates them.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_ready:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+                [FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'],
+            )
+            ready = cursor.fetchone()[0] == 4
+        if not ready:
+            logger.warning("Lead search index missing or incomplete; run manage.py rebuild_lead_search.")
+        _fts_ready[name] = ready
+    return _fts_ready[name]
+
+
+def _fts_phrase(needle):
+    return '"' + needle.replace('"', '""') + '"'
+
+
+def search_leads(queryset, term):
+    """Filter a Lead queryset to rows whose searchable fields contain ``term``."""
+    needles = normalize_term(term)
+    if not needles:
+        return queryset
+    if all(len(n) >= 3 for n in needles) and fts_available():
+        match = ' OR '.join(_fts_phrase(n) for n in needles)
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        )
+    condition = Q()
+    for needle in needles:
+        condition |= Q(search_text__contains=needle)
+    return queryset.filter(condition)
+
+
+def refresh(leads, fields):
+    """
+    Recompute search_text on ``leads`` when ``fields`` touch its sources; returns the
+    field list to save (``fields`` plus search_text when it was refreshed).
+    """
+    if not set(SOURCE_FIELDS) & set(fields):
+        return list(fields)
+    for lead in leads:
+        lead.search_text = search_text_for(lead)
+    return list(fields) + ['search_text']
+
+
+# Index management (called from migrations and ``rebuild_lead_search``)
+
+def create_index(schema_editor=None):
+    """Create the backend's search index if it supports one. Returns what was created."""
+    conn = schema_editor.connection if schema_editor is not None else connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON main_app_lead "
+                f"USING gin (search_text gin_trgm_ops)"
+            )
+            return 'pg_trgm'
+        if conn.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    f"search_text, content='main_app_lead', content_rowid='id', tokenize='trigram')"
+                )
+            except Exception:
+                # SQLite built without FTS5 / trigram (< 3.34): contains() fallback.
+                return None
+            for statement in (
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON main_app_lead BEGIN "
+                f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON main_app_lead BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) "
+                f"VALUES ('delete', old.id, old.search_text); END",
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_text ON main_app_lead BEGIN "
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) "
+                f"VALUES ('delete', old.id, old.search_text); "
+                f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+            ):
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            _fts_ready.clear()
+            return 'fts5'
+    return None
+
+
+def drop_index(schema_editor=None):
+    conn = schema_editor.connection if schema_editor is not None else connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+        elif conn.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    _fts_ready.clear()
+
+
+def backfill(lead_model, batch_size=2000):
+    """Recompute search_text for every lead (bulk_update in batches). Returns rows updated."""
+    updated = 0
+    batch = []
+    for lead in lead_model.objects.only('id', *SOURCE_FIELDS).iterator(chunk_size=batch_size):
+        lead.search_text = search_text_for(lead)
+        batch.append(lead)
+        if len(batch) >= batch_size:
+            lead_model.objects.bulk_update(batch, ['search_text'])
+            updated += len(batch)
+            batch = []
+    if batch:
+        lead_model.objects.bulk_update(batch, ['search_text'])
+        updated += len(batch)
+    return updated
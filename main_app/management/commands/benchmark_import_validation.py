@@ -0,0 +1,192 @@
+import csv
+import io
+import random
+import time
+import uuid
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.admin_views import _lead_import_batch_size
+from main_app.lead_import_columns import build_import_batch
+from main_app.lead_import_io import is_blank_import_value, iter_lead_import_rows, iter_row_batches
+from main_app.models import Lead, LeadSource
+
+HEADERS = [
+    'first_name', 'last_name', 'email', 'phone', 'alternate_phone', 'School Name',
+    'graduation_status', 'graduation_course', 'graduation_year', 'graduation_college',
+    'course_interested', 'industry',
+]
+COMPARED_FIELDS = [
+    'first_name', 'last_name', 'email', 'phone', 'alternate_phone', 'school_name',
+    'graduation_status', 'graduation_course', 'graduation_year', 'graduation_college',
+    'course_interested', 'industry', 'is_graduated', 'phone_key', 'alternate_phone_key',
+    'email_key',
+]
+
+
+def synthetic_csv(rows, seed=7):
+    """CSV text with the messy values imports see: padding, blanks, NaN, float years, bad YES/NO."""
+    rnd = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(HEADERS)
+    for i in range(rows):
+        status = rnd.choice(['YES', 'yes ', 'NO', '', 'maybe'])
+        writer.writerow([
+            f' First{i} ', 'Sharma', f'Lead{i}@Example.com', f'+91 98{i:08d}'[:16],
+            rnd.choice(['', 'nan', f'0{rnd.randint(7000000000, 9999999999)}']),
+            rnd.choice(['', f'School {i % 300}']),
+            status,
+            rnd.choice(['', 'B.Tech', '  MBA ']),
+            rnd.choice(['', '2019', '2021.0', 'n/a']),
+            rnd.choice(['', f'College {i % 90}']),
+            rnd.choice(['BBA', 'BCA', '']),
+            rnd.choice(['IT', '', 'Retail']),
+        ])
+    return out.getvalue().encode('utf-8')
+
+
+def _cell_str(row, key, default=""):
+    """Normalize import cell to a clean string (handles empty / NaN from Excel)."""
+    if key not in row:
+        return default
+    val = row[key]
+    if is_blank_import_value(val):
+        return default
+    s = str(val).strip()
+    return s if s else default
+
+
+def _lead_id():
+    """Match Lead.save() format but longer suffix to avoid collisions on bulk import."""
+    return f"L-{datetime.now().strftime('%y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
+
+
+def legacy_build_lead(row, source, assigned_counsellor):
+    """The previous per-row import builder: an unsaved Lead from one row dict."""
+    raw_gs = row.get("graduation_status", "NO")
+    if is_blank_import_value(raw_gs):
+        graduation_status = "NO"
+    else:
+        graduation_status = str(raw_gs).strip().upper()
+        if graduation_status not in ("YES", "NO"):
+            graduation_status = "NO"
+
+    if graduation_status == "NO":
+        graduation_course = "Not Applicable"
+        graduation_college = "Not Applicable"
+    else:
+        graduation_course = row.get("graduation_course", "Not Specified")
+        graduation_college = row.get("graduation_college", "Not Specified")
+        if is_blank_import_value(graduation_course):
+            graduation_course = "Not Specified"
+        else:
+            graduation_course = str(graduation_course).strip() or "Not Specified"
+        if is_blank_import_value(graduation_college):
+            graduation_college = "Not Specified"
+        else:
+            graduation_college = str(graduation_college).strip() or "Not Specified"
+
+    graduation_year = row.get("graduation_year", None)
+    if is_blank_import_value(graduation_year):
+        graduation_year = None
+    else:
+        try:
+            graduation_year = int(float(graduation_year))
+        except (TypeError, ValueError):
+            graduation_year = None
+
+    alt = row.get("alternate_phone", "")
+    if is_blank_import_value(alt):
+        alternate_phone = ""
+    else:
+        alternate_phone = str(alt).strip()
+
+    is_graduated = "YES" if graduation_status == "YES" else "NO"
+
+    lead = Lead(
+        lead_id=_lead_id(),
+        first_name=_cell_str(row, "first_name"),
+        last_name=_cell_str(row, "last_name"),
+        email=_cell_str(row, "email"),
+        phone=_cell_str(row, "phone"),
+        alternate_phone=alternate_phone,
+        school_name=_cell_str(row, "School Name"),
+        graduation_status=graduation_status,
+        graduation_course=graduation_course,
+        graduation_year=graduation_year,
+        graduation_college=graduation_college,
+        course_interested=_cell_str(row, "course_interested"),
+        industry=_cell_str(row, "industry"),
+        source=source,
+        assigned_counsellor=assigned_counsellor,
+        is_graduated=is_graduated,
+    )
+    # bulk_create skips Lead.save(), so fill the duplicate-detection keys and search text here.
+    lead.refresh_contact_keys()
+    lead.refresh_search_text()
+    return lead
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark import row validation: per-row legacy_build_lead vs "
+        "the column-wise build_import_batch stage, on a synthetic CSV. Rows are parsed "
+        "up front and nothing is written to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='CSV data rows (default 100000).')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per stage; best is reported.')
+
+    def handle(self, *args, **options):
+        source = LeadSource(pk=1, name='Benchmark')
+        data = synthetic_csv(options['rows'])
+        batches = list(iter_row_batches(
+            iter_lead_import_rows(io.BytesIO(data), 'bench.csv'), _lead_import_batch_size()
+        ))
+        total = sum(len(b) for b in batches)
+
+        def per_row():
+            leads = []
+            for batch in batches:
+                for _, row in batch:
+                    try:
+                        leads.append(legacy_build_lead(row, source, None))
+                    except Exception:
+                        pass
+            return leads
+
+        def columnar():
+            leads = []
+            for batch in batches:
+                leads.extend(build_import_batch(batch, source, None)[0])
+            return leads
+
+        before = self._best(per_row, options['repeat'])
+        after = self._best(columnar, options['repeat'])
+
+        expected, got = per_row(), columnar()
+        if len(expected) != len(got):
+            raise CommandError(f'Per-row built {len(expected)} leads, columnar {len(got)}.')
+        for a, b in zip(expected, got):
+            for field in COMPARED_FIELDS:
+                if getattr(a, field) != getattr(b, field):
+                    raise CommandError(
+                        f'{field} differs: {getattr(a, field)!r} != {getattr(b, field)!r}'
+                    )
+
+        self.stdout.write(f'{total} rows in {len(batches)} batches')
+        self.stdout.write(f'  per-row:  {before:.3f}s  {total / before:,.0f} rows/s')
+        self.stdout.write(f'  columnar: {after:.3f}s  {total / after:,.0f} rows/s')
+        self.stdout.write(self.style.SUCCESS(f'Speedup {before / after:.2f}x; outputs identical.'))
+
+    def _best(self, fn, repeat):
+        best = None
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
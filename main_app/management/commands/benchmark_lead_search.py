@@ -0,0 +1,116 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from main_app import lead_search
+from main_app.models import Lead, LeadSource
+
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Kavya', 'Rohan', 'Saanvi', 'Vivaan', 'Anaya', 'Arjun', 'Meera']
+LAST_NAMES = ['Sharma', 'Verma', 'Iyer', 'Reddy', 'Nair', 'Gupta', 'Mehta', 'Kapoor', 'Das', 'Joshi']
+
+
+class _Rollback(Exception):
+    pass
+
+
+def legacy_search(queryset, term):
+    """The previous manage_leads filter: six OR'ed icontains predicates."""
+    return queryset.filter(
+        Q(first_name__icontains=term) |
+        Q(last_name__icontains=term) |
+        Q(email__icontains=term) |
+        Q(phone__icontains=term) |
+        Q(alternate_phone__icontains=term) |
+        Q(lead_id__icontains=term)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark manage_leads search latency: the legacy icontains OR vs the indexed "
+        "lead_search, on synthetic leads inserted in a transaction that is rolled back. "
+        "Run against the target database (e.g. --leads 100000 and --leads 1000000)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leads', type=int, default=100000, help='Synthetic leads to insert (default 100000).')
+        parser.add_argument('--queries', type=int, default=20, help='Timed runs per search term.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write('Synthetic leads rolled back.')
+
+    def _run(self, options):
+        rnd = random.Random(11)
+        total = options['leads']
+        source = LeadSource.objects.create(name='Search benchmark')
+        started = time.perf_counter()
+        batch = []
+        for i in range(total):
+            lead = Lead(
+                lead_id=f'B-{i:08d}',
+                first_name=rnd.choice(FIRST_NAMES),
+                last_name=rnd.choice(LAST_NAMES),
+                email=f'user{i}@example.com',
+                phone=f'+91 9{i:09d}',
+                alternate_phone=rnd.choice(['', f'0{rnd.randint(7000000000, 9999999999)}']),
+                source=source,
+            )
+            lead.refresh_contact_keys()
+            lead.refresh_search_text()
+            batch.append(lead)
+            if len(batch) >= options['batch_size']:
+                Lead.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Lead.objects.bulk_create(batch)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE main_app_lead')
+        self.stdout.write(f'{total} leads inserted in {time.perf_counter() - started:.1f}s ({connection.vendor})')
+
+        probe = total // 2
+        phone = f'9{probe:09d}'
+        terms = {
+            'name': 'kavya',
+            'email': f'user{probe}@',
+            'phone digits': phone[-6:],
+            'formatted phone': f'+91 {phone[:5]}-{phone[5:]}',
+            'lead id': f'B-{probe:08d}',
+            'no match': 'zzqqxx',
+        }
+        base = Lead.objects.order_by('-created_at', '-id')
+        self.stdout.write(f"{'term':<16} {'legacy p50':>11} {'indexed p50':>12} {'indexed p95':>12} {'rows':>14}")
+        for label, term in terms.items():
+            legacy_times, legacy_rows = self._time(lambda: list(legacy_search(base, term)[:50]), options['queries'])
+            new_times, new_rows = self._time(lambda: list(lead_search.search_leads(base, term)[:50]), options['queries'])
+            self.stdout.write(
+                f'{label:<16} {self._ms(statistics.median(legacy_times)):>11} '
+                f'{self._ms(statistics.median(new_times)):>12} '
+                f'{self._ms(self._p95(new_times)):>12} {legacy_rows:>6} / {new_rows:<6}'
+            )
+
+    def _time(self, fn, runs):
+        times = []
+        rows = 0
+        for _ in range(max(1, runs)):
+            started = time.perf_counter()
+            rows = len(fn())
+            times.append(time.perf_counter() - started)
+        return times, rows
+
+    def _p95(self, times):
+        ordered = sorted(times)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _ms(self, seconds):
+        return f'{seconds * 1000:.1f}ms'
@@ -0,0 +1,127 @@
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.lead_import_io import iter_lead_import_rows
+
+HEADERS = [
+    'first_name', 'last_name', 'email', 'phone', 'alternate_phone', 'School Name',
+    'graduation_status', 'graduation_course', 'graduation_year', 'graduation_college',
+    'course_interested', 'industry', 'enquiry_date',
+]
+COURSES = ['B.Tech', 'BBA', 'MBA', 'B.Com', 'BCA', 'MCA', 'B.Sc Nursing']
+INDUSTRIES = ['IT', 'Finance', 'Healthcare', 'Retail', 'Manufacturing', '']
+
+
+def write_synthetic_workbook(path, rows, seed=42):
+    """Write a lead workbook with realistic column mix (shared strings, numbers, dates, blanks)."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Leads')
+    ws.append(HEADERS)
+    start = datetime(2024, 1, 1)
+    for i in range(rows):
+        graduated = rnd.random() < 0.4
+        enquiry = WriteOnlyCell(ws, value=start + timedelta(minutes=rnd.randint(0, 525600)))
+        enquiry.number_format = 'yyyy-mm-dd hh:mm'
+        ws.append([
+            f'First{i}',
+            rnd.choice(['Sharma', 'Patel', 'Iyer', 'Khan', 'Das', 'Reddy']),
+            f'lead{i}@example.com',
+            9000000000 + i,
+            f'+91 8{rnd.randint(100000000, 999999999)}' if rnd.random() < 0.3 else None,
+            f'School {rnd.randint(1, 400)}',
+            'YES' if graduated else 'NO',
+            rnd.choice(COURSES) if graduated else None,
+            rnd.randint(2015, 2025) if graduated else None,
+            f'College {rnd.randint(1, 150)}' if graduated else None,
+            rnd.choice(COURSES),
+            rnd.choice(INDUSTRIES),
+            enquiry,
+        ])
+    wb.save(path)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark .xlsx lead parsing: single-threaded openpyxl vs the multi-process "
+        "backend (LEAD_IMPORT_XLSX_WORKERS) on synthetic workbooks. Nothing is written "
+        "to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[10000, 100000, 500000],
+            help='Data rows per synthetic workbook (default: 10000 100000 500000).',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 2,
+            help='Processes for the parallel backend (default: CPU count).',
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Also check that both backends yield identical (row_number, row) tuples.',
+        )
+        parser.add_argument(
+            '--keep-dir', default='',
+            help='Write workbooks here and keep them (reused on the next run if present).',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+        workdir = options['keep_dir'] or tempfile.mkdtemp(prefix='xlsx-bench-')
+        os.makedirs(workdir, exist_ok=True)
+
+        self.stdout.write(
+            f"{'rows':>9} {'size MB':>8} {'openpyxl s':>11} {'parallel s':>11} "
+            f"{'speedup':>8}  (workers={options['workers']})"
+        )
+        for count in options['rows']:
+            path = os.path.join(workdir, f'leads_{count}.xlsx')
+            if not os.path.exists(path):
+                write_synthetic_workbook(path, count)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+
+            base_s, base_n = self._time(path, 0)
+            par_s, par_n = self._time(path, options['workers'])
+            if base_n != par_n:
+                raise CommandError(f'{count} rows: openpyxl yielded {base_n}, parallel {par_n}.')
+            if options['verify']:
+                self._verify(path, options['workers'])
+
+            self.stdout.write(
+                f"{count:>9} {size_mb:>8.1f} {base_s:>11.2f} {par_s:>11.2f} "
+                f"{base_s / par_s if par_s else 0:>7.2f}x"
+            )
+            if not options['keep_dir']:
+                os.remove(path)
+
+        if not options['keep_dir']:
+            os.rmdir(workdir)
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    def _time(self, path, workers):
+        started = time.perf_counter()
+        n = 0
+        with open(path, 'rb') as fh:
+            for _ in iter_lead_import_rows(fh, path, xlsx_workers=workers):
+                n += 1
+        return time.perf_counter() - started, n
+
+    def _verify(self, path, workers):
+        with open(path, 'rb') as a, open(path, 'rb') as b:
+            pairs = zip(
+                iter_lead_import_rows(a, path),
+                iter_lead_import_rows(b, path, xlsx_workers=workers),
+            )
+            for expected, got in pairs:
+                if expected != got:
+                    raise CommandError(f'Row mismatch: {expected!r} != {got!r}')
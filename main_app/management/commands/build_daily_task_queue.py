@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from main_app.daily_task_queue import build_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Build today's Today's Target queue (DailyTaskItem) for every active counsellor. "
+        "Celery beat runs this at DAILY_TASK_QUEUE_BUILD_AT; use this command from cron "
+        "where no beat scheduler runs, or to rebuild the queues by hand."
+    )
+
+    def handle(self, *args, **options):
+        counsellors, items = build_all()
+        self.stdout.write(self.style.SUCCESS(f"Done. {items} items queued for {counsellors} counsellors."))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main_app.reminders import dispatch
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the activity / visit reminders that are due now (Reminder rows picked up by "
+        "the counsellor reminder stream). Celery beat runs this every minute; from cron, "
+        "run it every minute, or keep one process running with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Dispatch once a minute until interrupted.')
+
+    def handle(self, *args, **options):
+        while True:
+            count = dispatch()
+            self.stdout.write(f"{count} reminders due.")
+            if not options['loop']:
+                break
+            time.sleep(60 - time.time() % 60)
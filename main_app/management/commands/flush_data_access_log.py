@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from main_app.access_log import flush, metrics, published_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Write queued DataAccessLog events now and print the buffer metrics (queue depth, "
+        "drops, flush latency): this process's, then the snapshot each web / worker process "
+        "published on its last flush (visible here only with a shared cache, i.e. REDIS_URL). "
+        "With DATA_ACCESS_LOG_BUFFER=redis this drains the shared queue; with 'memory' only "
+        "this process's (empty) buffer is flushed."
+    )
+
+    def handle(self, *args, **options):
+        written = flush()
+        self.stdout.write("This process:")
+        for name, value in metrics().items():
+            self.stdout.write(f"  {name}: {value}")
+        for snapshot in published_metrics():
+            self.stdout.write(f"{snapshot['process']} (published {snapshot['published_at']:%Y-%m-%d %H:%M:%S}):")
+            for name, value in snapshot.items():
+                if name not in ('process', 'published_at'):
+                    self.stdout.write(f"  {name}: {value}")
+        self.stdout.write(self.style.SUCCESS(f"Done. {written} events written."))
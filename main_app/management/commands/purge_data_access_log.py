@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from main_app.access_log_retention import apply_retention, retention_days
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll DataAccessLog rows older than the retention window (DATA_ACCESS_LOG_RETENTION_DAYS) "
+        "into daily per-counsellor/per-action summaries, archive them as gzipped JSONL under "
+        "DATA_ACCESS_LOG_ARCHIVE_PREFIX in the default file storage and delete them in batches. "
+        "Without an archive prefix rows are only rolled up. Celery beat runs this daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help=f'Keep this many days of raw rows (default {retention_days()}).')
+        parser.add_argument('--batch-size', type=int, help='Rows archived and deleted per batch.')
+        parser.add_argument('--no-archive', action='store_true', help='Delete without writing archive files, even with no archive configured.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be purged.')
+
+    def handle(self, *args, **options):
+        stats = apply_retention(
+            days=options['days'],
+            archive=not options['no_archive'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would purge' if options['dry_run'] else 'Purged'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats['deleted']} rows from {stats['days']} days "
+            f"({stats['summaries']} summary rows)."
+        ))
+        if stats['kept']:
+            self.stdout.write(self.style.WARNING(
+                f"Kept {stats['kept']} rows past retention: no archive configured "
+                f"(set DATA_ACCESS_LOG_ARCHIVE_PREFIX, or pass --no-archive to delete them)."
+            ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from main_app import lead_search
+from main_app.models import Lead
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Lead.search_text for every lead and rebuild the search index "
+        "(pg_trgm GIN on PostgreSQL, FTS5 table and triggers on SQLite)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--index-only', action='store_true',
+            help='Only recreate the index; leave search_text as stored.',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not options['index_only']:
+            updated = lead_search.backfill(Lead, batch_size=max(100, options['batch_size']))
+            self.stdout.write(f"  search_text refreshed on {updated} leads")
+        lead_search.drop_index()
+        created = lead_search.create_index()
+        if created:
+            self.stdout.write(self.style.SUCCESS(f"Done. {created} index built."))
+        else:
+            self.stdout.write(self.style.WARNING("Done. No index for this database; searches use contains()."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from main_app.dashboard_aggregates import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the admin dashboard counters (DashboardCounter) from Lead / Business and "
+        "repair any drift. Celery beat runs this every DASHBOARD_RECONCILE_SECONDS; use this "
+        "command from cron where no beat scheduler runs."
+    )
+
+    def handle(self, *args, **options):
+        repaired = reconcile()
+        self.stdout.write(self.style.SUCCESS(f"Done. {repaired} counters repaired."))
@@ -21,3 +21,12 @@ class LoginCheckMiddleWare(MiddlewareMixin):
                 pass
             else:
                 return redirect(reverse('login_page'))
+
+
+class ProfileMiddleware(MiddlewareMixin):
+    """Resolve the user's Counsellor / Admin profile once per request (see profiles.py)."""
+
+    def process_request(self, request):
+        from .profiles import resolve
+
+        resolve(request)
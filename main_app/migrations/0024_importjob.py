@@ -0,0 +1,42 @@
+# Generated by Django 4.2.9 on 2026-10-17 19:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0023_backfill_admin_profile_for_admin_users'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='lead_imports/')),
+                ('original_filename', models.CharField(max_length=255)),
+                ('auto_assign', models.BooleanField(default=False)),
+                ('assignment_method', models.CharField(default='round_robin', max_length=30)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], db_index=True, default='PENDING', max_length=10)),
+                ('rows_parsed', models.IntegerField(default=0)),
+                ('rows_inserted', models.IntegerField(default=0)),
+                ('rows_failed', models.IntegerField(default=0)),
+                ('rows_assigned', models.IntegerField(default=0)),
+                ('batches', models.IntegerField(default=0)),
+                ('message', models.TextField(blank=True)),
+                ('error_report', models.FileField(blank=True, upload_to='lead_imports/errors/')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('assigned_counsellor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='main_app.counsellor')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='main_app.leadsource')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.9 on 2026-10-17 20:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0024_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='duplicate_policy',
+            field=models.CharField(choices=[('skip', 'Skip rows matching an existing lead'), ('merge', 'Merge into the existing lead (fill blank fields)'), ('flag', 'Import and flag as possible duplicate'), ('allow', 'Allow duplicates (no check)')], default='skip', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_flagged',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_merged',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='rows_skipped',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='alternate_phone_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, help_text='Set when an import flagged this lead as a possible duplicate', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='flagged_duplicates', to='main_app.lead'),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='email_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='phone_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='leadalternatephone',
+            name='phone_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=15),
+        ),
+    ]
@@ -0,0 +1,46 @@
+"""
+Fill the normalized phone / email keys for leads and alternate phones created before 0025.
+"""
+from django.db import migrations
+
+from main_app.contact_keys import normalize_email, normalize_phone
+
+BATCH_SIZE = 2000
+
+
+def backfill_keys(apps, schema_editor):
+    Lead = apps.get_model('main_app', 'Lead')
+    LeadAlternatePhone = apps.get_model('main_app', 'LeadAlternatePhone')
+
+    batch = []
+    for lead in Lead.objects.only('id', 'phone', 'alternate_phone', 'email').iterator(chunk_size=BATCH_SIZE):
+        lead.phone_key = normalize_phone(lead.phone)
+        lead.alternate_phone_key = normalize_phone(lead.alternate_phone)
+        lead.email_key = normalize_email(lead.email)
+        batch.append(lead)
+        if len(batch) >= BATCH_SIZE:
+            Lead.objects.bulk_update(batch, ['phone_key', 'alternate_phone_key', 'email_key'])
+            batch = []
+    if batch:
+        Lead.objects.bulk_update(batch, ['phone_key', 'alternate_phone_key', 'email_key'])
+
+    batch = []
+    for alt in LeadAlternatePhone.objects.only('id', 'phone').iterator(chunk_size=BATCH_SIZE):
+        alt.phone_key = normalize_phone(alt.phone)
+        batch.append(alt)
+        if len(batch) >= BATCH_SIZE:
+            LeadAlternatePhone.objects.bulk_update(batch, ['phone_key'])
+            batch = []
+    if batch:
+        LeadAlternatePhone.objects.bulk_update(batch, ['phone_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0025_lead_contact_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_keys, migrations.RunPython.noop),
+    ]
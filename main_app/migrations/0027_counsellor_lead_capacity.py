@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 20:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0026_backfill_lead_contact_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='counsellor',
+            name='lead_capacity',
+            field=models.PositiveIntegerField(default=100, help_text='Relative lead capacity; weighted-fair assignment shares leads in proportion to it (0 = none).'),
+        ),
+    ]
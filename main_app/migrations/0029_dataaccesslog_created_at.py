@@ -0,0 +1,19 @@
+# Generated by Django 4.2.9 on 2026-10-17 20:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0028_dashboardcounter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataaccesslog',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-17 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0029_dataaccesslog_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='counsellor',
+            name='lead_view_alert_threshold',
+            field=models.PositiveIntegerField(blank=True, help_text='Distinct leads viewed in 24 hours before admins are alerted (blank = default).', null=True),
+        ),
+        migrations.AddField(
+            model_name='counsellor',
+            name='phone_reveal_alert_threshold',
+            field=models.PositiveIntegerField(blank=True, help_text='Distinct leads with phone reveals in 1 hour before admins are alerted (blank = default).', null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.9 on 2026-10-17 20:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0030_counsellor_access_alert_thresholds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecurityAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('lead_views', 'Lead views (24 hours)'), ('phone_reveals', 'Phone reveals (1 hour)')], max_length=30)),
+                ('day', models.DateField()),
+                ('distinct_leads', models.PositiveIntegerField(default=0)),
+                ('threshold', models.PositiveIntegerField(default=0)),
+                ('message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('counsellor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='security_alerts', to='main_app.counsellor')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'unique_together': {('kind', 'counsellor', 'day')},
+            },
+        ),
+    ]
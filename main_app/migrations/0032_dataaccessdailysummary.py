@@ -0,0 +1,30 @@
+# Generated by Django 4.2.9 on 2026-10-17 20:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0031_securityalert'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataAccessDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('action', models.CharField(choices=[('view_lead_detail', 'View lead detail'), ('list_my_leads', 'List my leads'), ('view_business_detail', 'View business detail'), ('reveal_phone', 'Reveal phone'), ('reveal_alternate_phone', 'Reveal alternate phone')], max_length=50)),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('distinct_leads', models.PositiveIntegerField(default=0)),
+                ('distinct_users', models.PositiveIntegerField(default=0)),
+                ('counsellor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='main_app.counsellor')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'unique_together': {('day', 'counsellor', 'action')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0032_dataaccessdailysummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
@@ -0,0 +1,27 @@
+"""
+Fill Lead.search_text for existing leads and build the backend's search index:
+a pg_trgm GIN index on PostgreSQL, an FTS5 trigram table with sync triggers on SQLite.
+"""
+from django.db import migrations
+
+from main_app import lead_search
+
+
+def backfill_and_index(apps, schema_editor):
+    lead_search.backfill(apps.get_model('main_app', 'Lead'))
+    lead_search.create_index(schema_editor)
+
+
+def drop_index(apps, schema_editor):
+    lead_search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0033_lead_search_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_and_index, drop_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.9 on 2026-10-17 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0034_lead_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['assigned_counsellor', 'status', '-created_at'], name='lead_cns_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['assigned_counsellor', '-created_at', '-id'], name='lead_cns_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(condition=models.Q(('next_follow_up__isnull', False)), fields=['assigned_counsellor', 'next_follow_up'], name='lead_cns_followup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leadactivity',
+            index=models.Index(fields=['counsellor', 'is_completed', 'scheduled_date'], name='activity_cns_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leadactivity',
+            index=models.Index(fields=['counsellor', '-completed_date'], name='activity_cns_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leadactivity',
+            index=models.Index(condition=models.Q(('is_completed', True), models.Q(('next_action', ''), _negated=True)), fields=['counsellor', '-completed_date'], name='activity_cns_next_action_idx'),
+        ),
+    ]
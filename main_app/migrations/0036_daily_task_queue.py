@@ -0,0 +1,34 @@
+# Generated by Django 4.2.9 on 2026-10-17 20:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0035_counsellor_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailytargetassignment',
+            name='queue_built_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DailyTaskItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.PositiveSmallIntegerField(choices=[(0, 'Visit due'), (1, 'Pending activity'), (2, 'Lead by status'), (3, 'New lead')])),
+                ('status_order', models.PositiveIntegerField(default=0)),
+                ('sort_key', models.FloatField(default=0)),
+                ('activity', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main_app.leadactivity')),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_items', to='main_app.dailytargetassignment')),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main_app.lead')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['assignment', 'bucket', 'status_order', 'sort_key', 'id'], name='task_item_queue_idx')],
+            },
+        ),
+    ]
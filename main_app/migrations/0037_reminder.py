@@ -0,0 +1,31 @@
+# Generated by Django 4.2.9 on 2026-10-17 20:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0036_daily_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('activity', 'Activity'), ('followup', 'Visit')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField(help_text='LeadActivity id (activity) or Lead id (followup)')),
+                ('scheduled_for', models.DateTimeField()),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('counsellor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='main_app.counsellor')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('delivered_at__isnull', True)), fields=['counsellor', 'scheduled_for'], name='reminder_pending_idx')],
+                'unique_together': {('kind', 'object_id', 'scheduled_for')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.9 on 2026-10-17 21:14
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0037_reminder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leadactivity',
+            index=models.Index(models.OrderBy(django.db.models.functions.comparison.Coalesce('scheduled_date', 'completed_date'), descending=True), models.OrderBy(models.F('id'), descending=True), name='activity_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leadactivity',
+            index=models.Index(models.F('counsellor'), models.OrderBy(django.db.models.functions.comparison.Coalesce('scheduled_date', 'completed_date'), descending=True), models.OrderBy(models.F('id'), descending=True), name='activity_cns_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.9 on 2026-10-17 21:18
+
+from django.db import migrations, models
+import main_app.import_storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0038_activity_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('content', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='error_report',
+            field=models.FileField(blank=True, storage=main_app.import_storage.import_file_storage, upload_to='lead_imports/errors/'),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='file',
+            field=models.FileField(storage=main_app.import_storage.import_file_storage, upload_to='lead_imports/'),
+        ),
+    ]
@@ -1,13 +1,19 @@
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import UserManager
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+import threading
 import uuid
 import logging
 
+from .import_storage import import_file_storage
+
 
 class CustomUserManager(UserManager):
     def _create_user(self, email, password, **extra_fields):
@@ -83,6 +89,24 @@ class Admin(models.Model):
         return self.is_superadmin or self.can_manage_settings
 
 
+class TrackedFieldsMixin:
+    """Keep the loaded values of TRACKED_FIELDS so post_save receivers can detect transitions."""
+
+    TRACKED_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def remember_loaded_values(self):
+        """Make the current values the baseline the next save is compared against (deferred fields are skipped)."""
+        self._loaded_values = {
+            name: self.__dict__[name] for name in self.TRACKED_FIELDS if name in self.__dict__
+        }
+
+
 class Counsellor(models.Model):
     admin = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
     employee_id = models.CharField(max_length=20, unique=True)
@@ -92,6 +116,19 @@ class Counsellor(models.Model):
     performance_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
     total_leads_assigned = models.IntegerField(default=0)
     total_business_generated = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    lead_capacity = models.PositiveIntegerField(
+        default=100,
+        help_text="Relative lead capacity; weighted-fair assignment shares leads in proportion to it (0 = none).",
+    )
+    # Data-access anomaly thresholds (blank = ACCESS_ALERT_* setting); see access_anomaly.py.
+    lead_view_alert_threshold = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Distinct leads viewed in 24 hours before admins are alerted (blank = default).",
+    )
+    phone_reveal_alert_threshold = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Distinct leads with phone reveals in 1 hour before admins are alerted (blank = default).",
+    )
 
     def __str__(self):
         return f"{self.admin.first_name} {self.admin.last_name} ({self.employee_id})"
@@ -128,12 +165,14 @@ class LeadStatus(models.Model):
     @classmethod
     def get_choices(cls):
         """Return list of (code, name) tuples for form/model choices, active only."""
-        return list(cls.objects.filter(is_active=True).order_by('sort_order', 'name').values_list('code', 'name'))
+        from .reference_data import choices
+        return choices('lead_status')
 
     @classmethod
     def get_all_choices(cls):
         """Return all (code, name) tuples including inactive, for display purposes."""
-        return list(cls.objects.order_by('sort_order', 'name').values_list('code', 'name'))
+        from .reference_data import choices
+        return choices('lead_status', active_only=False)
 
 
 # Hardcoded fallback – used only when LeadStatus table is empty (fresh install)
@@ -149,7 +188,7 @@ DEFAULT_LEAD_STATUSES = (
 )
 
 
-class Lead(models.Model):
+class Lead(TrackedFieldsMixin, models.Model):
     LEAD_STATUS = DEFAULT_LEAD_STATUSES
     
     PRIORITY = (
@@ -208,14 +247,58 @@ class Lead(models.Model):
     enrichment_notes = models.TextField(blank=True)
     routed_to = models.CharField(max_length=100, blank=True)
     routing_reason = models.TextField(blank=True)
+    # Normalized contact keys for duplicate detection (see contact_keys.py)
+    phone_key = models.CharField(max_length=15, blank=True, db_index=True, editable=False)
+    alternate_phone_key = models.CharField(max_length=15, blank=True, db_index=True, editable=False)
+    email_key = models.CharField(max_length=254, blank=True, db_index=True, editable=False)
+    duplicate_of = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='flagged_duplicates',
+        help_text="Set when an import flagged this lead as a possible duplicate",
+    )
+    # Lower-cased names / email / lead id and phone digits, indexed for search (see lead_search.py)
+    search_text = models.TextField(blank=True, default='', editable=False)
+
+    class Meta:
+        # Counsellor access paths; CounsellorQueryPlanTests (tests.py) checks they stay indexed.
+        indexes = [
+            models.Index(fields=['assigned_counsellor', 'status', '-created_at'], name='lead_cns_status_created_idx'),
+            models.Index(fields=['assigned_counsellor', '-created_at', '-id'], name='lead_cns_created_idx'),
+            models.Index(
+                fields=['assigned_counsellor', 'next_follow_up'], name='lead_cns_followup_idx',
+                condition=models.Q(next_follow_up__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.school_name}"
 
+    # Loaded values that post_save receivers compare against to detect transitions.
+    TRACKED_FIELDS = ('status', 'source_id', 'assigned_counsellor_id', 'next_follow_up')
+
+    def refresh_contact_keys(self):
+        from .contact_keys import normalize_email, normalize_phone
+
+        self.phone_key = normalize_phone(self.phone)
+        self.alternate_phone_key = normalize_phone(self.alternate_phone)
+        self.email_key = normalize_email(self.email)
+
+    def refresh_search_text(self):
+        from .lead_search import search_text_for
+
+        self.search_text = search_text_for(self)
+
     def save(self, *args, **kwargs):
         if not self.lead_id:
             # Generate shorter lead_id: L-YYMMDD-XXXX (max 12 chars)
             self.lead_id = f"L-{datetime.now().strftime('%y%m%d')}-{uuid.uuid4().hex[:4].upper()}"
+
+        self.refresh_contact_keys()
+        self.refresh_search_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                'phone_key', 'alternate_phone_key', 'email_key', 'search_text',
+            }
         
         # Set is_graduated based on graduation_status
         if self.graduation_status == 'YES':
@@ -236,10 +319,17 @@ class LeadAlternatePhone(models.Model):
     label = models.CharField(max_length=50, blank=True, help_text="Eg. Father, Mother, Guardian")
     created_by = models.ForeignKey(Counsellor, null=True, blank=True, on_delete=models.SET_NULL)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    phone_key = models.CharField(max_length=15, blank=True, db_index=True, editable=False)
 
     def __str__(self):
         return f"{self.lead.lead_id} - {self.phone} ({self.label or 'alternate'})"
 
+    def save(self, *args, **kwargs):
+        from .contact_keys import normalize_phone
+
+        self.phone_key = normalize_phone(self.phone)
+        super().save(*args, **kwargs)
+
 
 class ActivityType(models.Model):
     """Configurable activity types managed from admin panel."""
@@ -262,11 +352,13 @@ class ActivityType(models.Model):
 
     @classmethod
     def get_choices(cls):
-        return list(cls.objects.filter(is_active=True).order_by('sort_order', 'name').values_list('code', 'name'))
+        from .reference_data import choices
+        return choices('activity_type')
 
     @classmethod
     def get_all_choices(cls):
-        return list(cls.objects.order_by('sort_order', 'name').values_list('code', 'name'))
+        from .reference_data import choices
+        return choices('activity_type', active_only=False)
 
 
 class NextAction(models.Model):
@@ -288,11 +380,13 @@ class NextAction(models.Model):
 
     @classmethod
     def get_choices(cls):
-        return [('', '— None —')] + list(cls.objects.filter(is_active=True).order_by('sort_order', 'name').values_list('code', 'name'))
+        from .reference_data import choices
+        return [('', '— None —')] + choices('next_action')
 
     @classmethod
     def get_all_choices(cls):
-        return list(cls.objects.order_by('sort_order', 'name').values_list('code', 'name'))
+        from .reference_data import choices
+        return choices('next_action', active_only=False)
 
 
 DEFAULT_ACTIVITY_TYPES = (
@@ -306,7 +400,7 @@ DEFAULT_ACTIVITY_TYPES = (
 )
 
 
-class LeadActivity(models.Model):
+class LeadActivity(TrackedFieldsMixin, models.Model):
     ACTIVITY_TYPE = DEFAULT_ACTIVITY_TYPES
 
     lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='activities')
@@ -321,11 +415,37 @@ class LeadActivity(models.Model):
     duration = models.IntegerField(default=0)  # in minutes
     is_completed = models.BooleanField(default=True, db_index=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['counsellor', 'is_completed', 'scheduled_date'], name='activity_cns_pending_idx'),
+            models.Index(fields=['counsellor', '-completed_date'], name='activity_cns_completed_idx'),
+            models.Index(
+                fields=['counsellor', '-completed_date'], name='activity_cns_next_action_idx',
+                condition=models.Q(is_completed=True) & ~models.Q(next_action=''),
+            ),
+            # Keyset order of counsellor_work_view (activity_date, id), unfiltered and per
+            # counsellor; see ACTIVITY_DATE.
+            models.Index(
+                Coalesce('scheduled_date', 'completed_date').desc(), models.F('id').desc(),
+                name='activity_date_id_idx',
+            ),
+            models.Index(
+                models.F('counsellor'), Coalesce('scheduled_date', 'completed_date').desc(),
+                models.F('id').desc(), name='activity_cns_date_id_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.lead.first_name} - {self.activity_type} - {self.subject}"
 
+    # The activity's own date: when it is scheduled for, else when it was logged.
+    ACTIVITY_DATE = Coalesce('scheduled_date', 'completed_date')
+
+    # Loaded values that post_save receivers compare against (calendar week invalidation).
+    TRACKED_FIELDS = ('counsellor_id', 'scheduled_date')
+
 
-class Business(models.Model):
+class Business(TrackedFieldsMixin, models.Model):
     BUSINESS_STATUS = (
         ('PENDING', 'Pending'),
         ('ACTIVE', 'Active'),
@@ -350,6 +470,9 @@ class Business(models.Model):
     def __str__(self):
         return f"{self.title} - {self.lead.first_name} {self.lead.last_name}"
 
+    # Loaded values that post_save receivers compare against (dashboard aggregates).
+    TRACKED_FIELDS = ('status', 'value', 'counsellor_id')
+
     def save(self, *args, **kwargs):
         if not self.business_id:
             self.business_id = f"BUS-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
@@ -433,7 +556,8 @@ class DataAccessLog(models.Model):
     business = models.ForeignKey(Business, null=True, blank=True, on_delete=models.SET_NULL)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Set when the access happens; rows are written later by the buffered writer (access_log.py).
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     class Meta:
         indexes = [
@@ -446,6 +570,151 @@ class DataAccessLog(models.Model):
         return f"{self.user.email} - {self.action} - {target or 'n/a'}"
 
 
+class DataAccessDailySummary(models.Model):
+    """
+    Roll-up of DataAccessLog rows older than the retention window: one row per
+    (day, counsellor, action). Written by access_log_retention before the raw rows
+    are archived and deleted.
+    """
+    day = models.DateField()
+    counsellor = models.ForeignKey(Counsellor, null=True, blank=True, on_delete=models.SET_NULL)
+    action = models.CharField(max_length=50, choices=DataAccessLog.ACTION_CHOICES)
+    events = models.PositiveIntegerField(default=0)
+    distinct_leads = models.PositiveIntegerField(default=0)
+    distinct_users = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('day', 'counsellor', 'action')
+        ordering = ['-day']
+
+    def __str__(self):
+        return f"{self.day} - {self.action} - {self.events}"
+
+
+class SecurityAlert(models.Model):
+    """
+    One data-access anomaly alert per (kind, counsellor, day). The unique key makes
+    raising an alert idempotent across processes; admins are notified once, when the
+    row is first created (see access_anomaly.raise_alert).
+    """
+    KIND_CHOICES = (
+        ('lead_views', 'Lead views (24 hours)'),
+        ('phone_reveals', 'Phone reveals (1 hour)'),
+    )
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    counsellor = models.ForeignKey(Counsellor, on_delete=models.CASCADE, related_name='security_alerts')
+    day = models.DateField()
+    distinct_leads = models.PositiveIntegerField(default=0)
+    threshold = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ('kind', 'counsellor', 'day')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.counsellor.employee_id} - {self.day}"
+
+
+class DashboardCounter(models.Model):
+    """
+    Maintained admin-dashboard aggregate: one (metric, key) -> value row, e.g.
+    ('lead_status', 'NEW') or ('business_month', '2026-10'). Kept current by
+    dashboard_aggregates from Lead / Business signals and bulk paths, and rebuilt
+    by the periodic reconciliation job.
+    """
+    metric = models.CharField(max_length=40)
+    key = models.CharField(max_length=64, blank=True)
+    value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('metric', 'key')
+
+    def __str__(self):
+        return f"{self.metric}[{self.key}] = {self.value}"
+
+
+class ImportFile(models.Model):
+    """
+    An import upload or error report kept in the database, for deployments where the
+    web and worker processes share no file storage (see import_storage.py).
+    """
+    name = models.CharField(max_length=255, unique=True)
+    content = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ImportJob(models.Model):
+    """
+    A lead import running in the background (Celery) instead of inside the upload request.
+    Progress counters are updated after every batch so the import page can poll them.
+    """
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    )
+    DUPLICATE_POLICY_CHOICES = (
+        ('skip', 'Skip rows matching an existing lead'),
+        ('merge', 'Merge into the existing lead (fill blank fields)'),
+        ('flag', 'Import and flag as possible duplicate'),
+        ('allow', 'Allow duplicates (no check)'),
+    )
+    # Used by the model, the import form, the view and _run_lead_import alike.
+    DEFAULT_DUPLICATE_POLICY = 'skip'
+
+    file = models.FileField(upload_to='lead_imports/', storage=import_file_storage)
+    original_filename = models.CharField(max_length=255)
+    source = models.ForeignKey(LeadSource, on_delete=models.PROTECT)
+    assigned_counsellor = models.ForeignKey(Counsellor, on_delete=models.SET_NULL, null=True, blank=True)
+    auto_assign = models.BooleanField(default=False)
+    assignment_method = models.CharField(max_length=30, default='round_robin')
+    duplicate_policy = models.CharField(max_length=10, choices=DUPLICATE_POLICY_CHOICES, default=DEFAULT_DUPLICATE_POLICY)
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='import_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING', db_index=True)
+    rows_parsed = models.IntegerField(default=0)
+    rows_inserted = models.IntegerField(default=0)
+    rows_failed = models.IntegerField(default=0)
+    rows_assigned = models.IntegerField(default=0)
+    rows_skipped = models.IntegerField(default=0)
+    rows_merged = models.IntegerField(default=0)
+    rows_flagged = models.IntegerField(default=0)
+    batches = models.IntegerField(default=0)
+    message = models.TextField(blank=True)
+    error_report = models.FileField(upload_to='lead_imports/errors/', blank=True, storage=import_file_storage)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.original_filename} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('COMPLETED', 'FAILED')
+
+    def elapsed_seconds(self):
+        if not self.started_at:
+            return 0.0
+        from django.utils import timezone
+        end = self.finished_at or timezone.now()
+        return max(0.0, (end - self.started_at).total_seconds())
+
+    def rows_per_second(self):
+        elapsed = self.elapsed_seconds()
+        return round(self.rows_parsed / elapsed, 1) if elapsed else 0.0
+
+
 class DailyTarget(models.Model):
     """
     Simple daily task target: admin sets a number, system auto-prioritises.
@@ -469,6 +738,8 @@ class DailyTargetAssignment(models.Model):
     counsellor = models.ForeignKey(Counsellor, on_delete=models.CASCADE, related_name='daily_targets')
     completed_count = models.IntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set once the day's DailyTaskItem queue has been materialised (see daily_task_queue.py).
+    queue_built_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ('target', 'counsellor')
@@ -477,6 +748,68 @@ class DailyTargetAssignment(models.Model):
         return f"{self.counsellor.admin.first_name} — {self.target}"
 
 
+class DailyTaskItem(models.Model):
+    """
+    One entry of a counsellor's materialised Today's Target list. Rows are read in
+    (bucket, status_order, sort_key, id) order; daily_task_queue builds them at day
+    start and keeps them current as activities complete and leads change.
+    """
+    VISIT, ACTIVITY, STATUS, NEW = range(4)
+    BUCKET_CHOICES = (
+        (VISIT, 'Visit due'),
+        (ACTIVITY, 'Pending activity'),
+        (STATUS, 'Lead by status'),
+        (NEW, 'New lead'),
+    )
+
+    assignment = models.ForeignKey(DailyTargetAssignment, on_delete=models.CASCADE, related_name='task_items')
+    bucket = models.PositiveSmallIntegerField(choices=BUCKET_CHOICES)
+    status_order = models.PositiveIntegerField(default=0)
+    sort_key = models.FloatField(default=0)
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='+')
+    activity = models.ForeignKey(LeadActivity, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['assignment', 'bucket', 'status_order', 'sort_key', 'id'], name='task_item_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_bucket_display()} — lead {self.lead_id}"
+
+
+class Reminder(models.Model):
+    """
+    A due activity / visit reminder for one counsellor. The reminder dispatcher
+    (reminders.py) writes one row per (kind, object, scheduled time); delivered_at is
+    set when a browser tab of the counsellor receives it, so each reminder pops up once.
+    """
+    KIND_CHOICES = (
+        ('activity', 'Activity'),
+        ('followup', 'Visit'),
+    )
+
+    counsellor = models.ForeignKey(Counsellor, on_delete=models.CASCADE, related_name='reminders')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField(help_text="LeadActivity id (activity) or Lead id (followup)")
+    scheduled_for = models.DateTimeField()
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('kind', 'object_id', 'scheduled_for')
+        indexes = [
+            models.Index(
+                fields=['counsellor', 'scheduled_for'], name='reminder_pending_idx',
+                condition=models.Q(delivered_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id} at {self.scheduled_for}"
+
+
 def _is_admin_user_type(user_type) -> bool:
     return str(user_type) == "1"
 
@@ -526,3 +859,147 @@ def save_user_profile(sender, instance, **kwargs):
     except Exception as e:
         logger = logging.getLogger(__name__)
         logger.error(f"Error saving user profile: {e}")
+
+
+@receiver(post_save, sender=Lead)
+def track_lead_changes(sender, instance, created, **kwargs):
+    """Feed saved leads to the dashboard counters, daily task queues, calendar cache and assignment affinity matrix."""
+    from . import calendar_feed, daily_task_queue
+    from .assignment_affinity import record_status_change
+    from .badge_counts import invalidate_pending_tasks
+    from .dashboard_aggregates import record_lead_saved
+
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    previous_status = loaded.get('status')
+    invalidate_pending_tasks({instance.assigned_counsellor_id, loaded.get('assigned_counsellor_id')})
+    daily_task_queue.record_lead_saved(instance, loaded, created)
+    calendar_feed.record_leads_changed([instance])
+    record_lead_saved(instance, created)
+    if not created and 'status' in loaded and previous_status != instance.status:
+        record_status_change(instance, previous_status)
+
+
+@receiver(post_delete, sender=Lead)
+def track_lead_deleted(sender, instance, **kwargs):
+    from .calendar_feed import record_leads_changed
+    from .dashboard_aggregates import record_lead_deleted
+
+    record_lead_deleted(instance)
+    record_leads_changed([instance])
+
+
+@receiver(post_save, sender=Business)
+def track_business_changes(sender, instance, created, **kwargs):
+    from .dashboard_aggregates import record_business_saved
+
+    record_business_saved(instance, created)
+
+
+@receiver(post_delete, sender=Business)
+def track_business_deleted(sender, instance, **kwargs):
+    from .dashboard_aggregates import record_business_deleted
+
+    record_business_deleted(instance)
+
+
+_activity_receivers = threading.local()
+
+
+@contextmanager
+def activity_receivers_muted():
+    """
+    Skip the per-row LeadActivity receivers below in this thread. For bulk deletes
+    whose caller refreshes the badge, daily queue and calendar once per counsellor.
+    """
+    previous = getattr(_activity_receivers, 'muted', False)
+    _activity_receivers.muted = True
+    try:
+        yield
+    finally:
+        _activity_receivers.muted = previous
+
+
+def _activity_receivers_muted():
+    return getattr(_activity_receivers, 'muted', False)
+
+
+@receiver(post_save, sender=LeadActivity)
+@receiver(post_delete, sender=LeadActivity)
+def invalidate_pending_task_badge(sender, instance, **kwargs):
+    from .badge_counts import invalidate_pending_tasks
+
+    if _activity_receivers_muted():
+        return
+    invalidate_pending_tasks([instance.counsellor_id])
+
+
+@receiver(post_save, sender=LeadActivity)
+def track_activity_saved(sender, instance, created, **kwargs):
+    from .calendar_feed import record_activity_changed
+    from .daily_task_queue import record_activity_saved
+
+    if _activity_receivers_muted():
+        return
+    record_activity_saved(instance, created)
+    record_activity_changed(instance)
+
+
+@receiver(post_delete, sender=LeadActivity)
+def track_activity_deleted(sender, instance, **kwargs):
+    from .calendar_feed import record_activity_changed
+    from .daily_task_queue import record_activity_deleted
+
+    if _activity_receivers_muted():
+        return
+    record_activity_deleted(instance)
+    record_activity_changed(instance)
+
+
+@receiver(post_save, sender=NotificationAdmin)
+@receiver(post_delete, sender=NotificationAdmin)
+def invalidate_admin_notification_badge(sender, instance, **kwargs):
+    from .badge_counts import invalidate_admin_notifications
+
+    invalidate_admin_notifications([instance.admin_id])
+
+
+@receiver(post_save, sender=NotificationCounsellor)
+@receiver(post_delete, sender=NotificationCounsellor)
+def invalidate_counsellor_notification_badge(sender, instance, **kwargs):
+    from .badge_counts import invalidate_counsellor_notifications
+
+    invalidate_counsellor_notifications([instance.counsellor_id])
+
+
+@receiver(post_save, sender=LeadStatus)
+@receiver(post_delete, sender=LeadStatus)
+@receiver(post_save, sender=ActivityType)
+@receiver(post_delete, sender=ActivityType)
+@receiver(post_save, sender=NextAction)
+@receiver(post_delete, sender=NextAction)
+def invalidate_reference_data(sender, **kwargs):
+    """Reference tables changed: every process reloads its registry snapshot."""
+    from .reference_data import invalidate
+
+    invalidate()
+
+
+@receiver(pre_save, sender=Counsellor)
+@receiver(pre_save, sender=Admin)
+def refuse_cached_profile_save(sender, instance, **kwargs):
+    """request.counsellor / request.admin_profile may be stale; see profiles.py."""
+    if getattr(instance, '_profile_snapshot', False):
+        raise ValueError(
+            f"{sender.__name__} {instance.pk} is the request's cached profile; "
+            "fetch it from the database before saving."
+        )
+
+
+@receiver(post_save, sender=Counsellor)
+@receiver(post_delete, sender=Counsellor)
+@receiver(post_save, sender=Admin)
+@receiver(post_delete, sender=Admin)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    from .profiles import invalidate
+
+    invalidate([instance.admin_id])
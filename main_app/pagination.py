@@ -0,0 +1,188 @@
+"""
+Keyset (cursor) pagination for the large lead / activity lists.
+
+``paginate_queryset`` (utils.py) wraps Django's Paginator, which counts the whole
+result and then reads page N with OFFSET, so deep pages get slower the further
+they are. ``keyset_paginate`` instead seeks from the last row shown: the page after
+a row with key (created_at=t, id=i) under ``-created_at, -id`` is
+``WHERE created_at < t OR (created_at = t AND id < i)``, which an index on the key
+columns answers at the same cost for every page.
+
+The cursor in ``?cursor=`` is a signed, opaque token holding the boundary row's key
+values and the direction; a missing or tampered cursor just means the first page.
+Totals come from ``estimated_count``: the planner's row estimate for an unfiltered
+table on PostgreSQL, otherwise an exact count cached for PAGINATION_COUNT_CACHE_SECONDS.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+_SALT = 'crm.keyset_pagination'
+
+
+def _count_ttl():
+    return int(getattr(settings, 'PAGINATION_COUNT_CACHE_SECONDS', 60))
+
+
+def _exact_count_below():
+    return int(getattr(settings, 'PAGINATION_EXACT_COUNT_BELOW', 50000))
+
+
+def _table_estimate(model):
+    """PostgreSQL's reltuples for the model's table, or None when unavailable."""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def estimated_count(queryset):
+    """
+    Row count for display. An unfiltered queryset on a large PostgreSQL table uses the
+    planner estimate; anything else is counted exactly and cached briefly per query.
+    """
+    queryset = queryset.order_by()
+    if not queryset.query.where:
+        estimate = _table_estimate(queryset.model)
+        if estimate is not None and estimate >= _exact_count_below():
+            return estimate
+    ttl = _count_ttl()
+    if ttl <= 0:
+        return queryset.count()
+    try:
+        sql = str(queryset.query)
+    except Exception:
+        return queryset.count()
+    key = 'crm:pagination:count:' + hashlib.md5(sql.encode('utf-8')).hexdigest()
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, ttl)
+    return total
+
+
+class KeysetPage:
+    """One page of rows plus the cursors for its neighbours."""
+
+    def __init__(self, object_list, per_page, total, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.total = total
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _parse_keys(keys):
+    return [(key.lstrip('-'), key.startswith('-')) for key in keys]
+
+
+def _field_for(queryset, name):
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field
+    if name in ('pk', 'id'):
+        return queryset.model._meta.pk
+    return queryset.model._meta.get_field(name)
+
+
+def _to_string(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _encode(keys, row, direction):
+    values = [_to_string(getattr(row, name)) for name, _ in keys]
+    return signing.dumps({'d': direction, 'v': values}, salt=_SALT, compress=True)
+
+
+def _decode(queryset, keys, token):
+    try:
+        data = signing.loads(token, salt=_SALT)
+        direction, raw = data['d'], data['v']
+        if direction not in ('next', 'prev') or len(raw) != len(keys):
+            return None
+        values = [_field_for(queryset, name).to_python(value) for (name, _), value in zip(keys, raw)]
+    except Exception:
+        return None
+    if any(value is None for value in values):
+        return None
+    return direction, values
+
+
+def _seek(keys, values, forward):
+    """Rows strictly after (forward) or before the boundary in the keys' ordering."""
+    condition = Q()
+    equal = {}
+    for (name, descending), value in zip(keys, values):
+        # Going forward through a descending key means smaller values.
+        lookup = f'{name}__lt' if descending == forward else f'{name}__gt'
+        condition |= Q(**equal, **{lookup: value})
+        equal[name] = value
+    return condition
+
+
+def keyset_paginate(request, queryset, per_page, keys=('-created_at', '-id'), total=None):
+    """
+    Page ``queryset`` by ``keys`` (non-null, unique together; end with the pk) using the
+    ``cursor`` GET parameter. Pass ``total`` to skip the count when the caller has it.
+    """
+    keys = _parse_keys(keys)
+    order = [f"{'-' if descending else ''}{name}" for name, descending in keys]
+    reverse_order = [f"{'' if descending else '-'}{name}" for name, descending in keys]
+
+    cursor = request.GET.get('cursor')
+    decoded = _decode(queryset, keys, cursor) if cursor else None
+    if cursor and decoded is None:
+        logger.debug("Ignoring invalid pagination cursor")
+
+    forward = decoded is None or decoded[0] == 'next'
+    page_qs = queryset if decoded is None else queryset.filter(_seek(keys, decoded[1], forward))
+    rows = list(page_qs.order_by(*(order if forward else reverse_order))[:per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if forward:
+        has_next, has_previous = more, decoded is not None
+    else:
+        rows.reverse()
+        has_next, has_previous = True, more
+
+    if total is None:
+        total = estimated_count(queryset)
+    return KeysetPage(
+        rows,
+        per_page,
+        total,
+        next_cursor=_encode(keys, rows[-1], 'next') if rows and has_next else None,
+        previous_cursor=_encode(keys, rows[0], 'prev') if rows and has_previous else None,
+    )
@@ -0,0 +1,111 @@
+"""
+Request-scoped Counsellor / Admin profile resolution.
+
+ProfileMiddleware resolves the signed-in user's profile row once per request and
+stores it on ``request.counsellor`` / ``request.admin_profile`` (None when the user
+has no such profile). Decorators, views and the context processor read it from
+there instead of each running their own ``admin=request.user`` lookup.
+
+Profiles are cached for PROFILE_CACHE_SECONDS under a key that carries the user id
+and PROFILE_CACHE_VERSION (bump it when the cached shape changes). Saving or
+deleting a Counsellor / Admin deletes the key (receivers in models.py); with a
+per-process cache the short TTL bounds how long other workers serve the old row.
+Only the row's column values are cached, and each request gets a fresh instance built
+from them with ``request.user`` attached, so ``profile.admin`` costs no query either.
+
+These instances are read-only snapshots: saving one raises ValueError (pre_save
+receiver in models.py), because its values may be up to a TTL old and would overwrite
+newer changes. Views that edit a profile fetch the row from the database first.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+_MISSING = object()
+
+KINDS = {
+    '1': 'admin',
+    '2': 'counsellor',
+}
+
+
+def _ttl():
+    return int(getattr(settings, 'PROFILE_CACHE_SECONDS', 60))
+
+
+def _key(kind, user_id):
+    version = getattr(settings, 'PROFILE_CACHE_VERSION', 2)
+    return f'crm:profile:v{version}:{kind}:{user_id}'
+
+
+def _model(kind):
+    from .models import Admin, Counsellor
+
+    return Admin if kind == 'admin' else Counsellor
+
+
+def _load(kind, user):
+    model = _model(kind)
+    names = [f.attname for f in model._meta.concrete_fields]
+    ttl = _ttl()
+    key = _key(kind, user.pk)
+    values = cache.get(key, _MISSING) if ttl > 0 else _MISSING
+    if values is _MISSING:
+        values = model.objects.filter(admin_id=user.pk).values_list(*names).first()
+        if ttl > 0:
+            cache.set(key, values, ttl)
+    if values is None:
+        return None
+    profile = model.from_db(model.objects.db, names, values)
+    profile._profile_snapshot = True
+    # Forward cache only: user.save() must still re-read the profile it re-saves.
+    profile._meta.get_field('admin').set_cached_value(profile, user)
+    return profile
+
+
+def resolve(request):
+    """Set request.counsellor and request.admin_profile for the current user."""
+    request.counsellor = None
+    request.admin_profile = None
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return
+    kind = KINDS.get(user.user_type)
+    if kind == 'counsellor':
+        request.counsellor = _load(kind, user)
+    elif kind == 'admin':
+        request.admin_profile = _load(kind, user)
+
+
+def _resolved(request, attr):
+    if getattr(request, attr, _MISSING) is _MISSING:
+        resolve(request)
+    return getattr(request, attr)
+
+
+def get_counsellor(request):
+    """The user's Counsellor row, or None."""
+    return _resolved(request, 'counsellor')
+
+
+def get_admin_profile(request):
+    """The user's Admin row, or None."""
+    return _resolved(request, 'admin_profile')
+
+
+def counsellor_or_404(request):
+    counsellor = get_counsellor(request)
+    if counsellor is None:
+        raise Http404('No Counsellor matches the given query.')
+    return counsellor
+
+
+def admin_profile_or_404(request):
+    admin_obj = get_admin_profile(request)
+    if admin_obj is None:
+        raise Http404('No Admin matches the given query.')
+    return admin_obj
+
+
+def invalidate(user_ids):
+    cache.delete_many([_key(kind, pk) for pk in user_ids if pk for kind in KINDS.values()])
@@ -0,0 +1,125 @@
+"""
+Process-local registry of the admin-managed reference tables: LeadStatus,
+ActivityType and NextAction.
+
+All three tables are loaded together (three small queries) into an immutable
+snapshot that every lookup in this process reuses. Saving or deleting a row
+(post_save / post_delete receivers in models.py) writes a new version token to
+the shared cache once the transaction commits; each process compares its
+snapshot's version with that token at most every REFERENCE_DATA_VERSION_CHECK_SECONDS
+and reloads when it differs, so all gunicorn workers pick up admin edits. With a
+per-process cache (LocMem) other workers cannot see the token, so snapshots are
+also reloaded after REFERENCE_DATA_MAX_AGE_SECONDS.
+"""
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'crm:reference_data:version'
+
+Entry = namedtuple('Entry', 'code name color icon is_active sort_order')
+
+_lock = threading.Lock()
+_snapshot = {'version': None, 'loaded_at': 0.0, 'checked_at': 0.0, 'tables': None, 'derived': {}}
+
+
+def _check_seconds():
+    return float(getattr(settings, 'REFERENCE_DATA_VERSION_CHECK_SECONDS', 1))
+
+
+def _max_age():
+    return float(getattr(settings, 'REFERENCE_DATA_MAX_AGE_SECONDS', 300))
+
+
+def _load():
+    from .models import ActivityType, LeadStatus, NextAction
+
+    tables = {}
+    for key, model in (
+        ('lead_status', LeadStatus),
+        ('activity_type', ActivityType),
+        ('next_action', NextAction),
+    ):
+        names = {f.name for f in model._meta.get_fields()}
+        rows = model.objects.order_by('sort_order', 'name').values(
+            'code', 'name', 'is_active', 'sort_order',
+            *[f for f in ('color', 'icon') if f in names],
+        )
+        tables[key] = tuple(
+            Entry(
+                code=row['code'],
+                name=row['name'],
+                color=row.get('color', ''),
+                icon=row.get('icon', ''),
+                is_active=row['is_active'],
+                sort_order=row['sort_order'],
+            )
+            for row in rows
+        )
+    return tables
+
+
+def _tables():
+    now = time.monotonic()
+    snap = _snapshot
+    if snap['tables'] is not None and now - snap['checked_at'] < _check_seconds():
+        return snap['tables']
+    version = cache.get(VERSION_KEY)
+    if (
+        snap['tables'] is not None
+        and version == snap['version']
+        and now - snap['loaded_at'] < _max_age()
+    ):
+        snap['checked_at'] = now
+        return snap['tables']
+    with _lock:
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.add(VERSION_KEY, version, None)
+            version = cache.get(VERSION_KEY) or version
+        tables = _load()
+        _snapshot.update(version=version, loaded_at=now, checked_at=now, tables=tables, derived={})
+    return tables
+
+
+def _bump():
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, None)
+    _snapshot.update(version=None, tables=None, derived={})
+
+
+def invalidate():
+    """Publish a new version (after commit) so every process reloads its snapshot."""
+    _snapshot['checked_at'] = 0.0
+    transaction.on_commit(_bump)
+
+
+def entries(table, active_only=False):
+    """Rows of 'lead_status', 'activity_type' or 'next_action' in sort order."""
+    rows = _tables()[table]
+    if active_only:
+        return [e for e in rows if e.is_active]
+    return list(rows)
+
+
+def choices(table, active_only=True):
+    return [(e.code, e.name) for e in entries(table, active_only=active_only)]
+
+
+def derived(name, build):
+    """
+    Value computed from the current snapshot by ``build(tables)`` (e.g. pre-rendered
+    badge HTML), memoised until the snapshot is reloaded.
+    """
+    tables = _tables()
+    cached = _snapshot['derived'].get(name)
+    if cached is not None and cached[0] is tables:
+        return cached[1]
+    value = build(tables)
+    _snapshot['derived'][name] = (tables, value)
+    return value
@@ -0,0 +1,226 @@
+"""
+Activity / visit reminders pushed to counsellor browser tabs.
+
+``dispatch()`` runs once a minute (Celery beat, the ``dispatch_reminders`` command, or
+inline from the web process when REMINDER_DISPATCH_INLINE is on). In one UNION query
+it finds the scheduled activities and lead follow-ups of every counsellor that fall
+due within REMINDER_LEAD_SECONDS, and writes a Reminder row for each. The unique
+(kind, object_id, scheduled_for) key makes overlapping runs harmless.
+
+Tabs receive reminders from ``counsellor_reminder_stream``, a Server-Sent Events
+endpoint. Under ASGI the stream stays open for REMINDER_STREAM_SECONDS and checks a
+per-counsellor cache token every REMINDER_STREAM_TICK_SECONDS; the database is only
+read when the dispatcher has touched that counsellor, or every tick when the
+dispatcher's heartbeat is not visible (a per-process cache, or no dispatcher).
+Under WSGI it answers at once with anything pending and a ``retry`` of
+REMINDER_RETRY_SECONDS, so EventSource reconnects like a cheap poll. A reminder is
+marked delivered by the first tab that claims it, and one that is not claimed within
+REMINDER_MAX_LATE_SECONDS of its time is never shown. Nothing is kept in the session.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, F, TextField, Value
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_DISPATCH_LOCK = 'crm:reminders:dispatch:{minute}'
+# Set by every dispatch(); when a web process can read it, the per-counsellor tokens are trustworthy.
+_HEARTBEAT_KEY = 'crm:reminders:heartbeat'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _signal_key(counsellor_id):
+    return f'crm:reminders:signal:{counsellor_id}'
+
+
+# Dispatch
+
+def _due_rows(window_start, window_end):
+    """(kind, object_id, counsellor_id, at, lead_id, first, last, type, subject, description, course)."""
+    from .models import Lead, LeadActivity
+
+    activities = LeadActivity.objects.filter(
+        scheduled_date__gte=window_start, scheduled_date__lte=window_end,
+    ).annotate(
+        r_kind=Value('activity', output_field=CharField()),
+        r_object=F('id'),
+        r_counsellor=F('counsellor_id'),
+        r_at=F('scheduled_date'),
+        r_lead=F('lead_id'),
+        r_first=F('lead__first_name'),
+        r_last=F('lead__last_name'),
+        r_type=F('activity_type'),
+        r_subject=F('subject'),
+        r_description=F('description'),
+        r_course=F('lead__course_interested'),
+    )
+    followups = Lead.objects.filter(
+        assigned_counsellor__isnull=False,
+        next_follow_up__gte=window_start, next_follow_up__lte=window_end,
+    ).annotate(
+        r_kind=Value('followup', output_field=CharField()),
+        r_object=F('id'),
+        r_counsellor=F('assigned_counsellor_id'),
+        r_at=F('next_follow_up'),
+        r_lead=F('id'),
+        r_first=F('first_name'),
+        r_last=F('last_name'),
+        r_type=Value('', output_field=CharField()),
+        r_subject=Value('', output_field=CharField()),
+        r_description=Value('', output_field=TextField()),
+        r_course=F('course_interested'),
+    )
+    columns = (
+        'r_kind', 'r_object', 'r_counsellor', 'r_at', 'r_lead', 'r_first', 'r_last',
+        'r_type', 'r_subject', 'r_description', 'r_course',
+    )
+    return activities.order_by().values_list(*columns).union(
+        followups.order_by().values_list(*columns), all=True,
+    )
+
+
+def _payload(kind, object_id, at, lead_id, first, last, activity_type, subject, description, course, labels):
+    lead_name = f"{first} {last}"
+    payload = {
+        'type': kind,
+        'id': object_id,
+        'lead_id': lead_id,
+        'lead_name': lead_name,
+        'scheduled_time': at.isoformat(),
+        'notification_key': f'{kind}_notified_{object_id}_{at.date()}_{at.hour}_{at.minute}',
+        'unique_id': f'{kind}_{object_id}_{at.timestamp()}',
+    }
+    if kind == 'activity':
+        label = labels.get(activity_type, activity_type)
+        payload.update(
+            title=f"{label}: {subject}",
+            message=f"You have a scheduled {label.lower()} with {lead_name}",
+            description=description or 'No description',
+        )
+    else:
+        payload.update(
+            title=f"Visit: {lead_name}",
+            message=f"You have a visit scheduled with {lead_name}",
+            course_interested=course or 'N/A',
+        )
+    return payload
+
+
+def dispatch(now=None):
+    """Write Reminder rows for everything due around ``now``. Returns the rows considered."""
+    from .calendar_feed import activity_type_labels
+    from .models import Reminder
+
+    now = now or timezone.now()
+    lookback = timedelta(seconds=int(_setting('REMINDER_LOOKBACK_SECONDS', 120)))
+    lead = timedelta(seconds=int(_setting('REMINDER_LEAD_SECONDS', 60)))
+    labels = activity_type_labels()
+
+    reminders = []
+    for kind, object_id, counsellor_id, at, *rest in _due_rows(now - lookback, now + lead):
+        reminders.append(Reminder(
+            counsellor_id=counsellor_id, kind=kind, object_id=object_id, scheduled_for=at,
+            payload=_payload(kind, object_id, at, *rest, labels),
+        ))
+    if reminders:
+        Reminder.objects.bulk_create(reminders, ignore_conflicts=True)
+        token = uuid.uuid4().hex
+        cache.set_many({_signal_key(r.counsellor_id): token for r in reminders}, None)
+    cache.set(_HEARTBEAT_KEY, now.isoformat(), 10 * 60)
+
+    retention = timedelta(days=int(_setting('REMINDER_RETENTION_DAYS', 7)))
+    Reminder.objects.filter(created_at__lt=now - retention).delete()
+    return len(reminders)
+
+
+def maybe_dispatch_inline():
+    """With REMINDER_DISPATCH_INLINE, run dispatch() at most once a minute per cache."""
+    if not _setting('REMINDER_DISPATCH_INLINE', False):
+        return
+    minute = int(time.time() // 60)
+    if cache.add(_DISPATCH_LOCK.format(minute=minute), 1, 120):
+        try:
+            dispatch()
+        except Exception:
+            logger.exception("Inline reminder dispatch failed")
+
+
+# Delivery
+
+def claim(counsellor_id, now=None):
+    """Undelivered, still timely reminders for the counsellor, marked delivered; payloads in time order."""
+    from .models import Reminder
+
+    now = now or timezone.now()
+    max_late = timedelta(seconds=int(_setting('REMINDER_MAX_LATE_SECONDS', 600)))
+    pending = list(
+        Reminder.objects
+        .filter(counsellor_id=counsellor_id, delivered_at__isnull=True, scheduled_for__gte=now - max_late)
+        .order_by('scheduled_for', 'id')
+        .values_list('id', 'payload')
+    )
+    payloads = []
+    for pk, payload in pending:
+        # Another tab may have claimed it between the read and this update.
+        if Reminder.objects.filter(pk=pk, delivered_at__isnull=True).update(delivered_at=now):
+            payloads.append(payload)
+    return payloads
+
+
+def poll(counsellor_id):
+    maybe_dispatch_inline()
+    return claim(counsellor_id)
+
+
+def response_body(notifications):
+    """The JSON shape check_current_time_notifications has always returned."""
+    grouped = {}
+    for notification in notifications:
+        grouped.setdefault(notification['scheduled_time'], []).append(notification)
+    return {'notifications': notifications, 'grouped': grouped, 'count': len(notifications)}
+
+
+def _event(notifications):
+    return f"event: reminders\ndata: {json.dumps(response_body(notifications))}\n\n"
+
+
+def single_response(counsellor_id):
+    """One-shot SSE body for WSGI servers: pending reminders, then reconnect after the retry."""
+    retry = int(_setting('REMINDER_RETRY_SECONDS', 30)) * 1000
+    notifications = poll(counsellor_id)
+    return f"retry: {retry}\n\n" + (_event(notifications) if notifications else '')
+
+
+async def stream(counsellor_id):
+    """Held SSE stream for ASGI servers; ends after REMINDER_STREAM_SECONDS and the tab reconnects."""
+    from asgiref.sync import sync_to_async
+
+    tick = max(1, int(_setting('REMINDER_STREAM_TICK_SECONDS', 10)))
+    deadline = time.monotonic() + int(_setting('REMINDER_STREAM_SECONDS', 300))
+    inline = _setting('REMINDER_DISPATCH_INLINE', False)
+    seen = checked = None
+    yield "retry: 1000\n\n"
+    while True:
+        keys = await sync_to_async(cache.get_many)([_HEARTBEAT_KEY, _signal_key(counsellor_id)])
+        token = keys.get(_signal_key(counsellor_id))
+        # Without a visible heartbeat the tokens cannot be trusted: read the table each tick.
+        if inline or _HEARTBEAT_KEY not in keys or checked is None or token != seen:
+            seen, checked = token, True
+            notifications = await sync_to_async(poll)(counsellor_id)
+            if notifications:
+                yield _event(notifications)
+        if time.monotonic() >= deadline:
+            return
+        yield ": ping\n\n"
+        await asyncio.sleep(tick)
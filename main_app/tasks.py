@@ -0,0 +1,163 @@
+"""
+Celery tasks (picked up by app.autodiscover_tasks() in college_management_system/celery.py).
+"""
+import csv
+import io
+import logging
+import tempfile
+
+from celery import shared_task
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def run_lead_import_job(job_id):
+    """Parse, bulk insert and auto-assign the rows of one ImportJob off the request path."""
+    from .admin_views import _run_lead_import
+    from .lead_import_io import iter_lead_import_rows
+    from .models import ImportJob
+
+    job = (
+        ImportJob.objects
+        .select_related('source', 'assigned_counsellor')
+        .filter(pk=job_id)
+        .first()
+    )
+    # Redelivered / duplicate messages must not import the same file twice.
+    if job is None or job.status != 'PENDING':
+        return
+    claimed = ImportJob.objects.filter(pk=job.pk, status='PENDING').update(
+        status='RUNNING', started_at=timezone.now()
+    )
+    if not claimed:
+        return
+
+    errors_raw = tempfile.TemporaryFile()
+    errors_text = io.TextIOWrapper(errors_raw, encoding='utf-8', newline='')
+    writer = csv.writer(errors_text)
+    writer.writerow(['row_number', 'error'])
+
+    def on_error(row_num, message):
+        writer.writerow([row_num, message])
+
+    def on_batch(summary):
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_parsed=summary['rows_parsed'],
+            rows_inserted=summary['success_count'],
+            rows_failed=summary['error_count'],
+            rows_assigned=summary['assigned_count'],
+            rows_skipped=summary['duplicates_skipped'],
+            rows_merged=summary['duplicates_merged'],
+            rows_flagged=summary['duplicates_flagged'],
+            batches=summary['batches'],
+        )
+
+    summary = None
+    status = 'FAILED'
+    message = ''
+    try:
+        with job.file.open('rb') as fh:
+            summary = _run_lead_import(
+                iter_lead_import_rows(
+                    fh,
+                    job.original_filename,
+                    xlsx_workers=getattr(settings, 'LEAD_IMPORT_XLSX_WORKERS', 0),
+                ),
+                job.source,
+                job.assigned_counsellor,
+                auto_assign=job.auto_assign,
+                assignment_method=job.assignment_method,
+                duplicate_policy=job.duplicate_policy,
+                on_batch=on_batch,
+                on_error=on_error,
+            )
+        status = 'COMPLETED'
+        message = f"Imported {summary['success_count']} leads in {summary['batches']} batches."
+        if summary['error_count']:
+            message += f" {summary['error_count']} rows had errors and were skipped."
+        if summary['duplicates_skipped']:
+            message += f" {summary['duplicates_skipped']} duplicates skipped."
+        if summary['duplicates_merged']:
+            message += f" {summary['duplicates_merged']} duplicates merged into existing leads."
+        if summary['duplicates_flagged']:
+            message += f" {summary['duplicates_flagged']} possible duplicates flagged."
+        if job.auto_assign and not job.assigned_counsellor_id:
+            if summary['assign_error']:
+                message += f" Auto-assignment failed: {summary['assign_error']}."
+            elif not summary['counsellors_available']:
+                message += " No active counsellors found for auto-assignment."
+            else:
+                message += f" {summary['assigned_count']} leads auto-assigned."
+    except Exception as e:
+        logger.exception("Lead import job %s failed", job.pk)
+        message = f"Import failed: {str(e)}"
+
+    job.refresh_from_db()
+    if summary is not None:
+        job.rows_parsed = summary['rows_parsed']
+        job.rows_inserted = summary['success_count']
+        job.rows_failed = summary['error_count']
+        job.rows_assigned = summary['assigned_count']
+        job.rows_skipped = summary['duplicates_skipped']
+        job.rows_merged = summary['duplicates_merged']
+        job.rows_flagged = summary['duplicates_flagged']
+        job.batches = summary['batches']
+    job.status = status
+    job.message = message
+    job.finished_at = timezone.now()
+    try:
+        errors_text.flush()
+        errors_text.detach()
+        if job.rows_failed:
+            errors_raw.seek(0)
+            job.error_report.save(f'import_{job.pk}_errors.csv', File(errors_raw), save=False)
+    finally:
+        errors_raw.close()
+    # The upload is only needed while the job runs.
+    if status == 'COMPLETED' and job.file:
+        job.file.delete(save=False)
+    job.save()
+
+
+@shared_task(ignore_result=True)
+def reconcile_dashboard_aggregates():
+    """Periodic repair of the maintained admin-dashboard counters (CELERY_BEAT_SCHEDULE)."""
+    from .dashboard_aggregates import reconcile
+
+    reconcile()
+
+
+@shared_task(ignore_result=True)
+def flush_data_access_log():
+    """Drain the shared (Redis) DataAccessLog queue, e.g. when no web process is flushing."""
+    from .access_log import flush
+
+    flush()
+
+
+@shared_task(ignore_result=True)
+def purge_data_access_log():
+    """Daily DataAccessLog roll-up, archive and purge (CELERY_BEAT_SCHEDULE)."""
+    from .access_log_retention import apply_retention
+
+    apply_retention()
+
+
+@shared_task(ignore_result=True)
+def build_daily_task_queues():
+    """Materialise every counsellor's Today's Target queue at day start (CELERY_BEAT_SCHEDULE)."""
+    from .daily_task_queue import build_all
+
+    build_all()
+
+
+@shared_task(ignore_result=True)
+def dispatch_reminders():
+    """Write the activity / visit reminders due this minute (CELERY_BEAT_SCHEDULE)."""
+    from .reminders import dispatch
+
+    dispatch()
@@ -4,6 +4,8 @@ from django import template
 from django.utils.html import escape
 from django.utils.safestring import mark_safe
 
+from main_app import reference_data
+
 register = template.Library()
 
 _BOOTSTRAP_BADGE_COLORS = frozenset(
@@ -47,17 +49,28 @@ def dict_get(d, key):
     return key
 
 
+def _render_activity_badge(entry):
+    color = _safe_badge_color(entry.color)
+    icon = _safe_fa_icon_class(entry.icon)
+    name = escape(str(entry.name))
+    return mark_safe(f'<span class="badge badge-{color}"><i class="{icon} mr-1"></i>{name}</span>')
+
+
+def _activity_badges(tables):
+    return {e.code: _render_activity_badge(e) for e in tables['activity_type']}
+
+
+def _next_action_names(tables):
+    return {e.code: e.name for e in tables['next_action']}
+
+
 @register.simple_tag
 def activity_type_badge(code):
-    """Render activity type badge from DB. Usage: {% activity_type_badge activity.activity_type %}"""
+    """Render activity type badge (pre-rendered per code from the reference-data registry). Usage: {% activity_type_badge activity.activity_type %}"""
     try:
-        from main_app.models import ActivityType
-        obj = ActivityType.objects.filter(code=code).first()
-        if obj:
-            color = _safe_badge_color(obj.color)
-            icon = _safe_fa_icon_class(obj.icon)
-            name = escape(str(obj.name))
-            return mark_safe(f'<span class="badge badge-{color}"><i class="{icon} mr-1"></i>{name}</span>')
+        badge = reference_data.derived('activity_type_badges', _activity_badges).get(code)
+        if badge is not None:
+            return badge
     except Exception:
         pass
     return mark_safe(f'<span class="badge badge-info">{escape(str(code))}</span>')
@@ -69,10 +82,7 @@ def next_action_name(code):
     if not code:
         return '—'
     try:
-        from main_app.models import NextAction
-        obj = NextAction.objects.filter(code=code).first()
-        if obj:
-            return obj.name
+        return reference_data.derived('next_action_names', _next_action_names).get(code, code)
     except Exception:
         pass
     return code
@@ -0,0 +1,18 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner that writes DataAccessLog events inline (DATA_ACCESS_LOG_BUFFER='sync'):
+    nothing may be left queued for a later flush once the test database is gone.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._access_log_override = override_settings(DATA_ACCESS_LOG_BUFFER='sync')
+        self._access_log_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._access_log_override.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1756 @@
-from django.test import TestCase
+"""
+Regression tests.
 
-# Create your tests here.
+CounsellorQueryPlanTests: each test runs a counsellor page or utils helper, captures
+the SELECTs it sends that read Lead or LeadActivity, and EXPLAINs each one: a
+sequential scan of either table fails the test. On PostgreSQL sequential scans are
+disabled while explaining, so the small test tables still show whether an index is
+able to serve the query.
+
+XlsxParallelParserTests: the multi-process .xlsx reader yields the same rows as the
+openpyxl reader.
+
+DashboardAggregateTests: the maintained dashboard counters follow lead creates, status
+changes, reassignments and deletes once the transaction commits, and reconcile()
+repairs drift.
+
+DailyTaskQueueTests: the incrementally maintained Today's Target queue matches a fresh
+candidate_items() after status changes, reassignments, follow-ups, completions,
+additions and deletes, and additions are trimmed back to the target count.
+
+KeysetPaginationTests: cursors walk forward and back over ties in the sort key without
+skipping or repeating rows, bad cursors fall back to the first page, counts are cached,
+and the counsellor_work_view order is served by its index.
+
+ProfileCacheTests: the request profile is read from the cache after the first request,
+is rebuilt per request as a read-only snapshot, and is dropped when the row is saved.
+
+AccessLogBufferTests: the test runner writes DataAccessLog rows inline; the memory buffer
+reports its oldest event's age and publishes its metrics to the cache on flush.
+
+AccessAnomalyTests: the cache-bucket window counts distinct leads, forgets them once
+they leave the window and is seeded with events still in the access-log buffer;
+crossing a threshold raises one SecurityAlert per rule, counsellor and day.
+
+AccessLogRetentionTests: rows past retention are rolled up, archived and only then
+deleted; without an archive prefix they are rolled up and kept; days=0 means zero.
+
+ImportJobTests: run_lead_import_job claims a PENDING job exactly once, and uploads are
+queued on the worker when LEAD_IMPORT_ASYNC is on.
+
+LeadCopyLoaderTests (PostgreSQL only): the COPY loader reports existing lead_ids per row
+and lets every other constraint violation raise.
+
+DuplicateImportTests: rows matching an existing lead or an earlier row by phone or email
+are skipped (the default), merged into blank fields, or inserted and flagged.
+
+ContactKeyTests: normalize_phone and normalize_email edge cases.
+
+LeadImportStreamingTests: CSV uploads are decoded as rows are consumed, row batches are
+cut from the iterator without materialising it, and _run_lead_import reports running
+counts once per batch.
+
+LeadAssignmentTests: workload-balanced assignment evens out lead counts, weighted-fair
+assignment follows lead_capacity and skips counsellors without capacity, performance-based
+assignment favours the best conversion rate, and the query count does not grow with the
+number of leads (bulk updates are cut into LEAD_BULK_UPDATE_BATCH_SIZE statements).
+
+AffinityMatrixTests: specialization assignment sends leads to the counsellor with the
+best industry / source record, reads the cached matrix without queries, and rebuilds it
+after a lead moves into CLOSED_WON or an assignment run.
+
+CounsellorSnapshotTests: the batched activity snapshot matches per-counsellor counts,
+is served from the cache on the next call, and the progress report sends the same
+number of queries however many counsellors it lists.
+
+SecurityAlertTests: raising an alert notifies every admin with a fixed number of queries,
+a repeat the same day is answered from the cache marker without queries, and the
+lead_detail view raises a lead_views alert once its threshold is crossed.
+
+ReferenceDataTests: status / activity type / next action lookups are answered from the
+process snapshot without queries, an edit is visible once its transaction commits, and a
+version published by another process makes this one reload.
+
+LeadTagTests: activity type badges and next-action names render a long timeline without
+queries, follow an edited ActivityType after commit and escape unknown codes.
+
+ContextProcessorTests: crm_context costs no queries when a template reads none of its
+values, resolves the profile once for all permission flags, and serves badge counts
+from the per-user cache on the next request.
+
+LeadSearchTests: search_text follows saves (including update_fields saves), bulk updates
+and imported rows; phone terms match however the number is typed; and the FTS5 path
+returns the same leads as the plain contains() fallback.
+
+PendingTasksTests: the NOT EXISTS query behind pending_tasks returns the same activities
+as the old per-activity exists() loop, and the page's query count does not grow with the
+number of activities.
+
+CalendarFeedTests: both calendar feeds reject a missing or inverted range and clamp long
+ones; week blocks are served from the cache and dropped when an activity moves or a lead
+with a follow-up is deleted, one by one or in bulk.
+
+ReminderTests: one dispatch files due activities and visits for every counsellor without
+duplicates; under WSGI the stream endpoint answers once with a retry and the pending
+reminders, under ASGI it streams them as events; each reminder is delivered once, late
+ones are dropped, and polling leaves the session alone.
+"""
+import io
+import json
+import re
+import time
+import zipfile
+from datetime import timedelta
+
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.db import IntegrityError
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Counsellor, CustomUser, DashboardCounter, DataAccessLog, ImportFile, ImportJob, Lead, LeadActivity,
+    LeadSource,
+)
+
+HOT_TABLES = ('main_app_lead', 'main_app_leadactivity')
+
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+"?(main_app_lead|main_app_leadactivity)"?(?=[\s,)]|$)', re.I)
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(main_app_lead|main_app_leadactivity)"?\b')
+_PG_SEQ_SCAN = re.compile(r'Seq Scan on "?(main_app_lead|main_app_leadactivity)"?\b')
+
+
+def explain(sql, params=None):
+    """Plan lines for one captured SELECT on the current database."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql, params)
+            lines = [row[0] for row in cursor.fetchall()]
+            cursor.execute('RESET enable_seqscan')
+            return lines
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+    return []
+
+
+def sequential_scans(sql):
+    pattern = _PG_SEQ_SCAN if connection.vendor == 'postgresql' else _SQLITE_SCAN
+    return [line for line in explain(sql) if pattern.search(line.strip())]
+
+
+class CounsellorQueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        source = LeadSource.objects.create(name='Plan test')
+        cls.counsellors = []
+        now = timezone.now()
+        for n in range(2):
+            user = CustomUser.objects.create_user(
+                email=f'plan{n}@example.com', password='pw', user_type='2',
+                first_name=f'Plan{n}', last_name='Test', gender='M', address='',
+            )
+            counsellor = Counsellor.objects.create(admin=user, employee_id=f'PLAN{n}')
+            cls.counsellors.append(counsellor)
+            for i in range(30):
+                lead = Lead.objects.create(
+                    lead_id=f'PL{n}{i:04d}', first_name=f'Lead{i}', last_name='Plan',
+                    email=f'lead{n}{i}@example.com', phone=f'98{n}{i:07d}', source=source,
+                    assigned_counsellor=counsellor,
+                    status=('NEW', 'CONTACTED', 'QUALIFIED')[i % 3],
+                    next_follow_up=now + timedelta(hours=i - 10) if i % 2 else None,
+                )
+                LeadActivity.objects.create(
+                    lead=lead, counsellor=counsellor, activity_type='CALL', subject='Call',
+                    description='', is_completed=bool(i % 3), next_action='CALL_BACK' if i % 4 else '',
+                    scheduled_date=now + timedelta(hours=i - 15) if i % 2 else None,
+                )
+
+    def setUp(self):
+        cache.clear()
+        self.counsellor = self.counsellors[0]
+        self.client.force_login(self.counsellor.admin)
+
+    def assertIndexedQueries(self, run):
+        with CaptureQueriesContext(connection) as captured:
+            run()
+        checked = 0
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT') or not _TABLE_REF.search(sql):
+                continue
+            checked += 1
+            scans = sequential_scans(sql)
+            self.assertEqual(scans, [], f'Sequential scan in plan for:\n{sql}\nPlan: {scans}')
+        self.assertGreater(checked, 0, 'No Lead / LeadActivity queries were captured.')
+
+    def assertPageIndexed(self, url_name, query=''):
+        def run():
+            response = self.client.get(reverse(url_name) + query)
+            self.assertEqual(response.status_code, 200)
+        self.assertIndexedQueries(run)
+
+    def test_counsellor_home(self):
+        self.assertPageIndexed('counsellor_home')
+
+    def test_pending_tasks(self):
+        self.assertPageIndexed('pending_tasks')
+
+    def test_my_daily_target(self):
+        self.assertPageIndexed('my_daily_target')
+
+    def test_my_leads_pages(self):
+        self.assertPageIndexed('my_leads')
+        self.assertPageIndexed('my_leads', '?status=CONTACTED')
+
+    def test_utils_helpers(self):
+        from .badge_counts import pending_task_count
+        from .utils import (
+            get_counsellor_activity_snapshots,
+            get_counsellor_daily_target_progress,
+        )
+
+        self.assertIndexedQueries(lambda: get_counsellor_daily_target_progress(self.counsellor))
+        self.assertIndexedQueries(lambda: get_counsellor_activity_snapshots(self.counsellors))
+        self.assertIndexedQueries(lambda: pending_task_count(self.counsellor))
+
+
+class XlsxParallelParserTests(SimpleTestCase):
+
+    def workbook(self, rows):
+        from openpyxl import Workbook
+        from openpyxl.worksheet.hyperlink import Hyperlink
+
+        wb = Workbook()
+        ws = wb.active
+        ws.append(['first_name', 'email', 'phone'])
+        for i in range(2, rows + 2):
+            ws.append([f'Lead{i}', f'lead{i}@example.com', 9000000000 + i])
+            # Hyperlinks are written after </sheetData>; long tooltips make that part large.
+            ws.cell(i, 2).hyperlink = Hyperlink(ref=f'B{i}', location=f"'Sheet'!A{i}", tooltip='t' * 150)
+        data = io.BytesIO()
+        wb.save(data)
+        return data
+
+    def test_large_part_after_sheet_data(self):
+        from .lead_import_io import _iter_xlsx_rows
+        from .lead_import_xlsx import _SCAN_BLOCK, iter_xlsx_rows_parallel
+
+        data = self.workbook(1500)
+        sheet = zipfile.ZipFile(data).read('xl/worksheets/sheet1.xml')
+        self.assertGreater(len(sheet) - sheet.rindex(b'</sheetData>'), _SCAN_BLOCK)
+
+        expected = list(_iter_xlsx_rows(data))
+        parsed = list(iter_xlsx_rows_parallel(data, workers=1, chunk_bytes=64 * 1024))
+        self.assertEqual(len(expected), 1500)
+        self.assertEqual(parsed, expected)
+
+
+def make_counsellor(tag):
+    user = CustomUser.objects.create_user(
+        email=f'{tag}@example.com', password='pw', user_type='2',
+        first_name=tag.title(), last_name='Test', gender='M', address='',
+    )
+    return Counsellor.objects.create(admin=user, employee_id=tag.upper())
+
+
+class DashboardAggregateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Counter test')
+        cls.first = make_counsellor('countera')
+        cls.second = make_counsellor('counterb')
+
+    def create_lead(self, n, **fields):
+        return Lead.objects.create(
+            lead_id=f'DC{n:04d}', first_name=f'Lead{n}', last_name='Counter', email=f'dc{n}@example.com',
+            phone=f'97{n:08d}', source=self.source, assigned_counsellor=self.first, **fields,
+        )
+
+    def counters(self):
+        return {
+            (metric, key): value
+            for metric, key, value in DashboardCounter.objects.values_list('metric', 'key', 'value')
+            if value
+        }
+
+    def assertCountersMatchSource(self):
+        from .dashboard_aggregates import compute_counters
+
+        expected = {term: value for term, value in compute_counters().items() if value}
+        self.assertEqual(self.counters(), expected)
+
+    def test_create_writes_after_commit(self):
+        from .dashboard_aggregates import month_key
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            lead = self.create_lead(1)
+            self.assertEqual(self.counters(), {})
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.counters(), {
+            ('lead_status', 'NEW'): 1,
+            ('lead_source', str(self.source.pk)): 1,
+            ('lead_month', month_key(lead.created_at)): 1,
+            ('counsellor_leads', str(self.first.pk)): 1,
+        })
+
+    def test_status_change_reassign_and_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            leads = [self.create_lead(n) for n in range(3)]
+        self.assertCountersMatchSource()
+
+        lead = Lead.objects.get(pk=leads[0].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            lead.status = 'CLOSED_WON'
+            lead.save()
+        self.assertCountersMatchSource()
+        self.assertEqual(self.counters()[('lead_status', 'NEW')], 2)
+
+        lead = Lead.objects.get(pk=leads[1].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            lead.assigned_counsellor = self.second
+            lead.save()
+        self.assertCountersMatchSource()
+        self.assertEqual(self.counters()[('counsellor_leads', str(self.second.pk))], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Lead.objects.get(pk=leads[0].pk).delete()
+        self.assertCountersMatchSource()
+        self.assertNotIn(('lead_status', 'CLOSED_WON'), self.counters())
+
+    def test_rollback_drops_deltas(self):
+        from django.db import transaction
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.create_lead(1)
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.counters(), {})
+
+    def test_reconcile_repairs_drift(self):
+        from .dashboard_aggregates import reconcile
+
+        with self.captureOnCommitCallbacks(execute=True):
+            leads = [self.create_lead(n) for n in range(3)]
+        Lead.objects.filter(pk=leads[0].pk).update(status='CONTACTED')
+        DashboardCounter.objects.create(metric='lead_status', key='LOST_IN_TRANSIT', value=5)
+
+        with self.assertLogs('main_app.dashboard_aggregates', 'INFO'):
+            self.assertEqual(reconcile(), 3)
+        self.assertCountersMatchSource()
+        self.assertEqual(reconcile(), 0)
+
+
+class DailyTaskQueueTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Queue test')
+        cls.first = make_counsellor('queuea')
+        cls.second = make_counsellor('queueb')
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.leads = [
+            self.create_lead(0, status='NEW'),
+            self.create_lead(1, status='CONTACTED'),
+            self.create_lead(2, status='QUALIFIED'),
+            self.create_lead(3, status='CLOSED_WON'),
+            self.create_lead(4, status='NEW', next_follow_up=now - timedelta(hours=1)),
+        ]
+        self.activities = [
+            LeadActivity.objects.create(
+                lead=self.leads[n], counsellor=self.first, activity_type='CALL', subject=f'Call {n}',
+                is_completed=False, scheduled_date=now + timedelta(minutes=n),
+            )
+            for n in range(3)
+        ]
+
+    def create_lead(self, n, counsellor=None, **fields):
+        return Lead.objects.create(
+            lead_id=f'DQ{n:04d}', first_name=f'Queue{n}', last_name='Lead', email=f'dq{n}@example.com',
+            phone=f'96{n:08d}', source=self.source, assigned_counsellor=counsellor or self.first, **fields,
+        )
+
+    def build(self, target_count=50):
+        from . import daily_task_queue
+        from .models import DailyTarget
+        from .utils import _daily_target_assignments, local_day_bounds
+
+        today, _, _ = local_day_bounds()
+        DailyTarget.objects.filter(target_date=today).delete()
+        DailyTarget.objects.create(target_date=today, target_count=target_count)
+        assignments = _daily_target_assignments([self.first, self.second], today)
+        for assignment in assignments.values():
+            daily_task_queue.build(assignment)
+        return assignments
+
+    def assertQueuesFresh(self, assignments):
+        from .daily_task_queue import QUEUE_ORDER, candidate_items
+        from .models import DailyTaskItem
+
+        fields = ('bucket', 'status_order', 'sort_key', 'lead_id', 'activity_id')
+        for assignment in assignments.values():
+            stored = list(
+                DailyTaskItem.objects.filter(assignment=assignment).order_by(*QUEUE_ORDER).values_list(*fields)
+            )
+            fresh = [tuple(getattr(item, name) for name in fields) for item in candidate_items(assignment)]
+            self.assertEqual(stored, fresh)
+
+    def test_incremental_queue_matches_a_fresh_build(self):
+        assignments = self.build()
+        self.assertQueuesFresh(assignments)
+
+        lead = Lead.objects.get(pk=self.leads[0].pk)
+        lead.status = 'NEGOTIATION'
+        lead.save()
+        self.assertQueuesFresh(assignments)
+
+        lead = Lead.objects.get(pk=self.leads[1].pk)
+        lead.assigned_counsellor = self.second
+        lead.save()
+        self.assertQueuesFresh(assignments)
+
+        lead = Lead.objects.get(pk=self.leads[2].pk)
+        lead.next_follow_up = timezone.now() - timedelta(minutes=5)
+        lead.save()
+        self.assertQueuesFresh(assignments)
+
+        activity = LeadActivity.objects.get(pk=self.activities[0].pk)
+        activity.is_completed = True
+        activity.save()
+        self.assertQueuesFresh(assignments)
+
+        self.create_lead(5, counsellor=self.second, status='CONTACTED')
+        LeadActivity.objects.create(
+            lead=self.leads[3], counsellor=self.first, activity_type='CALL', subject='Call later',
+            is_completed=False, scheduled_date=timezone.now() + timedelta(days=1),
+        )
+        self.assertQueuesFresh(assignments)
+
+        Lead.objects.get(pk=self.leads[4].pk).delete()
+        self.assertQueuesFresh(assignments)
+
+    def test_additions_are_trimmed_to_the_target(self):
+        from .daily_task_queue import record_activity_saved
+        from .models import DailyTaskItem
+
+        assignments = self.build(target_count=4)
+        self.assertQueuesFresh(assignments)
+
+        with mock.patch('main_app.daily_task_queue.record_activity_saved'):
+            activity = LeadActivity.objects.create(
+                lead=self.leads[3], counsellor=self.first, activity_type='CALL', subject='Urgent',
+                is_completed=False, scheduled_date=timezone.now() - timedelta(days=1),
+            )
+        with self.assertNumQueries(3):
+            record_activity_saved(activity, created=True)
+        self.assertEqual(DailyTaskItem.objects.filter(assignment=assignments[self.first.pk]).count(), 4)
+        self.assertQueuesFresh(assignments)
+
+        activity.is_completed = False
+        with self.assertNumQueries(4):
+            record_activity_saved(activity)
+        self.assertQueuesFresh(assignments)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        source = LeadSource.objects.create(name='Keyset test')
+        for n in range(7):
+            Lead.objects.create(
+                lead_id=f'KS{n:04d}', first_name=f'Lead{n}', last_name='Keyset', email=f'ks{n}@example.com',
+                phone=f'96{n:08d}', source=source,
+            )
+        # Two runs of equal created_at, so page boundaries fall inside ties.
+        now = timezone.now()
+        Lead.objects.filter(lead_id__in=['KS0000', 'KS0001', 'KS0002', 'KS0003']).update(created_at=now)
+        Lead.objects.filter(lead_id__in=['KS0004', 'KS0005', 'KS0006']).update(created_at=now - timedelta(days=1))
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.queryset = Lead.objects.filter(lead_id__startswith='KS')
+
+    def page(self, cursor=None):
+        from .pagination import keyset_paginate
+
+        request = self.factory.get('/', {'cursor': cursor} if cursor else {})
+        return keyset_paginate(request, self.queryset, 3)
+
+    def ids(self, page):
+        return [lead.pk for lead in page]
+
+    def test_forward_and_back(self):
+        expected = list(self.queryset.order_by('-created_at', '-id').values_list('id', flat=True))
+        pages = [self.page()]
+        while pages[-1].has_next():
+            pages.append(self.page(pages[-1].next_cursor))
+        self.assertEqual([self.ids(p) for p in pages], [expected[0:3], expected[3:6], expected[6:7]])
+        self.assertFalse(pages[0].has_previous())
+        self.assertIsNone(pages[-1].next_cursor)
+
+        back = [pages[-1]]
+        while back[-1].has_previous():
+            back.append(self.page(back[-1].previous_cursor))
+        self.assertEqual([self.ids(p) for p in back], [self.ids(p) for p in reversed(pages)])
+        self.assertEqual(pages[1].total, 7)
+
+    def test_invalid_cursor_is_first_page(self):
+        from django.core import signing
+
+        first = self.ids(self.page())
+        token = self.page().next_cursor
+        forged = signing.dumps({'d': 'next', 'v': ['2000-01-01T00:00:00+00:00', '1']}, salt='other', compress=True)
+        for cursor in (token[:-2] + 'xx', forged, 'garbage'):
+            page = self.page(cursor)
+            self.assertEqual(self.ids(page), first)
+            self.assertFalse(page.has_previous())
+
+    def test_estimated_count_is_cached(self):
+        from .pagination import estimated_count
+
+        self.assertEqual(estimated_count(self.queryset), 7)
+        Lead.objects.filter(lead_id='KS0006').delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(estimated_count(self.queryset), 7)
+        with override_settings(PAGINATION_COUNT_CACHE_SECONDS=0):
+            self.assertEqual(estimated_count(self.queryset), 6)
+
+    def test_activity_keyset_order_uses_index(self):
+        from .pagination import _seek
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plan text checked on SQLite only.')
+        activities = (
+            LeadActivity.objects.annotate(activity_date=LeadActivity.ACTIVITY_DATE)
+            .order_by('-activity_date', '-id')
+        )
+        seek = _seek([('activity_date', True), ('id', True)], [timezone.now(), 1], True)
+        for query in (activities, activities.filter(seek), activities.filter(counsellor_id=1).filter(seek)):
+            plan = explain(*query[:51].query.sql_with_params())
+            self.assertFalse([line for line in plan if 'TEMP B-TREE' in line], plan)
+
+
+class ProfileCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counsellor = make_counsellor('profilecache')
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def resolve(self):
+        from .profiles import get_counsellor
+
+        request = self.factory.get('/')
+        request.user = CustomUser.objects.get(pk=self.counsellor.admin_id)
+        return get_counsellor(request), request.user
+
+    def test_cached_after_first_request(self):
+        self.resolve()
+        with self.assertNumQueries(1):  # The user only.
+            profile, user = self.resolve()
+        self.assertEqual(profile.pk, self.counsellor.pk)
+        self.assertIs(profile.admin, user)
+        self.assertFalse(profile._state.adding)
+
+    def test_snapshot_refuses_save(self):
+        profile, _ = self.resolve()
+        profile.department = 'Stale'
+        with self.assertRaises(ValueError):
+            profile.save()
+        self.assertEqual(Counsellor.objects.get(pk=self.counsellor.pk).department, '')
+
+    def test_save_invalidates(self):
+        self.resolve()
+        fresh = Counsellor.objects.get(pk=self.counsellor.pk)
+        fresh.department = 'Admissions'
+        fresh.save()
+        profile, _ = self.resolve()
+        self.assertEqual(profile.department, 'Admissions')
+
+
+class AccessLogBufferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counsellor = make_counsellor('accesslog')
+        cls.admin = CustomUser.objects.create_superuser(email='accesslog-admin@example.com', password='pw')
+
+    def setUp(self):
+        cache.clear()
+
+    def record(self):
+        from .access_log import record_access
+
+        request = RequestFactory().get('/')
+        request.user = self.counsellor.admin
+        record_access(request, self.counsellor, 'list_my_leads')
+
+    def test_runner_writes_inline(self):
+        self.assertEqual(settings.DATA_ACCESS_LOG_BUFFER, 'sync')
+        self.client.force_login(self.counsellor.admin)
+        self.client.get(reverse('my_leads'))
+        self.assertTrue(DataAccessLog.objects.filter(counsellor=self.counsellor, action='list_my_leads').exists())
+
+    @override_settings(DATA_ACCESS_LOG_BUFFER='memory')
+    def test_memory_buffer_metrics_are_published(self):
+        from .access_log import flush, metrics, published_metrics
+
+        flush()
+        self.record()
+        self.assertEqual(metrics()['queue_depth'], 1)
+        self.assertGreaterEqual(metrics()['oldest_event_age_seconds'], 0)
+        self.assertEqual(DataAccessLog.objects.count(), 0)
+
+        self.assertEqual(flush(), 1)
+        self.assertEqual(DataAccessLog.objects.count(), 1)
+        [snapshot] = published_metrics()
+        self.assertEqual(snapshot['backend'], 'memory')
+        self.assertEqual(snapshot['queue_depth'], 0)
+        self.assertGreaterEqual(snapshot['flushed'], 1)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('data_access_log_metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['processes']), 1)
+
+
+@override_settings(REDIS_URL=None)
+class AccessAnomalyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counsellor = make_counsellor('anomaly')
+        cls.counsellor.phone_reveal_alert_threshold = 3
+        cls.counsellor.save()
+        source = LeadSource.objects.create(name='Anomaly test')
+        cls.leads = [
+            Lead.objects.create(
+                lead_id=f'AN{n:04d}', first_name=f'Anomaly{n}', last_name='Lead', email=f'an{n}@example.com',
+                phone=f'93{n:08d}', source=source, assigned_counsellor=cls.counsellor,
+            )
+            for n in range(5)
+        ]
+        cls.admin = CustomUser.objects.create_superuser(email='anomaly-admin@example.com', password='pw')
+
+    def setUp(self):
+        import main_app.access_anomaly as access_anomaly
+
+        cache.clear()
+        patcher = mock.patch.object(access_anomaly, '_warned_local', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def observe(self, lead, at):
+        from .access_anomaly import observe
+
+        with mock.patch('main_app.access_anomaly.time.time', return_value=at):
+            return observe('phone_reveals', self.counsellor, lead.pk)
+
+    def test_counts_distinct_leads_inside_the_window(self):
+        start = 1_000_000 * 3600
+        self.assertEqual(self.observe(self.leads[0], start), 1)
+        self.assertEqual(self.observe(self.leads[0], start + 10), 1)
+        self.assertEqual(self.observe(self.leads[1], start + 20), 2)
+        # Seen again in a later bucket: moves there instead of counting twice.
+        self.assertEqual(self.observe(self.leads[0], start + 1800), 2)
+        # lead 1 ages out of the hour window; lead 0 was seen again half an hour in.
+        self.assertEqual(self.observe(self.leads[2], start + 3600 + 300), 2)
+        self.assertEqual(self.observe(self.leads[3], start + 3 * 3600), 1)
+
+    def test_window_is_seeded_from_buffered_events(self):
+        from .access_log import record_access
+
+        request = RequestFactory().post('/')
+        request.user = self.counsellor.admin
+        with override_settings(DATA_ACCESS_LOG_BUFFER='memory'):
+            for lead in self.leads[:2]:
+                record_access(request, self.counsellor, 'reveal_phone', lead=lead)
+            self.assertEqual(self.observe(self.leads[2], time.time()), 3)
+        self.assertEqual(DataAccessLog.objects.filter(counsellor=self.counsellor).count(), 2)
+
+    def test_threshold_crossing_raises_one_alert(self):
+        from .models import NotificationAdmin, SecurityAlert
+
+        self.client.force_login(self.counsellor.admin)
+        for lead in self.leads[:2] + self.leads[:2]:
+            self.client.post(reverse('reveal_phone', kwargs={'lead_id': lead.pk}))
+        self.assertFalse(SecurityAlert.objects.exists())
+
+        for lead in self.leads[2:]:
+            response = self.client.post(reverse('reveal_phone', kwargs={'lead_id': lead.pk}))
+            self.assertEqual(response.json(), {'phone': lead.phone})
+        alert = SecurityAlert.objects.get()
+        self.assertEqual((alert.kind, alert.counsellor_id), ('phone_reveals', self.counsellor.pk))
+        self.assertEqual((alert.distinct_leads, alert.threshold), (3, 3))
+        self.assertEqual(NotificationAdmin.objects.filter(admin=self.admin).count(), 1)
+
+    def test_alert_is_deduplicated_without_the_cache_marker(self):
+        from .access_anomaly import raise_alert
+        from .models import NotificationAdmin, SecurityAlert
+
+        args = ('lead_views', self.counsellor, 5, 3, 'msg', 'notification')
+        self.assertTrue(raise_alert(*args))
+        self.assertFalse(raise_alert(*args))
+        cache.clear()
+        self.assertFalse(raise_alert(*args))
+        self.assertEqual(SecurityAlert.objects.count(), 1)
+        self.assertEqual(NotificationAdmin.objects.count(), 1)
+
+
+@override_settings(
+    DATA_ACCESS_LOG_RETENTION_DAYS=30,
+    DATA_ACCESS_LOG_PURGE_WITHOUT_ARCHIVE=False,
+    STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+)
+class AccessLogRetentionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counsellor = make_counsellor('retention')
+        now = timezone.now()
+        cls.old_ids = [
+            DataAccessLog.objects.create(
+                user=cls.counsellor.admin, counsellor=cls.counsellor, action='list_my_leads',
+                created_at=now - timedelta(days=40, minutes=n),
+            ).pk
+            for n in range(3)
+        ]
+        cls.recent = DataAccessLog.objects.create(
+            user=cls.counsellor.admin, counsellor=cls.counsellor, action='list_my_leads',
+            created_at=now - timedelta(days=1),
+        )
+
+    def summary_events(self):
+        from .models import DataAccessDailySummary
+
+        return sum(DataAccessDailySummary.objects.values_list('events', flat=True))
+
+    @override_settings(DATA_ACCESS_LOG_ARCHIVE_PREFIX='audit')
+    def test_archives_then_deletes(self):
+        import gzip
+
+        from django.core.files.storage import default_storage
+
+        from .access_log_retention import apply_retention
+
+        days = {
+            timezone.localtime(created).date()
+            for created in DataAccessLog.objects.filter(pk__in=self.old_ids).values_list('created_at', flat=True)
+        }
+        with self.assertLogs('main_app.access_log_retention', 'INFO'):
+            stats = apply_retention(batch_size=2)
+        self.assertEqual((stats['deleted'], stats['kept']), (3, 0))
+        self.assertEqual(list(DataAccessLog.objects.values_list('pk', flat=True)), [self.recent.pk])
+        self.assertEqual(self.summary_events(), 3)
+
+        archived = []
+        for folder in {f'audit/{day:%Y}/{day:%m}' for day in days}:
+            for name in default_storage.listdir(folder)[1]:
+                with default_storage.open(f'{folder}/{name}') as fh:
+                    archived += [json.loads(line)['id'] for line in gzip.decompress(fh.read()).splitlines()]
+        self.assertEqual(sorted(archived), sorted(self.old_ids))
+
+    @override_settings(DATA_ACCESS_LOG_ARCHIVE_PREFIX='audit')
+    def test_failed_archive_keeps_the_batch(self):
+        from .access_log_retention import apply_retention
+
+        with mock.patch('main_app.access_log_retention._archive_batch', side_effect=OSError('storage down')):
+            with self.assertRaises(OSError):
+                apply_retention()
+        self.assertEqual(DataAccessLog.objects.count(), 4)
+
+    @override_settings(DATA_ACCESS_LOG_ARCHIVE_PREFIX='')
+    def test_no_archive_prefix_keeps_rows(self):
+        from .access_log_retention import apply_retention
+
+        with self.assertLogs('main_app.access_log_retention', 'WARNING'):
+            stats = apply_retention()
+        self.assertEqual((stats['deleted'], stats['kept']), (0, 3))
+        self.assertEqual(DataAccessLog.objects.count(), 4)
+        self.assertEqual(self.summary_events(), 3)
+
+    def test_zero_days_is_not_the_default(self):
+        from .access_log_retention import apply_retention
+
+        with self.assertLogs('main_app.access_log_retention', 'INFO'):
+            stats = apply_retention(days=0, archive=False)
+        self.assertEqual(stats['deleted'], 4)
+        self.assertFalse(DataAccessLog.objects.exists())
+
+
+class ImportJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Import job test')
+
+    def create_job(self, rows=3, **fields):
+        lines = ['first_name,last_name,email,phone'] + [
+            f'Imp{n},Job,imp{n}@example.com,95{n:08d}' for n in range(rows)
+        ]
+        job = ImportJob(original_filename='leads.csv', source=self.source, **fields)
+        job.file.save('leads.csv', ContentFile('\n'.join(lines).encode()), save=False)
+        job.save()
+        return job
+
+    def test_claims_pending_job_once(self):
+        from .tasks import run_lead_import_job
+
+        job = self.create_job()
+        with self.assertLogs('main_app.admin_views', 'INFO'):
+            run_lead_import_job(job.pk)
+        run_lead_import_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual(job.rows_inserted, 3)
+        self.assertEqual(Lead.objects.filter(source=self.source).count(), 3)
+
+    def test_running_job_is_not_claimed_again(self):
+        from .tasks import run_lead_import_job
+
+        job = self.create_job()
+        ImportJob.objects.filter(pk=job.pk).update(status='RUNNING')
+        run_lead_import_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'RUNNING')
+        self.assertFalse(Lead.objects.filter(source=self.source).exists())
+
+    def test_upload_is_stored_for_the_worker(self):
+        job = self.create_job()
+        self.assertTrue(ImportFile.objects.filter(name=job.file.name).exists())
+        with job.file.open('rb') as fh:
+            self.assertTrue(fh.read().startswith(b'first_name,'))
+
+    @override_settings(LEAD_IMPORT_ASYNC=True)
+    def test_async_dispatch_queues(self):
+        from .admin_views import _dispatch_import_job
+        from .tasks import run_lead_import_job
+
+        job = self.create_job()
+        with mock.patch.object(run_lead_import_job, 'delay') as delay:
+            _dispatch_import_job(job)
+        delay.assert_called_once_with(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'PENDING')
+
+    @override_settings(LEAD_IMPORT_ASYNC=False)
+    def test_inline_fallback(self):
+        from .admin_views import _dispatch_import_job
+
+        job = self.create_job()
+        with self.assertLogs('main_app.admin_views', 'INFO'):
+            _dispatch_import_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertFalse(ImportFile.objects.filter(name=job.file.name).exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'COPY loader is PostgreSQL only.')
+class LeadCopyLoaderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Copy test')
+        Lead.objects.create(
+            lead_id='CP0000', first_name='Existing', last_name='Copy', email='cp0@example.com',
+            phone='9400000000', source=cls.source,
+        )
+
+    def lead(self, n, **fields):
+        values = dict(
+            lead_id=f'CP{n:04d}', first_name=f'Copy{n}', last_name='Copy', email=f'cp{n}@example.com',
+            phone=f'94{n:08d}', source_id=self.source.pk,
+        )
+        values.update(fields)
+        return Lead(**values)
+
+    def test_existing_lead_id_is_reported_per_row(self):
+        from .lead_import_copy import copy_insert_leads
+
+        inserted, failures = copy_insert_leads([self.lead(1), self.lead(0), self.lead(2)])
+        self.assertEqual([lead.lead_id for lead in inserted], ['CP0001', 'CP0002'])
+        self.assertEqual(failures, [(1, 'Lead ID CP0000 already exists.')])
+        self.assertTrue(all(lead.pk for lead in inserted))
+
+    def test_other_violations_raise(self):
+        from .lead_import_copy import copy_insert_leads
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        with self.assertRaises(IntegrityError):
+            copy_insert_leads([self.lead(3, source_id=self.source.pk + 1000)])
+
+
+class DuplicateImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Duplicate test')
+        cls.existing = Lead.objects.create(
+            lead_id='DUP0000', first_name='Existing', last_name='Lead', email='Dup@Example.com',
+            phone='9876543210', source=cls.source,
+        )
+
+    def run_import(self, rows, **kwargs):
+        from .admin_views import _run_lead_import
+
+        with self.assertLogs('main_app.admin_views', 'INFO'):
+            return _run_lead_import(enumerate(rows, 2), self.source, None, **kwargs)
+
+    def rows(self):
+        return [
+            {'first_name': 'Phone', 'last_name': 'Match', 'phone': '+91 98765-43210', 'School Name': 'Phone School'},
+            {'first_name': 'Email', 'last_name': 'Match', 'email': ' DUP@example.com ', 'phone': '9100000001'},
+            {'first_name': 'New', 'last_name': 'Lead', 'email': 'new@example.com', 'phone': '9100000002'},
+            {'first_name': 'Repeat', 'last_name': 'Row', 'email': 'NEW@example.com', 'phone': '9100000003'},
+        ]
+
+    def imported(self):
+        return Lead.objects.filter(source=self.source).exclude(pk=self.existing.pk)
+
+    def test_default_policy_is_skip(self):
+        from .forms import LeadImportForm
+
+        self.assertEqual(ImportJob().duplicate_policy, 'skip')
+        self.assertEqual(LeadImportForm().fields['duplicate_policy'].initial, 'skip')
+        summary = self.run_import(self.rows())
+        self.assertEqual(summary['duplicates_skipped'], 3)
+        self.assertEqual(summary['success_count'], 1)
+        self.assertEqual(list(self.imported().values_list('first_name', flat=True)), ['New'])
+
+    def test_merge_fills_blank_fields(self):
+        summary = self.run_import(self.rows(), duplicate_policy='merge')
+        self.assertEqual(summary['duplicates_merged'], 3)
+        self.assertEqual(summary['success_count'], 1)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.school_name, 'Phone School')
+        self.assertEqual(self.existing.first_name, 'Existing')
+        new = self.imported().get()
+        self.assertEqual(new.alternate_phone, '')
+
+    def test_flag_inserts_and_links(self):
+        summary = self.run_import(self.rows(), duplicate_policy='flag')
+        self.assertEqual(summary['duplicates_flagged'], 3)
+        self.assertEqual(summary['success_count'], 4)
+        by_name = {lead.first_name: lead for lead in self.imported()}
+        self.assertEqual(by_name['Phone'].duplicate_of_id, self.existing.pk)
+        self.assertEqual(by_name['Email'].duplicate_of_id, self.existing.pk)
+        self.assertIsNone(by_name['New'].duplicate_of_id)
+        self.assertEqual(by_name['Repeat'].duplicate_of_id, by_name['New'].pk)
+
+    def test_allow_skips_the_check(self):
+        summary = self.run_import(self.rows(), duplicate_policy='allow')
+        self.assertEqual(summary['success_count'], 4)
+        self.assertFalse(self.imported().exclude(duplicate_of=None).exists())
+
+
+class ContactKeyTests(SimpleTestCase):
+
+    def test_normalize_phone(self):
+        from .contact_keys import normalize_phone
+
+        cases = {
+            '+91 98765-43210': '919876543210',
+            '098765 43210': '919876543210',
+            '9876543210': '919876543210',
+            9876543210.0: '919876543210',
+            '0044 20 7946 0958': '442079460958',
+            '+44 20 7946 0958': '442079460958',
+            None: '',
+            '': '',
+            'abc': '',
+            float('nan'): '',
+            '12345': '',
+            '+1234567890123456': '',
+        }
+        for value, expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(normalize_phone(value), expected)
+
+    def test_normalize_email(self):
+        from .contact_keys import normalize_email
+
+        self.assertEqual(normalize_email(' A.User@Example.COM '), 'a.user@example.com')
+        self.assertEqual(normalize_email(None), '')
+        self.assertEqual(normalize_email('   '), '')
+
+
+class LeadImportStreamingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Streaming test')
+
+    def csv_rows(self, count):
+        from .lead_import_io import iter_lead_import_rows
+
+        lines = ['\ufeff email , first_name,last_name,phone'] + [
+            f' st{n}@example.com ,Stream{n},Lead,92{n:08d}' for n in range(count)
+        ]
+        raw = io.BytesIO('\n'.join(lines).encode('utf-8'))
+        return raw, iter_lead_import_rows(raw, 'leads.csv')
+
+    def test_csv_is_decoded_incrementally(self):
+        raw, rows = self.csv_rows(20000)
+        self.assertEqual(next(rows), (2, {
+            'email': 'st0@example.com', 'first_name': 'Stream0', 'last_name': 'Lead', 'phone': '9200000000',
+        }))
+        self.assertLess(raw.tell(), len(raw.getvalue()) // 10)
+        self.assertEqual(sum(1 for _ in rows), 19999)
+
+    def test_batches_do_not_materialise_the_iterator(self):
+        import itertools
+
+        from .lead_import_io import iter_row_batches
+
+        batches = iter_row_batches(itertools.count(), 3)
+        self.assertEqual(next(batches), [0, 1, 2])
+        self.assertEqual(next(batches), [3, 4, 5])
+
+    @override_settings(LEAD_IMPORT_BATCH_SIZE=50, LEAD_IMPORT_USE_COPY=False)
+    def test_counts_are_reported_per_batch(self):
+        from .admin_views import _run_lead_import
+
+        _, rows = self.csv_rows(120)
+        progress = []
+        with self.assertLogs('main_app.admin_views', 'INFO'):
+            summary = _run_lead_import(
+                rows, self.source, None, duplicate_policy='allow',
+                on_batch=lambda s: progress.append((s['batches'], s['rows_parsed'], s['success_count'])),
+            )
+        self.assertEqual(progress, [(1, 50, 50), (2, 100, 100), (3, 120, 120)])
+        self.assertEqual(summary['error_count'], 0)
+        self.assertEqual(Lead.objects.filter(source=self.source).count(), 120)
+
+
+class LeadAssignmentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Assignment test')
+        cls.counsellors = [make_counsellor(f'assign{tag}') for tag in 'abc']
+
+    def create_leads(self, count, start=0, counsellor=None, **fields):
+        return Lead.objects.bulk_create([
+            Lead(
+                lead_id=f'AS{n:05d}', first_name=f'Assign{n}', last_name='Lead', email=f'as{n}@example.com',
+                phone=f'91{n:08d}', source=self.source, assigned_counsellor=counsellor, **fields,
+            )
+            for n in range(start, start + count)
+        ])
+
+    def unassigned(self):
+        return Lead.objects.filter(source=self.source, assigned_counsellor__isnull=True).order_by('id')
+
+    def loads(self):
+        return [Lead.objects.filter(assigned_counsellor=c).count() for c in self.counsellors]
+
+    def test_workload_balanced_evens_out_counts(self):
+        from .admin_views import _assign_workload_balanced
+
+        self.create_leads(3, start=0, counsellor=self.counsellors[0])
+        self.create_leads(1, start=3, counsellor=self.counsellors[2])
+        self.create_leads(8, start=10)
+        self.assertEqual(_assign_workload_balanced(self.unassigned(), self.counsellors), 8)
+        self.assertEqual(self.loads(), [4, 4, 4])
+
+    def test_weighted_fair_follows_capacity(self):
+        from .admin_views import _assign_weighted_fair
+
+        for counsellor, capacity in zip(self.counsellors, (10, 30, 0)):
+            counsellor.lead_capacity = capacity
+        self.create_leads(40)
+        self.assertEqual(_assign_weighted_fair(self.unassigned(), self.counsellors), 40)
+        self.assertEqual(self.loads(), [10, 30, 0])
+
+        for counsellor in self.counsellors:
+            counsellor.lead_capacity = 0
+        self.create_leads(5, start=40)
+        self.assertEqual(_assign_weighted_fair(self.unassigned(), self.counsellors), 0)
+
+    def test_performance_based_prefers_conversion(self):
+        from .admin_views import _assign_performance_based
+
+        self.create_leads(1, start=0, counsellor=self.counsellors[1], status='CLOSED_WON')
+        self.create_leads(1, start=1, counsellor=self.counsellors[1])
+        self.create_leads(4, start=2, counsellor=self.counsellors[0], status='CONTACTED')
+        self.create_leads(6, start=10)
+        self.assertEqual(_assign_performance_based(self.unassigned(), self.counsellors), 6)
+        self.assertEqual(self.loads(), [4, 8, 0])
+
+    @override_settings(LEAD_BULK_UPDATE_BATCH_SIZE=50)
+    def test_queries_do_not_grow_with_leads(self):
+        from .admin_views import _assign_workload_balanced
+
+        def run(count, start):
+            self.create_leads(count, start=start)
+            with CaptureQueriesContext(connection) as ctx:
+                _assign_workload_balanced(self.unassigned(), self.counsellors)
+            return [q['sql'] for q in ctx.captured_queries]
+
+        small = run(10, 0)
+        large = run(120, 100)
+        updates = [sql for sql in large if sql.startswith('UPDATE "main_app_lead"')]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(len(large) - len(updates), len(small) - 1)
+
+
+class AffinityMatrixTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Affinity test')
+        cls.it, cls.finance = make_counsellor('affinityit'), make_counsellor('affinityfin')
+        cls.counsellors = [cls.it, cls.finance]
+        for n, (counsellor, industry) in enumerate([(cls.it, 'IT'), (cls.finance, 'Finance')] * 2):
+            cls.create_lead(n, assigned_counsellor=counsellor, industry=industry, status='CLOSED_WON')
+
+    @classmethod
+    def create_lead(cls, n, **fields):
+        return Lead.objects.create(
+            lead_id=f'AF{n:04d}', first_name=f'Affinity{n}', last_name='Lead', email=f'af{n}@example.com',
+            phone=f'90{n:08d}', source=cls.source, **fields,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_leads_go_to_the_specialist(self):
+        from .admin_views import _assign_specialization_based
+
+        leads = [self.create_lead(10 + n, industry=industry) for n, industry in enumerate(['IT', 'Finance', 'IT'])]
+        unassigned = Lead.objects.filter(pk__in=[lead.pk for lead in leads]).order_by('id')
+        self.assertEqual(_assign_specialization_based(unassigned, self.counsellors), 3)
+        assigned = dict(Lead.objects.filter(pk__in=[lead.pk for lead in leads]).values_list('pk', 'assigned_counsellor'))
+        self.assertEqual([assigned[lead.pk] for lead in leads], [self.it.pk, self.finance.pk, self.it.pk])
+
+    def test_matrix_is_cached_until_a_lead_closes(self):
+        from .assignment_affinity import get_affinity_matrix
+
+        ids = [c.pk for c in self.counsellors]
+        matrix = get_affinity_matrix(ids)
+        self.assertEqual(matrix['industry']['IT'], {self.it.pk: [2, 2]})
+        with self.assertNumQueries(0):
+            get_affinity_matrix(ids)
+
+        lead = self.create_lead(20, assigned_counsellor=self.finance, industry='IT')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_affinity_matrix(ids)['industry']['IT'], {self.it.pk: [2, 2]})
+
+        lead = Lead.objects.get(pk=lead.pk)
+        lead.status = 'CLOSED_WON'
+        lead.save()
+        self.assertEqual(get_affinity_matrix(ids)['industry']['IT'], {self.it.pk: [2, 2], self.finance.pk: [1, 1]})
+
+    def test_assignment_run_invalidates(self):
+        from .admin_views import _assign_specialization_based
+        from .assignment_affinity import get_affinity_matrix
+
+        ids = [c.pk for c in self.counsellors]
+        get_affinity_matrix(ids)
+        lead = self.create_lead(30, industry='Finance')
+        _assign_specialization_based(Lead.objects.filter(pk=lead.pk), self.counsellors)
+        self.assertEqual(get_affinity_matrix(ids)['industry']['Finance'][self.finance.pk], [2, 3])
+
+
+class CounsellorSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Snapshot test')
+        cls.admin = CustomUser.objects.create_superuser(email='snapshot-admin@example.com', password='pw')
+        cls.counsellors = [make_counsellor('snapshota'), make_counsellor('snapshotb')]
+        cls.seed(cls.counsellors[0], 0, ['NEW', 'NEW', 'CONTACTED', 'CLOSED_WON'])
+        cls.seed(cls.counsellors[1], 10, ['QUALIFIED'])
+
+    @classmethod
+    def seed(cls, counsellor, start, statuses):
+        now = timezone.now()
+        for n, status in enumerate(statuses, start):
+            lead = Lead.objects.create(
+                lead_id=f'SN{n:04d}', first_name=f'Snap{n}', last_name='Lead', email=f'sn{n}@example.com',
+                phone=f'89{n:08d}', source=cls.source, assigned_counsellor=counsellor, status=status,
+                next_follow_up=now - timedelta(days=2) if n % 2 else None,
+            )
+            LeadActivity.objects.create(
+                lead=lead, counsellor=counsellor, activity_type='CALL', subject='Call', is_completed=n % 2 == 0,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matches_direct_counts(self):
+        from .utils import get_counsellor_activity_snapshots
+
+        snapshots = get_counsellor_activity_snapshots(self.counsellors)
+        for counsellor in self.counsellors:
+            leads = Lead.objects.filter(assigned_counsellor=counsellor)
+            activities = LeadActivity.objects.filter(counsellor=counsellor)
+            snap = snapshots[counsellor.pk]
+            self.assertEqual(snap['new'], leads.filter(status='NEW').count())
+            self.assertEqual(snap['contacted'], leads.filter(status='CONTACTED').count())
+            self.assertEqual(snap['closed_won'], leads.filter(status='CLOSED_WON').count())
+            self.assertEqual(snap['visits_overdue'], leads.filter(next_follow_up__lt=timezone.now()).count())
+            self.assertEqual(snap['pending_activities'], activities.filter(is_completed=False).count())
+            self.assertEqual(snap['total_activities_today'], activities.filter(is_completed=True).count())
+            self.assertEqual(snap['contact_touchpoints_today'], snap['total_activities_today'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_counsellor_activity_snapshots(self.counsellors), snapshots)
+
+    def test_report_queries_do_not_grow_with_counsellors(self):
+        from .utils import get_counsellor_activity_snapshots
+
+        self.client.force_login(self.admin)
+        url = reverse('counsellor_activity_progress_report')
+
+        def queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            return len(ctx.captured_queries)
+
+        queries()
+        before = queries()
+        extra = [make_counsellor(f'snapshot{tag}') for tag in 'cde']
+        self.seed(extra[0], 20, ['NEW', 'CONTACTED'])
+        # Their daily-target assignments are created once, on first sight.
+        get_counsellor_activity_snapshots(extra)
+        self.assertEqual(queries(), before)
+
+
+@override_settings(REDIS_URL=None)
+class SecurityAlertTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counsellor = make_counsellor('alertfanout')
+        cls.counsellor.lead_view_alert_threshold = 2
+        cls.counsellor.save()
+        cls.admins = [
+            CustomUser.objects.create_superuser(email=f'fanout{n}@example.com', password='pw') for n in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('main_app.access_anomaly._warned_local', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fan_out_is_one_bulk_insert(self):
+        from .access_anomaly import raise_alert
+        from .models import NotificationAdmin
+
+        def raise_for(kind):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertTrue(raise_alert(kind, self.counsellor, 9, 5, 'msg', f'{kind} alert'))
+            return len(ctx.captured_queries)
+
+        two_admins = raise_for('lead_views')
+        for n in range(2, 6):
+            CustomUser.objects.create_superuser(email=f'fanout{n}@example.com', password='pw')
+        self.assertEqual(raise_for('phone_reveals'), two_admins)
+        self.assertEqual(NotificationAdmin.objects.filter(message='phone_reveals alert').count(), 6)
+
+        with self.assertNumQueries(0):
+            self.assertFalse(raise_alert('phone_reveals', self.counsellor, 10, 5, 'msg', 'again'))
+
+    def test_lead_detail_raises_lead_views_alert(self):
+        from .models import SecurityAlert
+
+        source = LeadSource.objects.create(name='Alert test')
+        leads = [
+            Lead.objects.create(
+                lead_id=f'AL{n:04d}', first_name=f'Alert{n}', last_name='Lead', email=f'al{n}@example.com',
+                phone=f'88{n:08d}', source=source, assigned_counsellor=self.counsellor,
+            )
+            for n in range(3)
+        ]
+        self.client.force_login(self.counsellor.admin)
+        self.client.get(reverse('lead_detail', kwargs={'lead_id': leads[0].pk}))
+        self.client.get(reverse('lead_detail', kwargs={'lead_id': leads[0].pk}))
+        self.assertFalse(SecurityAlert.objects.exists())
+        for lead in leads[1:]:
+            self.assertEqual(self.client.get(reverse('lead_detail', kwargs={'lead_id': lead.pk})).status_code, 200)
+        alert = SecurityAlert.objects.get()
+        self.assertEqual((alert.kind, alert.distinct_leads, alert.threshold), ('lead_views', 2, 2))
+
+
+def reset_reference_data():
+    """Drop the process snapshot and the shared version so the next lookup reloads."""
+    from . import reference_data
+
+    cache.clear()
+    reference_data._snapshot.update(version=None, tables=None, derived={}, checked_at=0.0)
+
+
+class ReferenceDataTests(TestCase):
+
+    def setUp(self):
+        reset_reference_data()
+        # Names edited inside a test must not outlive its rolled-back transaction.
+        self.addCleanup(reset_reference_data)
+
+    def status_name(self, code):
+        from . import reference_data
+
+        return dict(reference_data.choices('lead_status', active_only=False))[code]
+
+    def test_lookups_are_query_free_once_loaded(self):
+        from .models import ActivityType, LeadStatus, NextAction
+
+        with self.assertNumQueries(3):
+            LeadStatus.get_choices()
+        with self.assertNumQueries(0):
+            LeadStatus.get_choices()
+            ActivityType.get_all_choices()
+            NextAction.get_all_choices()
+
+    def test_edit_is_visible_after_commit(self):
+        from .models import LeadStatus
+
+        self.assertEqual(self.status_name('CONTACTED'), 'Contacted')
+        status = LeadStatus.objects.get(code='CONTACTED')
+        status.name = 'Reached'
+        with self.captureOnCommitCallbacks(execute=True):
+            status.save()
+        self.assertEqual(self.status_name('CONTACTED'), 'Reached')
+
+    @override_settings(REFERENCE_DATA_VERSION_CHECK_SECONDS=0)
+    def test_reloads_when_another_process_bumps_the_version(self):
+        from . import reference_data
+        from .models import LeadStatus
+
+        self.assertEqual(self.status_name('QUALIFIED'), 'Qualified')
+        # A write from another worker: the row changes and the shared version moves on,
+        # but this process's receivers never run.
+        LeadStatus.objects.filter(code='QUALIFIED').update(name='Hot')
+        self.assertEqual(self.status_name('QUALIFIED'), 'Qualified')
+        cache.set(reference_data.VERSION_KEY, 'other-process', None)
+        self.assertEqual(self.status_name('QUALIFIED'), 'Hot')
+
+
+class LeadTagTests(TestCase):
+
+    TIMELINE = Template(
+        '{% load lead_tags %}{% for code in codes %}{% activity_type_badge code %}'
+        '{% next_action_name "CALLBACK" %}{% endfor %}'
+    )
+
+    def setUp(self):
+        reset_reference_data()
+        self.addCleanup(reset_reference_data)
+
+    def render(self, codes):
+        return self.TIMELINE.render(Context({'codes': codes}))
+
+    def test_timeline_renders_without_queries(self):
+        self.render(['CALL'])
+        with self.assertNumQueries(0):
+            html = self.render(['CALL', 'EMAIL'] * 100)
+        self.assertEqual(html.count('<i class="fas fa-phone mr-1"></i>Phone Call</span>'), 100)
+        self.assertEqual(html.count('Callback'), 200)
+
+    def test_badge_follows_an_edit(self):
+        from .models import ActivityType
+
+        self.assertIn('badge-info', self.render(['CALL']))
+        activity_type = ActivityType.objects.get(code='CALL')
+        activity_type.color = 'danger'
+        with self.captureOnCommitCallbacks(execute=True):
+            activity_type.save()
+        self.assertIn('badge-danger', self.render(['CALL']))
+
+    def test_unknown_code_is_escaped(self):
+        self.assertIn('<span class="badge badge-info">&lt;b&gt;</span>', self.render(['<b>']))
+
+
+class ContextProcessorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counsellor = make_counsellor('context')
+        cls.admin = CustomUser.objects.create_superuser(email='context-admin@example.com', password='pw')
+
+    def setUp(self):
+        cache.clear()
+
+    def request(self, user):
+        request = RequestFactory().get('/')
+        request.user = CustomUser.objects.get(pk=user.pk)
+        return request
+
+    def render(self, source, request):
+        from django.template import RequestContext
+
+        return Template(source).render(RequestContext(request, {}))
+
+    def test_unused_values_cost_nothing(self):
+        for user in (self.counsellor.admin, self.admin):
+            request = self.request(user)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.render('{{ page_title|default:"Home" }}', request), 'Home')
+
+    def test_permission_flags_share_one_profile_lookup(self):
+        request = self.request(self.admin)
+        with self.assertNumQueries(1):
+            html = self.render(
+                '{{ perm_delete }} {{ perm_performance }} {{ perm_counsellor_work }} '
+                '{{ perm_settings }} {{ is_superadmin }}',
+                request,
+            )
+        self.assertEqual(html, 'True True True True True')
+
+    def test_badge_counts_are_cached_per_user(self):
+        source = '{{ notification_count }}/{{ pending_task_count }}'
+        first, second = self.request(self.counsellor.admin), self.request(self.counsellor.admin)
+        # Profile, unread notifications, incomplete activities, upcoming visits.
+        with self.assertNumQueries(4):
+            self.assertEqual(self.render(source, first), '0/0')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.render(source, second), '0/0')
+
+
+class LeadSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Search test')
+        cls.lead = Lead.objects.create(
+            lead_id='SR0001', first_name='Anita', last_name='Desai', email='anita@example.com',
+            phone='98765 43210', source=cls.source,
+        )
+        Lead.objects.create(
+            lead_id='SR0002', first_name='Ravi', last_name='Kumar', email='ravi@example.org',
+            phone='9123456789', source=cls.source,
+        )
+
+    def found(self, term, fts=None):
+        from . import lead_search
+
+        queryset = Lead.objects.filter(source=self.source)
+        if fts is None:
+            return set(lead_search.search_leads(queryset, term).values_list('lead_id', flat=True))
+        with mock.patch.object(lead_search, 'fts_available', return_value=fts):
+            return set(lead_search.search_leads(queryset, term).values_list('lead_id', flat=True))
+
+    def test_phone_terms_match_any_format(self):
+        for term in ('+91 98765-43210', '98765 43210', '9876543210', '(987) 654', '919876543210'):
+            with self.subTest(term=term):
+                self.assertEqual(self.found(term), {'SR0001'})
+
+    def test_save_refreshes_search_text(self):
+        lead = Lead.objects.get(pk=self.lead.pk)
+        lead.email = 'anita.desai@school.in'
+        lead.save()
+        self.assertEqual(self.found('school.in'), {'SR0001'})
+        self.assertEqual(self.found('anita@example'), set())
+
+        lead.phone = '9000011111'
+        lead.save(update_fields=['phone'])
+        self.assertEqual(self.found('90000 11111'), {'SR0001'})
+        self.assertEqual(self.found('98765'), set())
+
+    def test_bulk_update_and_import_refresh_search_text(self):
+        from .admin_views import _bulk_update_leads
+        from .lead_import_columns import build_import_batch
+
+        lead = Lead.objects.get(pk=self.lead.pk)
+        lead.last_name = 'Sharma'
+        _bulk_update_leads([lead], ['last_name'])
+        self.assertEqual(self.found('anita sharma'), {'SR0001'})
+
+        built, _, errors = build_import_batch(
+            [(2, {'first_name': 'Imported', 'last_name': 'Lead', 'phone': '+91 91111 22222'})], self.source, None,
+        )
+        self.assertEqual(errors, [])
+        Lead.objects.bulk_create(built)
+        self.assertEqual(len(self.found('91111-22222')), 1)
+
+    @skipUnless(connection.vendor == 'sqlite', 'The FTS5 index is SQLite only.')
+    def test_fts_matches_the_fallback(self):
+        from . import lead_search
+
+        self.assertTrue(lead_search.fts_available())
+        for term in ('anita', 'desai', 'EXAMPLE', 'sr000', '9123456789', 'nomatch'):
+            with self.subTest(term=term):
+                self.assertEqual(self.found(term, fts=True), self.found(term, fts=False))
+
+
+class PendingTasksTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Pending test')
+        cls.counsellor = make_counsellor('pending')
+        cls.other = make_counsellor('pendingother')
+        cls.leads = [
+            Lead.objects.create(
+                lead_id=f'PT{n:04d}', first_name=f'Pending{n}', last_name='Lead', email=f'pt{n}@example.com',
+                phone=f'87{n:08d}', source=cls.source, assigned_counsellor=cls.counsellor,
+            )
+            for n in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.counsellor.admin)
+        self.start = timezone.now() - timedelta(days=10)
+        self.count = 0
+
+    def activity(self, lead, activity_type, next_action='', counsellor=None, **fields):
+        self.count += 1
+        activity = LeadActivity.objects.create(
+            lead=lead, counsellor=counsellor or self.counsellor, activity_type=activity_type,
+            subject=f'{activity_type} {self.count}', next_action=next_action, **fields,
+        )
+        LeadActivity.objects.filter(pk=activity.pk).update(completed_date=self.start + timedelta(hours=self.count))
+        return activity
+
+    def old_pending(self):
+        """The per-activity loop pending_tasks used before the NOT EXISTS query."""
+        pending = []
+        for act in LeadActivity.objects.filter(
+            counsellor=self.counsellor, is_completed=True,
+        ).exclude(next_action='').order_by('-completed_date', '-id'):
+            if not LeadActivity.objects.filter(
+                lead=act.lead, counsellor=self.counsellor, activity_type=act.next_action,
+                completed_date__gt=act.completed_date,
+            ).exists():
+                pending.append(act.pk)
+        return pending
+
+    def page(self):
+        response = self.client.get(reverse('pending_tasks'))
+        self.assertEqual(response.status_code, 200)
+        return [act.pk for act in response.context['pending_next_actions']]
+
+    def test_matches_the_old_loop(self):
+        first, second, third = self.leads
+        self.activity(first, 'CALL', next_action='MEETING')
+        self.activity(first, 'MEETING')
+        self.activity(second, 'CALL', next_action='MEETING')
+        self.activity(second, 'EMAIL')
+        self.activity(second, 'MEETING', counsellor=self.other)
+        self.activity(third, 'MEETING')
+        self.activity(third, 'CALL', next_action='MEETING')
+        self.activity(third, 'CALL', next_action='FOLLOW_UP', is_completed=False)
+        self.activity(first, 'EMAIL', next_action='CALL')
+
+        expected = self.old_pending()
+        self.assertEqual(len(expected), 3)
+        self.assertEqual(self.page(), expected)
+
+    def test_queries_do_not_grow_with_activities(self):
+        def queries():
+            # Warm the badge, count and reference-data caches, then measure the page itself.
+            self.page()
+            with CaptureQueriesContext(connection) as ctx:
+                self.page()
+            return len(ctx.captured_queries)
+
+        for lead in self.leads:
+            self.activity(lead, 'CALL', next_action='MEETING')
+        few = queries()
+        for _ in range(10):
+            for lead in self.leads:
+                self.activity(lead, 'CALL', next_action='MEETING')
+                self.activity(lead, 'MEETING')
+        self.assertEqual(queries(), few)
+
+
+class CalendarFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Calendar test')
+        cls.counsellor = make_counsellor('calendar')
+        cls.admin = CustomUser.objects.create_superuser(email='calendar-admin@example.com', password='pw')
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now().replace(microsecond=0)
+        self.lead = Lead.objects.create(
+            lead_id='CF0001', first_name='Cal', last_name='Lead', email='cf1@example.com', phone='8600000001',
+            source=self.source, assigned_counsellor=self.counsellor, next_follow_up=self.now + timedelta(days=1),
+        )
+        self.activity = LeadActivity.objects.create(
+            lead=self.lead, counsellor=self.counsellor, activity_type='CALL', subject='Intro call',
+            is_completed=False, scheduled_date=self.now + timedelta(hours=2),
+        )
+
+    def events(self, scope=None, days=14):
+        from . import calendar_feed
+
+        start = self.now - timedelta(days=1)
+        return {
+            event['id'] for event in
+            calendar_feed.events(scope or self.counsellor.pk, start, start + timedelta(days=days))
+        }
+
+    def test_range_is_required(self):
+        for user, name in ((self.counsellor.admin, 'get_calendar_events'), (self.admin, 'get_admin_calendar_events')):
+            self.client.force_login(user)
+            url = reverse(name)
+            for params in ({}, {'start': '2026-01-01'}, {'start': 'soon', 'end': '2026-01-02'},
+                           {'start': '2026-01-05', 'end': '2026-01-01'}):
+                with self.subTest(url=url, params=params), self.assertLogs('django.request', 'WARNING'):
+                    self.assertEqual(self.client.get(url, params).status_code, 400)
+            response = self.client.get(url, {'start': '2026-01-01T00:00:00+05:30', 'end': '2026-01-08'})
+            self.assertEqual(response.status_code, 200)
+
+    @override_settings(CALENDAR_MAX_RANGE_DAYS=7)
+    def test_long_ranges_are_clamped(self):
+        from .calendar_feed import parse_range
+
+        request = RequestFactory().get('/', {'start': '2026-01-01T00:00:00Z', 'end': '2026-12-31T00:00:00Z'})
+        start, end = parse_range(request)
+        self.assertEqual(end - start, timedelta(days=7))
+
+    def test_blocks_are_cached(self):
+        from .calendar_feed import ALL
+
+        expected = {f'activity_{self.activity.pk}', f'followup_{self.lead.pk}'}
+        self.assertEqual(self.events(), expected)
+        self.assertEqual(self.events(ALL), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.events(), expected)
+            self.assertEqual(self.events(ALL), expected)
+
+    def test_moved_activity_invalidates_both_weeks(self):
+        self.assertIn(f'activity_{self.activity.pk}', self.events())
+        activity = LeadActivity.objects.get(pk=self.activity.pk)
+        activity.scheduled_date = self.now + timedelta(days=10)
+        activity.save()
+        self.assertIn(f'activity_{self.activity.pk}', self.events(days=14))
+        self.assertNotIn(f'activity_{self.activity.pk}', self.events(days=3))
+
+    def test_lead_delete_invalidates(self):
+        from .calendar_feed import ALL
+
+        self.assertEqual(len(self.events(ALL)), 2)
+        Lead.objects.get(pk=self.lead.pk).delete()
+        self.assertEqual(self.events(), set())
+        self.assertEqual(self.events(ALL), set())
+
+    def test_bulk_lead_delete_invalidates(self):
+        from .admin_views import _delete_leads
+        from .calendar_feed import ALL
+
+        self.assertEqual(len(self.events()), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(_delete_leads(Lead.objects.filter(pk=self.lead.pk)), 1)
+        self.assertEqual(self.events(), set())
+        self.assertEqual(self.events(ALL), set())
+
+
+@override_settings(REMINDER_DISPATCH_INLINE=False)
+class ReminderTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = LeadSource.objects.create(name='Reminder test')
+        cls.counsellors = [make_counsellor('remindera'), make_counsellor('reminderb')]
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.leads = []
+        for n, counsellor in enumerate(self.counsellors):
+            lead = Lead.objects.create(
+                lead_id=f'RM{n:04d}', first_name=f'Remind{n}', last_name='Lead', email=f'rm{n}@example.com',
+                phone=f'85{n:08d}', source=self.source, assigned_counsellor=counsellor,
+                next_follow_up=self.now + timedelta(seconds=30),
+            )
+            LeadActivity.objects.create(
+                lead=lead, counsellor=counsellor, activity_type='CALL', subject='Due call',
+                is_completed=False, scheduled_date=self.now - timedelta(seconds=30),
+            )
+            LeadActivity.objects.create(
+                lead=lead, counsellor=counsellor, activity_type='CALL', subject='Later call',
+                is_completed=False, scheduled_date=self.now + timedelta(hours=2),
+            )
+            self.leads.append(lead)
+
+    def test_dispatch_files_every_counsellor_once(self):
+        from .models import Reminder
+        from .reminders import dispatch
+
+        self.assertEqual(dispatch(self.now), 4)
+        self.assertEqual(dispatch(self.now), 4)
+        self.assertEqual(Reminder.objects.count(), 4)
+        for counsellor in self.counsellors:
+            self.assertEqual(
+                sorted(Reminder.objects.filter(counsellor=counsellor).values_list('kind', flat=True)),
+                ['activity', 'followup'],
+            )
+
+    def test_one_shot_response_under_wsgi(self):
+        from .reminders import dispatch
+
+        dispatch(self.now)
+        self.client.force_login(self.counsellors[0].admin)
+        url = reverse('counsellor_reminder_stream')
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertFalse(response.streaming)
+        retry, event = response.content.decode().split('\n\n', 1)
+        self.assertEqual(retry, 'retry: 30000')
+        self.assertTrue(event.startswith('event: reminders\ndata: '))
+        body = json.loads(event.split('data: ', 1)[1])
+        self.assertEqual(body['count'], 2)
+        self.assertEqual({n['type'] for n in body['notifications']}, {'activity', 'followup'})
+        self.assertEqual(self.client.get(url).content.decode(), 'retry: 30000\n\n')
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    @override_settings(REMINDER_STREAM_SECONDS=0)
+    async def test_event_stream_under_asgi(self):
+        from asgiref.sync import sync_to_async
+
+        from .reminders import dispatch
+
+        await sync_to_async(dispatch)(self.now)
+        await sync_to_async(self.async_client.force_login)(self.counsellors[1].admin)
+        response = await self.async_client.get(reverse('counsellor_reminder_stream'))
+        self.assertTrue(response.streaming)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(chunks[0], b'retry: 1000\n\n')
+        self.assertEqual(len(chunks), 2)
+        body = json.loads(chunks[1].decode().split('data: ', 1)[1])
+        self.assertEqual([n['lead_id'] for n in body['notifications']], [self.leads[1].pk] * 2)
+
+    def test_polling_delivers_once_and_drops_late_reminders(self):
+        from .reminders import claim, dispatch
+
+        dispatch(self.now)
+        self.client.force_login(self.counsellors[0].admin)
+        url = reverse('check_current_time_notifications')
+        self.assertEqual(self.client.get(url).json()['count'], 2)
+        response = self.client.get(url)
+        self.assertEqual(response.json()['count'], 0)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+        self.assertEqual(claim(self.counsellors[1].pk, now=self.now + timedelta(hours=1)), [])
@@ -37,6 +37,7 @@ urlpatterns = [
     path("admin/counsellor-activity-progress/", admin_views.counsellor_activity_progress_report, name='counsellor_activity_progress_report'),
     path("admin/profile/", admin_views.admin_view_profile, name='admin_view_profile'),
     path("admin/notifications/", admin_views.admin_view_notifications, name='admin_view_notifications'),
+    path("admin/data-access-log/metrics/", admin_views.data_access_log_metrics, name='data_access_log_metrics'),
     
     # Counsellor Management
     path("counsellor/add/", admin_views.add_counsellor, name='add_counsellor'),
@@ -63,6 +64,9 @@ urlpatterns = [
     path("leads/delete/all/", admin_views.delete_all_leads, name='delete_all_leads'),
     path("leads/import/", admin_views.import_leads, name='import_leads'),
     path("leads/import/template/<str:file_type>/", admin_views.download_import_template, name='download_import_template'),
+    path("leads/import/jobs/<int:job_id>/", admin_views.import_job_detail, name='import_job_detail'),
+    path("leads/import/jobs/<int:job_id>/progress/", admin_views.import_job_progress, name='import_job_progress'),
+    path("leads/import/jobs/<int:job_id>/errors/", admin_views.download_import_error_report, name='download_import_error_report'),
     path("leads/assign/", admin_views.assign_leads_to_counsellors, name='assign_leads_to_counsellors'),
     path("leads/transfer/<int:lead_id>/", admin_views.transfer_lead, name='transfer_lead'),
     
@@ -147,6 +151,7 @@ urlpatterns = [
     path('counsellor/calendar/', counsellor_views.counsellor_calendar, name='counsellor_calendar'),
     path('counsellor/calendar/events/', counsellor_views.get_calendar_events, name='get_calendar_events'),
     path('counsellor/notifications/check/', counsellor_views.check_current_time_notifications, name='check_current_time_notifications'),
+    path('counsellor/notifications/stream/', counsellor_views.counsellor_reminder_stream, name='counsellor_reminder_stream'),
     
     # Counsellor Analytics
     path('counsellor/analytics/', counsellor_views.get_my_analytics, name='get_my_analytics'),
@@ -43,10 +43,9 @@ def admin_perm_required(perm_name):
     def decorator(view_func):
         @wraps(view_func)
         def _wrapped(request, *args, **kwargs):
-            from .models import Admin as AdminModel
-            try:
-                admin_obj = AdminModel.objects.get(admin=request.user)
-            except AdminModel.DoesNotExist:
+            from .profiles import get_admin_profile
+            admin_obj = get_admin_profile(request)
+            if admin_obj is None:
                 return HttpResponseForbidden("Access denied")
             checker = getattr(admin_obj, f'has_perm_{perm_name}', None)
             if checker and not checker():
@@ -60,51 +59,51 @@ def admin_perm_required(perm_name):
     return decorator
 
 
-def get_counsellor_daily_target_progress(counsellor):
-    """
-    Today's daily target assignment and completed count (same rules as Today's Target page).
-    Completed = distinct completed activities where (completed_date is today OR scheduled_date <= today).
-    """
-    from django.db.models import Q, Count
-    from django.utils import timezone
-    from .models import DailyTarget, DailyTargetAssignment, LeadActivity
+# Task count of a day's DailyTarget when no admin has set one.
+DEFAULT_DAILY_TARGET = 100
 
-    today = timezone.localdate()
 
-    assignment = (
-        DailyTargetAssignment.objects
-        .filter(counsellor=counsellor, target__target_date=today)
-        .select_related('target')
-        .first()
-    )
-    if not assignment:
+def _daily_target_assignments(counsellors, today):
+    """
+    {counsellor_pk: DailyTargetAssignment} for today, creating missing assignments
+    against today's DailyTarget (default DEFAULT_DAILY_TARGET) in one bulk insert.
+    """
+    from .models import DailyTarget, DailyTargetAssignment
+
+    ids = [c.pk for c in counsellors]
+    assignments = {}
+
+    def load(pks):
+        for a in (
+            DailyTargetAssignment.objects
+            .filter(counsellor_id__in=pks, target__target_date=today)
+            .select_related('target')
+            .order_by('pk')
+        ):
+            assignments.setdefault(a.counsellor_id, a)
+
+    load(ids)
+    missing = [pk for pk in ids if pk not in assignments]
+    if missing:
         target, _ = DailyTarget.objects.get_or_create(
             target_date=today,
-            defaults={'target_count': 100},
+            defaults={'target_count': DEFAULT_DAILY_TARGET},
         )
-        assignment, _ = DailyTargetAssignment.objects.get_or_create(
-            target=target, counsellor=counsellor,
+        DailyTargetAssignment.objects.bulk_create(
+            [DailyTargetAssignment(target=target, counsellor_id=pk) for pk in missing],
+            ignore_conflicts=True,
         )
+        load(missing)
+    return assignments
 
-    target_count = assignment.target.target_count
-
-    completed_qs = LeadActivity.objects.filter(
-        Q(completed_date__date=today) | Q(scheduled_date__date__lte=today),
-        counsellor=counsellor,
-        is_completed=True,
-    ).distinct()
-
-    completed_toward_target = completed_qs.count()
-
-    toward_target_by_type = dict(
-        completed_qs.values('activity_type').annotate(n=Count('id')).values_list('activity_type', 'n')
-    )
 
+def _target_progress(assignment, toward_target_by_type):
+    target_count = assignment.target.target_count
+    completed_toward_target = sum(toward_target_by_type.values())
     remaining = max(0, target_count - completed_toward_target)
     pct = 0
     if target_count > 0:
         pct = min(100, int(round(100 * completed_toward_target / target_count)))
-
     return {
         'assignment': assignment,
         'daily_target': target_count,
@@ -115,120 +114,195 @@ def get_counsellor_daily_target_progress(counsellor):
     }
 
 
+def local_day_bounds():
+    """(today, start, end): today's local date and its [start, end) as aware datetimes."""
+    from datetime import timedelta
+    from django.utils import timezone
+
+    now_local = timezone.localtime(timezone.now())
+    start = now_local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return now_local.date(), start, start + timedelta(days=1)
+
+
+def _toward_target_q(today_start, today_end):
+    """
+    Activities that count toward today's target: completed today or scheduled up to
+    today. Plain ranges rather than __date casts, so the (counsellor, ...) indexes apply.
+    """
+    from django.db.models import Q
+
+    return Q(completed_date__gte=today_start, completed_date__lt=today_end) | Q(scheduled_date__lt=today_end)
+
+
+def get_counsellor_daily_target_progress(counsellor):
+    """
+    Today's daily target assignment and completed count (same rules as Today's Target page).
+    Completed = distinct completed activities where (completed_date is today OR scheduled_date <= today).
+    """
+    from django.db.models import Count
+    from .models import LeadActivity
+
+    today, today_start, today_end = local_day_bounds()
+    assignment = _daily_target_assignments([counsellor], today)[counsellor.pk]
+
+    completed_qs = LeadActivity.objects.filter(
+        _toward_target_q(today_start, today_end),
+        counsellor=counsellor,
+        is_completed=True,
+    ).order_by()
+
+    toward_target_by_type = dict(
+        completed_qs.values('activity_type').annotate(n=Count('id')).values_list('activity_type', 'n')
+    )
+    return _target_progress(assignment, toward_target_by_type)
+
+
 def get_counsellor_activity_snapshot(counsellor):
     """
     Numeric snapshot for dashboards: pipeline by status, visits, and monthly activity counts.
     "Today" work-on-target metrics use the same rules as the daily target (see get_counsellor_daily_target_progress).
     """
+    return get_counsellor_activity_snapshots([counsellor])[counsellor.pk]
+
+
+def _snapshot_cache_key(pk):
+    return f'crm:counsellor_activity_snapshot:{pk}'
+
+
+def get_counsellor_activity_snapshots(counsellors):
+    """
+    {counsellor_pk: snapshot} for many counsellors at once.
+    Cached snapshots come back in one get_many; the misses are computed together with
+    conditional aggregation grouped by counsellor (one lead query, one activity query
+    and the daily-target lookup), so the cost does not grow with the number of counsellors.
+    """
+    counsellors = list(counsellors)
     ttl = int(getattr(settings, 'COUNSELLOR_SNAPSHOT_CACHE_SECONDS', 45))
-    cache_key = f'crm:counsellor_activity_snapshot:{counsellor.pk}'
+    out = {}
+    if ttl > 0 and counsellors:
+        hits = cache.get_many([_snapshot_cache_key(c.pk) for c in counsellors])
+        for c in counsellors:
+            hit = hits.get(_snapshot_cache_key(c.pk))
+            if hit is not None:
+                out[c.pk] = hit
+    missing = [c for c in counsellors if c.pk not in out]
+    if not missing:
+        return out
+
+    computed = _compute_activity_snapshots(missing)
+    out.update(computed)
     if ttl > 0:
-        hit = cache.get(cache_key)
-        if hit is not None:
-            return hit
+        cache.set_many({_snapshot_cache_key(pk): snap for pk, snap in computed.items()}, ttl)
+    return out
 
-    from datetime import timedelta
-    from django.db.models import Count
+
+def _compute_activity_snapshots(counsellors):
+    from django.db.models import Count, Q
     from django.utils import timezone
     from .models import Lead, LeadActivity
 
-    now_local = timezone.localtime(timezone.now())
-    today_start = now_local.replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = today_start + timedelta(days=1)
-    month_start = now_local.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-    target_progress = get_counsellor_daily_target_progress(counsellor)
-    tt = target_progress['toward_target_by_type']
-
-    my_leads = Lead.objects.filter(assigned_counsellor=counsellor)
-    status_counts = dict(
-        my_leads.values('status').annotate(c=Count('id')).values_list('status', 'c')
+    now = timezone.now()
+    today, today_start, today_end = local_day_bounds()
+    month_start = today_start.replace(day=1)
+    ids = [c.pk for c in counsellors]
+
+    assignments = _daily_target_assignments(counsellors, today)
+
+    # One row per (counsellor, status): the status histogram plus every lead metric.
+    lead_rows = (
+        Lead.objects.filter(assigned_counsellor_id__in=ids)
+        .order_by()
+        .values('assigned_counsellor', 'status')
+        .annotate(
+            n=Count('id'),
+            visits_scheduled=Count('id', filter=Q(next_follow_up__isnull=False)),
+            visits_today=Count(
+                'id', filter=Q(next_follow_up__gte=today_start, next_follow_up__lt=today_end)
+            ),
+            visits_overdue=Count('id', filter=Q(next_follow_up__lt=now)),
+            leads_assigned_this_month=Count('id', filter=Q(created_at__gte=month_start)),
+            new_leads_today=Count(
+                'id', filter=Q(created_at__gte=today_start, created_at__lt=today_end)
+            ),
+            leads_worked_today=Count(
+                'id', filter=Q(last_contact_date__gte=today_start, last_contact_date__lt=today_end)
+            ),
+        )
+    )
+    # One row per (counsellor, activity type): monthly, pending and toward-target counts.
+    activity_rows = (
+        LeadActivity.objects.filter(counsellor_id__in=ids)
+        .order_by()
+        .values('counsellor', 'activity_type')
+        .annotate(
+            completed_month=Count(
+                'id', filter=Q(is_completed=True, completed_date__gte=month_start)
+            ),
+            pending=Count('id', filter=Q(is_completed=False)),
+            toward_target=Count(
+                'id',
+                filter=Q(is_completed=True) & _toward_target_q(today_start, today_end),
+            ),
+        )
     )
 
-    visits_scheduled = my_leads.filter(next_follow_up__isnull=False).count()
-    visits_today = my_leads.filter(
-        next_follow_up__gte=today_start,
-        next_follow_up__lt=today_end,
-    ).count()
-    visits_overdue = my_leads.filter(
-        next_follow_up__isnull=False,
-        next_follow_up__lt=now_local,
-    ).count()
-
-    activities_completed_month = LeadActivity.objects.filter(
-        counsellor=counsellor,
-        is_completed=True,
-        completed_date__gte=month_start,
-    ).count()
-
-    leads_assigned_this_month = my_leads.filter(created_at__gte=month_start).count()
-
-    visit_activities_month = LeadActivity.objects.filter(
-        counsellor=counsellor,
-        is_completed=True,
-        activity_type='FOLLOW_UP',
-        completed_date__gte=month_start,
-    ).count()
-
-    pending_activities = LeadActivity.objects.filter(
-        counsellor=counsellor, is_completed=False
-    ).count()
-
-    # ── Toward daily target (same queryset as Today's Target page) ──
-    new_leads_today = my_leads.filter(
-        created_at__gte=today_start,
-        created_at__lt=today_end,
-    ).count()
-
-    contact_touchpoints_today = sum(tt.get(t, 0) for t in ('CALL', 'EMAIL', 'MEETING'))
-
-    follow_up_activities_today = tt.get('FOLLOW_UP', 0)
-
-    note_activities_today = tt.get('NOTE', 0)
-    transfer_activities_today = tt.get('TRANSFER', 0)
-
-    total_activities_today = target_progress['completed_toward_target']
-
-    leads_worked_today = my_leads.filter(
-        last_contact_date__gte=today_start,
-        last_contact_date__lt=today_end,
-    ).count()
-
-    contacted_updates_today = my_leads.filter(
-        status='CONTACTED',
-        last_contact_date__gte=today_start,
-        last_contact_date__lt=today_end,
-    ).count()
-
-    out = {
-        'new': status_counts.get('NEW', 0),
-        'contacted': status_counts.get('CONTACTED', 0),
-        'qualified': status_counts.get('QUALIFIED', 0),
-        'closed_won': status_counts.get('CLOSED_WON', 0),
-        'closed_lost': status_counts.get('CLOSED_LOST', 0),
-        'visits_scheduled': visits_scheduled,
-        'visits_today': visits_today,
-        'visits_overdue': visits_overdue,
-        'activities_completed_month': activities_completed_month,
-        'leads_assigned_this_month': leads_assigned_this_month,
-        'visit_activities_month': visit_activities_month,
-        'pending_activities': pending_activities,
-        'status_counts': status_counts,
-        # Today
-        'new_leads_today': new_leads_today,
-        'contact_touchpoints_today': contact_touchpoints_today,
-        'follow_up_activities_today': follow_up_activities_today,
-        'note_activities_today': note_activities_today,
-        'transfer_activities_today': transfer_activities_today,
-        'total_activities_today': total_activities_today,
-        'leads_worked_today': leads_worked_today,
-        'contacted_updates_today': contacted_updates_today,
-        'activities_today_by_type': tt,
-        'daily_target': target_progress['daily_target'],
-        'completed_toward_target': target_progress['completed_toward_target'],
-        'target_remaining': target_progress['target_remaining'],
-        'target_progress_pct': target_progress['target_progress_pct'],
-    }
-    if ttl > 0:
-        cache.set(cache_key, out, ttl)
+    lead_sums = ('visits_scheduled', 'visits_today', 'visits_overdue',
+                 'leads_assigned_this_month', 'new_leads_today', 'leads_worked_today')
+    leads = {pk: {'status_counts': {}, 'contacted_updates_today': 0, **dict.fromkeys(lead_sums, 0)}
+             for pk in ids}
+    for row in lead_rows:
+        agg = leads[row['assigned_counsellor']]
+        agg['status_counts'][row['status']] = row['n']
+        for name in lead_sums:
+            agg[name] += row[name]
+        if row['status'] == 'CONTACTED':
+            agg['contacted_updates_today'] = row['leads_worked_today']
+
+    activities = {pk: {'completed_month': 0, 'visit_month': 0, 'pending': 0, 'by_type': {}}
+                  for pk in ids}
+    for row in activity_rows:
+        agg = activities[row['counsellor']]
+        agg['completed_month'] += row['completed_month']
+        agg['pending'] += row['pending']
+        if row['activity_type'] == 'FOLLOW_UP':
+            agg['visit_month'] += row['completed_month']
+        if row['toward_target']:
+            agg['by_type'][row['activity_type']] = row['toward_target']
+
+    out = {}
+    for pk in ids:
+        lead = leads[pk]
+        act = activities[pk]
+        status_counts = lead['status_counts']
+        target_progress = _target_progress(assignments[pk], act['by_type'])
+        tt = target_progress['toward_target_by_type']
+        out[pk] = {
+            'new': status_counts.get('NEW', 0),
+            'contacted': status_counts.get('CONTACTED', 0),
+            'qualified': status_counts.get('QUALIFIED', 0),
+            'closed_won': status_counts.get('CLOSED_WON', 0),
+            'closed_lost': status_counts.get('CLOSED_LOST', 0),
+            'visits_scheduled': lead['visits_scheduled'],
+            'visits_today': lead['visits_today'],
+            'visits_overdue': lead['visits_overdue'],
+            'activities_completed_month': act['completed_month'],
+            'leads_assigned_this_month': lead['leads_assigned_this_month'],
+            'visit_activities_month': act['visit_month'],
+            'pending_activities': act['pending'],
+            'status_counts': status_counts,
+            # Today
+            'new_leads_today': lead['new_leads_today'],
+            'contact_touchpoints_today': sum(tt.get(t, 0) for t in ('CALL', 'EMAIL', 'MEETING')),
+            'follow_up_activities_today': tt.get('FOLLOW_UP', 0),
+            'note_activities_today': tt.get('NOTE', 0),
+            'transfer_activities_today': tt.get('TRANSFER', 0),
+            'total_activities_today': target_progress['completed_toward_target'],
+            'leads_worked_today': lead['leads_worked_today'],
+            'contacted_updates_today': lead['contacted_updates_today'],
+            'activities_today_by_type': tt,
+            'daily_target': target_progress['daily_target'],
+            'completed_toward_target': target_progress['completed_toward_target'],
+            'target_remaining': target_progress['target_remaining'],
+            'target_progress_pct': target_progress['target_progress_pct'],
+        }
     return out
@@ -11,7 +11,9 @@ from django.shortcuts import get_object_or_404, redirect, render, reverse
 from django.views.decorators.http import require_POST
 
 from .EmailBackend import EmailBackend
-from .models import Counsellor, Lead, NotificationAdmin, NotificationCounsellor
+from .badge_counts import invalidate_admin_notifications, invalidate_counsellor_notifications
+from .models import Lead, NotificationAdmin, NotificationCounsellor
+from .profiles import counsellor_or_404
 
 def login_page(request):
     if request.user.is_authenticated:
@@ -90,9 +92,10 @@ messaging.setBackgroundMessageHandler(function (payload) {{
 
 @login_required(login_url='login_page')
 def counsellor_view_notification(request):
-    counsellor = get_object_or_404(Counsellor, admin=request.user)
+    counsellor = counsellor_or_404(request)
     # Mark all as read
     NotificationCounsellor.objects.filter(counsellor=counsellor, is_read=False).update(is_read=True)
+    invalidate_counsellor_notifications([counsellor.pk])
     notifications = NotificationCounsellor.objects.filter(counsellor=counsellor)
     context = {
         'notifications': notifications,
@@ -105,6 +108,7 @@ def counsellor_view_notification(request):
 def admin_view_notification(request):
     """Display and mark admin notifications as read."""
     NotificationAdmin.objects.filter(admin=request.user, is_read=False).update(is_read=True)
+    invalidate_admin_notifications([request.user.pk])
     notifications = NotificationAdmin.objects.filter(admin=request.user)
     context = {
         'notifications': notifications,